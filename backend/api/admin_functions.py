@@ -1,20 +1,21 @@
-import psycopg2
-import personalSettings
+import datetime
 import hashlib
+from db_pool import get_connection, release_connection
+import json
+from sql_registry import execute as execute_sql, get_sql
+import availability_index
+import user_cache
+import health_card_cache
+import session_revocation
+from id_allocator import next_id
 
-def get_db_connection():
-    """Create and return a database connection"""
-    return psycopg2.connect(
-        dbname=personalSettings.tableName,
-        user=personalSettings.dbUser,
-        password=personalSettings.dbPassword,
-        host="localhost",
-        port=personalSettings.dbPort
-    )
+# Page size limits for list_users()
+USERS_PAGE_SIZE = 100
+USERS_MAX_PAGE_SIZE = 500
 
 def get_all_users():
     """Get all users with their roles"""
-    conn = get_db_connection()
+    conn = get_connection(readonly=True)
     try:
         with conn.cursor() as cur:
             cur.execute("""
@@ -61,11 +62,57 @@ def get_all_users():
                 users.append(user)
             return users
     finally:
-        conn.close()
+        release_connection(conn)
+
+def _like_prefix(value):
+    """'Ann_' -> 'ann\\_%': case-insensitive prefix pattern with LIKE wildcards escaped"""
+    if not value:
+        return None
+    escaped = value.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return escaped + '%'
+
+def list_users(after=None, limit=USERS_PAGE_SIZE, role=None, name=None, email=None):
+    """
+    Get one page of users ordered by u_id.
+    `after` is the next_cursor of the previous page. Filtering and paging happen
+    in SQL, so the cost of a page does not grow with the size of the table.
+    """
+    limit = max(1, min(int(limit), USERS_MAX_PAGE_SIZE))
+    params = {
+        'after': after or None,
+        'role': role.lower() if role else None,
+        'name': _like_prefix(name),
+        'email': _like_prefix(email),
+    }
+    conn = get_connection(readonly=True)
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                # One extra row tells whether there is a next page
+                execute_sql(cur, 'adminSQL/listUsers', dict(params, limit=limit + 1))
+                columns = [desc[0] for desc in cur.description]
+                users = [dict(zip(columns, row)) for row in cur.fetchall()]
+
+                # Planner row estimate for the filters instead of an exact COUNT(*)
+                cur.execute('EXPLAIN (FORMAT JSON) ' + get_sql('adminSQL/listUsers'), dict(params, after=None, limit=None))
+                plan = cur.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                estimated_total = int(plan[0]['Plan']['Plan Rows'])
+
+        has_more = len(users) > limit
+        users = users[:limit]
+        return {
+            'users': users,
+            'next_cursor': users[-1]['u_id'] if has_more else None,
+            'estimated_total': estimated_total
+        }
+    finally:
+        release_connection(conn)
 
 def get_system_stats():
     """Get system statistics"""
-    conn = get_db_connection()
+    conn = get_connection(readonly=True)
     try:
         with conn.cursor() as cur:
             cur.execute("""
@@ -84,11 +131,11 @@ def get_system_stats():
                 'total_patients': row[3]
             }
     finally:
-        conn.close()
+        release_connection(conn)
 
 def get_all_departments():
     """Get all departments"""
-    conn = get_db_connection()
+    conn = get_connection(readonly=True)
     try:
         with conn.cursor() as cur:
             cur.execute("""
@@ -106,84 +153,58 @@ def get_all_departments():
                 })
             return departments
     finally:
-        conn.close()
+        release_connection(conn)
+
+def get_occupancy(start_date, end_date):
+    """Get booked and unavailable slots per department, with capacity, between two dates"""
+    days = (datetime.date.fromisoformat(end_date) - datetime.date.fromisoformat(start_date)).days + 1
+    if days < 1:
+        raise ValueError("end_date is before start_date")
+
+    conn = get_connection(readonly=True)
+    try:
+        with conn.cursor() as cur:
+            execute_sql(cur, 'adminSQL/getOccupancy', {'start_date': start_date, 'end_date': end_date})
+            columns = [desc[0] for desc in cur.description]
+            departments = [dict(zip(columns, row)) for row in cur.fetchall()]
+            cur.execute('SELECT COUNT(*) FROM time_slot')
+            slots_per_day = cur.fetchone()[0]
+    finally:
+        release_connection(conn)
+
+    for department in departments:
+        department['capacity'] = department['doctors'] * slots_per_day * days
+        department['occupancy'] = round(department['booked'] / department['capacity'], 4) if department['capacity'] else 0.0
+    return departments
 
 def delete_user(user_id):
     """Delete a user and all related records"""
-    conn = get_db_connection()
+    conn = get_connection()
     try:
         with conn:
             with conn.cursor() as cur:
-                # Check if user is a patient and get health card ID
-                cur.execute('SELECT hc_id FROM patient WHERE u_id = %s', [user_id])
-                result = cur.fetchone()
-                hc_id = result[0] if result else None
-                
-                # Delete feedback records
-                cur.execute('DELETE FROM feedback WHERE patient_id = %s OR doc_id = %s', [user_id, user_id])
-                
-                # Delete appointments
-                cur.execute('DELETE FROM appointment WHERE patient_id = %s OR doc_id = %s', [user_id, user_id])
-                
-                # If user has a health card, delete related records
-                if hc_id:
-                    # First delete presc_medication entries for prescriptions with this health card
-                    cur.execute("""
-                        DELETE FROM presc_medication 
-                        WHERE p_id IN (SELECT p_id FROM prescription WHERE hc_id = %s)
-                    """, [hc_id])
-                    
-                    # Then delete prescriptions
-                    cur.execute('DELETE FROM prescription WHERE hc_id = %s', [hc_id])
-                    
-                    # Delete blood tests
-                    cur.execute('DELETE FROM blood_test WHERE hc_id = %s', [hc_id])
-                
-                # Delete presc_medication entries for prescriptions where user is doctor
-                cur.execute("""
-                    DELETE FROM presc_medication 
-                    WHERE p_id IN (SELECT p_id FROM prescription WHERE doc_id = %s)
-                """, [user_id])
-                
-                # Delete prescriptions where user is doctor
-                cur.execute('DELETE FROM prescription WHERE doc_id = %s', [user_id])
-                
-                # Delete unavailability records if doctor
-                cur.execute('DELETE FROM unavailability WHERE doc_id = %s', [user_id])
-                
-                # Delete from role tables
-                cur.execute('DELETE FROM patient WHERE u_id = %s', [user_id])
-                cur.execute('DELETE FROM doctor WHERE u_id = %s', [user_id])
-                cur.execute('DELETE FROM staff WHERE u_id = %s', [user_id])
-                cur.execute('DELETE FROM admin WHERE u_id = %s', [user_id])
-                
-                # Delete health card if exists
-                if hc_id:
-                    cur.execute('DELETE FROM health_card WHERE hc_id = %s', [hc_id])
-                
-                # Finally delete from user table
-                cur.execute('DELETE FROM "user" WHERE u_id = %s', [user_id])
-                
-                return True
+                # One round trip: the delete_users() database function removes
+                # the dependent rows and the user itself
+                execute_sql(cur, 'adminSQL/deleteUsers', [[user_id]])
+                deleted = cur.fetchone()[0] > 0
+                session_revocation.revoke([user_id], cur)
+        availability_index.invalidate()
+        user_cache.invalidate([user_id])
+        health_card_cache.invalidate([user_id])
+        return deleted
     except Exception as e:
         print(f"Error deleting user: {e}")
         return False
     finally:
-        conn.close()
+        release_connection(conn)
 
 def create_user(name, surname, email, password, phone, role, **kwargs):
     """Create a new user"""
-    conn = get_db_connection()
+    conn = get_connection()
     try:
         with conn:
             with conn.cursor() as cur:
-                # Generate new user ID
-                cur.execute("""
-                    SELECT 'U' || LPAD((COALESCE(MAX(CAST(SUBSTRING(u_id, 2) AS INTEGER)), 0) + 1)::TEXT, 4, '0') 
-                    FROM "user" 
-                    WHERE u_id ~ '^U[0-9]{4}$'
-                """)
-                new_uid = cur.fetchone()[0]
+                new_uid = next_id('user', cur)
                 
                 # Store password as plain text (no hashing)
                 
@@ -196,15 +217,8 @@ def create_user(name, surname, email, password, phone, role, **kwargs):
                 # Insert into role table
                 if role == 'patient':
                     balance = float(kwargs.get('balance', 0))
-                    # Generate health card ID
-                    cur.execute("""
-                        SELECT 'HC' || LPAD((COALESCE(MAX(CAST(SUBSTRING(hc_id, 3) AS INTEGER)), 0) + 1)::TEXT, 3, '0') 
-                        FROM health_card 
-                        WHERE hc_id ~ '^HC[0-9]{3}$'
-                    """)
-                    result = cur.fetchone()
-                    hc_id = result[0] if result and result[0] else 'HC001'
-                    
+                    hc_id = next_id('health_card', cur)
+
                     # The trigger will create the health_card, so we just insert the patient
                     cur.execute('INSERT INTO patient (u_id, hc_id, balance) VALUES (%s, %s, %s)', 
                                [new_uid, hc_id, balance])
@@ -224,11 +238,11 @@ def create_user(name, surname, email, password, phone, role, **kwargs):
         print(f"Error creating user: {e}")
         return None
     finally:
-        conn.close()
+        release_connection(conn)
 
 def update_user(user_id, **kwargs):
     """Update user details"""
-    conn = get_db_connection()
+    conn = get_connection()
     try:
         with conn:
             with conn.cursor() as cur:
@@ -257,6 +271,9 @@ def update_user(user_id, **kwargs):
                         values.append(user_id)
                         sql = f'UPDATE "user" SET {", ".join(updates)} WHERE u_id = %s'
                         cur.execute(sql, values)
+                    if kwargs.get('password'):
+                        # Tokens issued with the old password must not stay valid
+                        session_revocation.revoke([user_id], cur)
                 
                 # Update role-specific fields
                 # Check if user is a doctor
@@ -274,10 +291,11 @@ def update_user(user_id, **kwargs):
                 if cur.fetchone():
                     if 'balance' in kwargs:
                         cur.execute('UPDATE patient SET balance = %s WHERE u_id = %s', [float(kwargs['balance']), user_id])
-                
-                return True
+        user_cache.invalidate([user_id])
+        health_card_cache.invalidate([user_id])
+        return True
     except Exception as e:
         print(f"Error updating user: {e}")
         return False
     finally:
-        conn.close() 
\ No newline at end of file
+        release_connection(conn) 
\ No newline at end of file
@@ -1,19 +1,42 @@
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+import datetime
 import json
-from api.admin_functions import get_all_users, get_system_stats, delete_user, create_user, update_user, get_all_departments
+import time
+from api.admin_functions import list_users, USERS_PAGE_SIZE, get_system_stats, get_occupancy, delete_user, create_user, update_user, get_all_departments
+from sql_scripts.admin_scripts import delete_users
+from db_pool import pool_stats, replica_stats
+from sql_registry import query_stats
+from availability_index import index_stats, check_consistency
+from health_card_cache import cache_stats as health_card_cache_stats
+from booking_engine import booking_stats
+from rebalance import rebalance_clashes
+from lab_stats import run_lab_stats, get_lab_stats
 
 @csrf_exempt
 def admin_users_view(request):
-    """Handle users endpoint - GET for list, POST for create"""
+    """Handle users endpoint - GET for a page of users, POST for create"""
     if request.method == 'GET':
         try:
-            users = get_all_users()
+            page = list_users(
+                after=request.GET.get('after'),
+                limit=request.GET.get('limit', USERS_PAGE_SIZE),
+                role=request.GET.get('role'),
+                name=request.GET.get('name'),
+                email=request.GET.get('email')
+            )
             return JsonResponse({
                 'success': True,
-                'users': users
+                'users': page['users'],
+                'next_cursor': page['next_cursor'],
+                'estimated_total': page['estimated_total']
             })
+        except ValueError:
+            return JsonResponse({
+                'success': False,
+                'message': 'limit must be a number'
+            }, status=400)
         except Exception as e:
             return JsonResponse({
                 'success': False,
@@ -109,6 +132,32 @@ def admin_user_detail_view(request, user_id):
                 'message': str(e)
             }, status=500)
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def admin_bulk_delete_users_view(request):
+    """Delete many users at once - body: {"user_ids": [...]}"""
+    try:
+        data = json.loads(request.body)
+        user_ids = data.get('user_ids')
+        if not isinstance(user_ids, list) or not user_ids:
+            return JsonResponse({
+                'success': False,
+                'message': 'user_ids must be a non-empty list'
+            }, status=400)
+
+        started = time.perf_counter()
+        deleted = delete_users(user_ids)
+        return JsonResponse({
+            'success': True,
+            'deleted': deleted,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)
+        })
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=500)
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def admin_stats_view(request):
@@ -125,6 +174,30 @@ def admin_stats_view(request):
             'message': str(e)
         }, status=500)
 
+@csrf_exempt
+@require_http_methods(["GET"])
+def admin_occupancy_view(request):
+    """Get slot occupancy per department - ?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD (default: the coming week)"""
+    try:
+        start_date = request.GET.get('start_date') or str(datetime.date.today())
+        end_date = request.GET.get('end_date') or str(datetime.date.fromisoformat(start_date) + datetime.timedelta(days=6))
+        return JsonResponse({
+            'success': True,
+            'start_date': start_date,
+            'end_date': end_date,
+            'departments': get_occupancy(start_date, end_date)
+        })
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=500)
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def admin_departments_view(request):
@@ -139,4 +212,148 @@ def admin_departments_view(request):
         return JsonResponse({
             'success': False,
             'message': str(e)
-        }, status=500) 
\ No newline at end of file
+        }, status=500)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def admin_pool_stats_view(request):
+    """Get database connection pool statistics"""
+    try:
+        return JsonResponse({
+            'success': True,
+            'pool': pool_stats(),
+            'replicas': replica_stats()
+        })
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=500)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def admin_query_stats_view(request):
+    """Get per-query execution timings"""
+    try:
+        return JsonResponse({
+            'success': True,
+            'queries': query_stats()
+        })
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=500)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def admin_availability_index_view(request):
+    """Get availability index statistics; ?check=doc_id:date,... compares entries with SQL"""
+    try:
+        response = {
+            'success': True,
+            'index': index_stats()
+        }
+        check = request.GET.get('check')
+        if check:
+            pairs = [tuple(item.split(':', 1)) for item in check.split(',') if ':' in item]
+            response['mismatches'] = check_consistency(pairs)
+        return JsonResponse(response)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=500)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def admin_health_card_cache_view(request):
+    """Get health card cache hit ratio and memory use"""
+    try:
+        return JsonResponse({
+            'success': True,
+            'cache': health_card_cache_stats()
+        })
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=500)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def admin_booking_stats_view(request):
+    """Get booking outcomes, conflict and retry rates"""
+    try:
+        return JsonResponse({
+            'success': True,
+            'bookings': booking_stats()
+        })
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=500)
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def admin_rebalance_view(request):
+    """Move appointments that clash with unavailability - body: {"doc_id", "start_date", "end_date", "dry_run"} (all optional)"""
+    try:
+        data = json.loads(request.body or '{}')
+        result = rebalance_clashes(
+            data.get('doc_id'),
+            data.get('start_date'),
+            data.get('end_date'),
+            bool(data.get('dry_run', False))
+        )
+        return JsonResponse({
+            'success': True,
+            **result
+        })
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=500)
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def admin_lab_stats_view(request):
+    """GET for population lab statistics, POST to update them - body: {"full"} (optional)"""
+    try:
+        if request.method == 'POST':
+            data = json.loads(request.body or '{}')
+            return JsonResponse({
+                'success': True,
+                'run': run_lab_stats(full=bool(data.get('full', False)))
+            })
+        stats = get_lab_stats(
+            group_by=request.GET.get('group_by') or None,
+            analyte=request.GET.get('analyte') or None,
+            d_id=request.GET.get('d_id') or None,
+            start_month=request.GET.get('start_month') or None,
+            end_month=request.GET.get('end_month') or None,
+            histogram=request.GET.get('histogram', 'false').lower() == 'true',
+            outliers=request.GET.get('outliers', 20)
+        )
+        return JsonResponse({
+            'success': True,
+            **stats
+        })
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=400)
+    except RuntimeError as e:
+        # Another run holds the lock
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=409)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=500)
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Pre-open pooled database connections so the first requests
+        # do not pay the connection handshake
+        import psycopg2
+        from db_pool import warm_up
+        try:
+            warm_up()
+        except psycopg2.OperationalError as e:
+            print(f"Could not pre-warm database pool: {e}")
@@ -0,0 +1,110 @@
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from async_scripts import (
+    get_appointments_for_patient,
+    get_appointments_for_doctor,
+    list_available_timeslots_of_doctor,
+    filter_doctors_by_dept,
+    get_health_card_of_patient,
+    get_equipment,
+)
+from healthCardScript import HEALTH_CARD_PAGE_SIZE
+
+# Async versions of the read endpoints. Served natively when the app runs under
+# an ASGI server (e.g. `uvicorn backend.asgi:application`), so a slow client
+# does not hold a worker thread while the database is working.
+
+
+@csrf_exempt
+async def get_appointments_async_view(request, patient_id):
+    if request.method == "GET":
+        if not patient_id:
+            return JsonResponse({"success": False, "message": "Patient ID is required."}, status=400)
+        try:
+            appointments = await get_appointments_for_patient(patient_id)
+            return JsonResponse({"success": True, "appointments": appointments})
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+    else:
+        return JsonResponse({"success": False, "message": "Method not allowed."}, status=405)
+
+
+@csrf_exempt
+async def get_doctor_appointments_async_view(request, doc_id):
+    if request.method == "GET":
+        if not doc_id:
+            return JsonResponse({"success": False, "message": "Doctor ID is required."}, status=400)
+        try:
+            appointments = await get_appointments_for_doctor(doc_id)
+            return JsonResponse({"success": True, "appointments": appointments})
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+    else:
+        return JsonResponse({"success": False, "message": "Method not allowed."}, status=405)
+
+
+@csrf_exempt
+async def list_available_timeslots_of_doctor_async_view(request):
+    if request.method == "GET":
+        doc_id = request.GET.get("doc_id")
+        date = request.GET.get("date")
+        if not doc_id or not date:
+            return JsonResponse({"success": False, "message": "Doctor ID and date are required."}, status=400)
+        try:
+            timeslots = await list_available_timeslots_of_doctor(doc_id, date)
+            return JsonResponse({"success": True, "timeslots": timeslots})
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+    else:
+        return JsonResponse({"success": False, "message": "Only GET allowed."}, status=405)
+
+
+@csrf_exempt
+async def filter_doctors_by_dept_async_view(request):
+    if request.method == "GET":
+        dept_name = request.GET.get("dept_name")
+        if not dept_name:
+            return JsonResponse({"success": False, "message": "Department name is required."}, status=400)
+        try:
+            doctors = await filter_doctors_by_dept(dept_name)
+            return JsonResponse({"success": True, "doctors": doctors})
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+    else:
+        return JsonResponse({"success": False, "message": "Only GET allowed."}, status=405)
+
+
+@csrf_exempt
+async def get_health_card_async_view(request, patient_id):
+    if request.method == "GET":
+        if not patient_id:
+            return JsonResponse({"success": False, "message": "Patient ID is required."}, status=400)
+        try:
+            healthCard = await get_health_card_of_patient(
+                patient_id,
+                bt_after=request.GET.get("bt_after"),
+                rx_after=request.GET.get("rx_after"),
+                limit=request.GET.get("limit", HEALTH_CARD_PAGE_SIZE)
+            )
+            if healthCard is None:
+                return JsonResponse({"success": False, "message": "Patient not found."}, status=404)
+            return JsonResponse({"success": True, "healthCard": healthCard})
+        except ValueError as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=400)
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+    else:
+        return JsonResponse({"success": False, "message": "Method not allowed."}, status=405)
+
+
+@csrf_exempt
+async def get_equipment_async_view(request):
+    if request.method == "GET":
+        try:
+            equipment = await get_equipment()
+            return JsonResponse({"success": True, "equipment": equipment})
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+    else:
+        return JsonResponse({"success": False, "message": "Only GET allowed."}, status=405)
@@ -0,0 +1,122 @@
+import csv
+import itertools
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from sql_scripts.export_scripts import (
+    export_users, export_equipment, export_patient_blood_tests,
+    export_doctor_appointments, export_appointments, export_blood_tests,
+)
+
+# Rows joined into one chunk of the HTTP response
+CHUNK_ROWS = 500
+
+
+class _Echo:
+    """File-like object for csv.writer that returns each line instead of storing it"""
+    def write(self, value):
+        return value
+
+
+def _chunks(lines, rows):
+    # Django closes this generator when the response ends or the client goes away;
+    # closing `rows` then returns its connection to the pool
+    try:
+        while True:
+            chunk = ''.join(itertools.islice(lines, CHUNK_ROWS))
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        rows.close()
+
+
+async def _async_chunks(chunks):
+    # Under ASGI Django reads a plain iterator to the end before sending anything,
+    # so each chunk is read from the cursor in a worker thread instead
+    try:
+        while True:
+            chunk = await sync_to_async(next, thread_sensitive=False)(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close, thread_sensitive=False)()
+
+
+def _ndjson_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def _csv_lines(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _export_response(request, filename, open_rows):
+    """
+    Streams the rows produced by open_rows() as NDJSON (default) or CSV (?format=csv),
+    chunk by chunk under both WSGI and ASGI. The query runs before the response starts, so database errors still get a JSON 500.
+    """
+    if request.method != "GET":
+        return JsonResponse({"success": False, "message": "Only GET allowed."}, status=405)
+
+    export_format = request.GET.get("format", "ndjson")
+    if export_format not in ("ndjson", "csv"):
+        return JsonResponse({"success": False, "message": "format must be ndjson or csv."}, status=400)
+
+    try:
+        rows = open_rows()
+        columns = next(rows)
+    except Exception as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=500)
+
+    if export_format == "csv":
+        lines, content_type = _csv_lines(columns, rows), "text/csv"
+    else:
+        lines, content_type = _ndjson_lines(columns, rows), "application/x-ndjson"
+
+    chunks = _chunks(lines, rows)
+    if isinstance(request, ASGIRequest):
+        chunks = _async_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{export_format}"'
+    return response
+
+
+@csrf_exempt
+def export_users_view(request):
+    return _export_response(request, "users", export_users)
+
+
+@csrf_exempt
+def export_equipment_view(request):
+    return _export_response(request, "equipment", export_equipment)
+
+
+@csrf_exempt
+def export_patient_blood_tests_view(request, patient_id):
+    return _export_response(request, f"blood_tests_{patient_id}", lambda: export_patient_blood_tests(patient_id))
+
+
+@csrf_exempt
+def export_doctor_appointments_view(request, doc_id):
+    return _export_response(request, f"appointments_{doc_id}", lambda: export_doctor_appointments(doc_id))
+
+
+@csrf_exempt
+def export_appointments_view(request):
+    return _export_response(request, "appointments", export_appointments)
+
+
+@csrf_exempt
+def export_blood_tests_view(request):
+    return _export_response(request, "blood_tests", export_blood_tests)
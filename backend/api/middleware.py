@@ -0,0 +1,64 @@
+from django.core.cache import caches
+
+import personalSettings
+import db_router
+from api.session_tokens import token_from_request, verify_token
+
+# Cookie carrying the time until which a client's reads go to the primary
+PIN_COOKIE = 'db_primary_until'
+# Django cache holding the pin of signed-in users; has to be shared by all
+# workers (Redis or Memcached) for the pin to follow a user across them
+PIN_CACHE_ALIAS = getattr(personalSettings, 'dbReplicaPinCacheAlias', 'default')
+
+
+def _pin_key(u_id: str) -> str:
+    return f'db_primary_until:{u_id}'
+
+
+class ReplicaPinMiddleware:
+    """
+    Read-your-writes across workers: once a request writes, the client's
+    following reads skip the read replicas for a short while. The pin is kept
+    server-side under the signed-in user, so it holds for clients that do not
+    send cookies back; anonymous clients get it as a short-lived cookie.
+    Runs after SessionTokenMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        identity = getattr(request, 'identity', None)
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0.0
+        if identity:
+            pinned_until = max(pinned_until, caches[PIN_CACHE_ALIAS].get(_pin_key(identity['u_id']), 0.0))
+        db_router.begin_request(pinned_until)
+
+        response = self.get_response(request)
+
+        if db_router.wrote():
+            until = db_router.pinned_until()
+            max_age = int(db_router.READ_YOUR_WRITES_WINDOW) + 1
+            if identity:
+                caches[PIN_CACHE_ALIAS].set(_pin_key(identity['u_id']), until, timeout=max_age)
+            response.set_cookie(PIN_COOKIE, f'{until:.3f}', max_age=max_age, httponly=True, samesite='Lax')
+        return response
+
+
+class SessionTokenMiddleware:
+    """
+    Verifies the signed session token of each request in memory and attaches
+    the identity as request.identity ({'u_id', 'role', 'issued_at'} or None).
+    Requests without a valid token pass through anonymously.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = token_from_request(request)
+        request.identity = verify_token(token) if token else None
+        return self.get_response(request)
@@ -24,7 +24,7 @@ def get_appointments_view(request, patient_id):
     else:
         return JsonResponse({"success": False, "message": "Method not allowed."}, status=405)
 
-from sql_scripts.getDoctorAppointment import get_appointments_for_doctor
+from sql_scripts.getDoctorAppointment import get_appointments_for_doctor, get_doctor_schedule
 
 @csrf_exempt
 def getDoctorAppointments(request, doc_id):
@@ -37,4 +37,20 @@ def getDoctorAppointments(request, doc_id):
         except Exception as e:
             return JsonResponse({"success": False, "message": str(e)}, status=500)
     else:
-        return JsonResponse({"success": False, "message": "Method not allowed."}, status=405)
\ No newline at end of file
+        return JsonResponse({"success": False, "message": "Method not allowed."}, status=405)
+
+@csrf_exempt
+def get_doctor_schedule_view(request, doc_id):
+    if request.method == "GET":
+        start_date = request.GET.get("start_date")
+        if not start_date:
+            return JsonResponse({"success": False, "message": "start_date is required."}, status=400)
+        try:
+            schedule = get_doctor_schedule(doc_id, start_date, int(request.GET.get("days", 7)))
+            return JsonResponse({"success": True, "schedule": schedule})
+        except ValueError as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=400)
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+    else:
+        return JsonResponse({"success": False, "message": "Method not allowed."}, status=405)
@@ -1,7 +1,7 @@
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 
-from sql_scripts.healthCardScript import get_health_card_of_patient
+from sql_scripts.healthCardScript import get_health_card_of_patient, HEALTH_CARD_PAGE_SIZE
 
 
 @csrf_exempt
@@ -10,8 +10,17 @@ def get_health_card_view(request, patient_id):
         if not patient_id:
             return JsonResponse({"success": False, "message": "Patient ID is required."}, status=400)
         try:
-            healthCard = get_health_card_of_patient(patient_id)
+            healthCard = get_health_card_of_patient(
+                patient_id,
+                bt_after=request.GET.get("bt_after"),
+                rx_after=request.GET.get("rx_after"),
+                limit=request.GET.get("limit", HEALTH_CARD_PAGE_SIZE)
+            )
+            if healthCard is None:
+                return JsonResponse({"success": False, "message": "Patient not found."}, status=404)
             return JsonResponse({"success": True, "healthCard": healthCard})
+        except ValueError as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=400)
         except Exception as e:
             return JsonResponse({"success": False, "message": str(e)}, status=500)
 
@@ -0,0 +1,48 @@
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+import json
+
+from sql_scripts.slot_holds import hold_slot, release_hold, SlotHoldError
+
+
+@csrf_exempt
+def hold_slot_view(request):
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+            patient_id = data.get("patient_id")
+            doc_id = data.get("doc_id")
+            ts_id = data.get("ts_id")
+            date = data.get("date")
+            if not all([patient_id, doc_id, ts_id, date]):
+                return JsonResponse({"success": False, "message": "Patient ID, doctor ID, time slot and date are required."}, status=400)
+            expires_at = hold_slot(patient_id, doc_id, ts_id, date, data.get("ttl"))
+            return JsonResponse({"success": True, "expires_at": expires_at.isoformat()})
+        except SlotHoldError as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=e.http_status)
+        except ValueError as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=400)
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+    else:
+        return JsonResponse({"success": False, "message": "Only POST allowed."}, status=405)
+
+
+@csrf_exempt
+def release_hold_view(request):
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+            patient_id = data.get("patient_id")
+            doc_id = data.get("doc_id")
+            ts_id = data.get("ts_id")
+            date = data.get("date")
+            if not all([patient_id, doc_id, ts_id, date]):
+                return JsonResponse({"success": False, "message": "Patient ID, doctor ID, time slot and date are required."}, status=400)
+            if not release_hold(patient_id, doc_id, ts_id, date):
+                return JsonResponse({"success": False, "message": "No active hold found."}, status=404)
+            return JsonResponse({"success": True, "message": "Hold released."})
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+    else:
+        return JsonResponse({"success": False, "message": "Only POST allowed."}, status=405)
@@ -0,0 +1,74 @@
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+import json
+
+from sql_scripts.waitlist import join_waitlist, get_waitlist_for_patient, cancel_waitlist
+from user_cache import get_user
+
+# Roles allowed to queue a request ahead of others
+PRIORITY_ROLES = ('staff', 'admin')
+
+
+def _caller_role(request):
+    """Current role of the user whose session token came with the request, or None."""
+    if request.identity is None:
+        return None
+    user = get_user(request.identity["u_id"])
+    return user[0] if user else None
+
+
+@csrf_exempt
+def join_waitlist_view(request):
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+            patient_id = data.get("patient_id")
+            doc_id = data.get("doc_id")
+            start_date = data.get("start_date")
+            end_date = data.get("end_date", start_date)
+            if not all([patient_id, doc_id, start_date]):
+                return JsonResponse({"success": False, "message": "Patient ID, doctor ID and start date are required."}, status=400)
+            priority = int(data.get("priority", 0))
+            # Patients could otherwise jump the queue; only staff may prioritise a request
+            if priority != 0 and _caller_role(request) not in PRIORITY_ROLES:
+                return JsonResponse({"success": False, "message": "Only staff can set a priority."}, status=403)
+            request_id = join_waitlist(patient_id, doc_id, start_date, end_date, priority)
+            return JsonResponse({"success": True, "request_id": request_id})
+        except ValueError as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=400)
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+    else:
+        return JsonResponse({"success": False, "message": "Only POST allowed."}, status=405)
+
+
+@csrf_exempt
+def get_waitlist_view(request, patient_id):
+    if request.method == "GET":
+        try:
+            waitlist = get_waitlist_for_patient(patient_id)
+            return JsonResponse({"success": True, "waitlist": waitlist})
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+    else:
+        return JsonResponse({"success": False, "message": "Only GET allowed."}, status=405)
+
+
+@csrf_exempt
+def cancel_waitlist_view(request):
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+            patient_id = data.get("patient_id")
+            request_id = data.get("request_id")
+            if not all([patient_id, request_id]):
+                return JsonResponse({"success": False, "message": "Patient ID and request ID are required."}, status=400)
+            if not cancel_waitlist(patient_id, int(request_id)):
+                return JsonResponse({"success": False, "message": "No waiting request found."}, status=404)
+            return JsonResponse({"success": True, "message": "Waitlist request cancelled."})
+        except ValueError as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=400)
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+    else:
+        return JsonResponse({"success": False, "message": "Only POST allowed."}, status=405)
@@ -0,0 +1,42 @@
+"""
+Signed session tokens issued at login.
+
+A token carries u_id, role and the time it was issued, signed with the
+SECRET_KEY through django.core.signing, so checking it needs no database
+query. Tokens expire SESSION_TOKEN_TTL seconds after they were issued and are
+rejected once their user is on the revocation list (session_revocation).
+"""
+import time
+
+from django.core import signing
+
+from session_revocation import SESSION_TOKEN_TTL, is_revoked
+
+SALT = 'hams.session'
+# Cookie that carries the token for browser clients
+SESSION_COOKIE = 'session_token'
+
+
+def issue_token(u_id: str, role: str) -> str:
+    # Issue time in whole milliseconds, rounded down so a revocation in the same
+    # millisecond still covers the token
+    return signing.dumps({'u': u_id, 'r': role, 'i': int(time.time() * 1000) / 1000}, salt=SALT)
+
+
+def verify_token(token: str):
+    """Returns {'u_id', 'role', 'issued_at'}, or None for a bad, expired or revoked token."""
+    try:
+        payload = signing.loads(token, salt=SALT, max_age=SESSION_TOKEN_TTL)
+    except signing.BadSignature:
+        return None
+    if is_revoked(payload['u'], payload['i']):
+        return None
+    return {'u_id': payload['u'], 'role': payload['r'], 'issued_at': payload['i']}
+
+
+def token_from_request(request):
+    """The token from an 'Authorization: Bearer' header or the session cookie."""
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):].strip()
+    return request.COOKIES.get(SESSION_COOKIE)
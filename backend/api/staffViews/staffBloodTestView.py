@@ -3,6 +3,7 @@ from django.views.decorators.csrf import csrf_exempt
 import json
 
 from sql_scripts.staff_scripts import create_blood_test, create_prescription_script, prescribe_medication_script
+from sql_scripts.lab_import import import_blood_tests
 
 @csrf_exempt
 def create_blood_test_view(request):
@@ -17,15 +18,38 @@ def create_blood_test_view(request):
             hemoglobin = data.get("hemoglobin")
             whiteBC = data.get("whiteBC")
             redBC = data.get("redBC")
+            doctor_id = data.get("doctor_id")  # Optional, the ordering doctor
             if not all([patient_id, cholesterol, glucose, hemoglobin, vitamins, minerals, whiteBC, redBC]):
                 return JsonResponse({"success": False, "message": "All fields are required."}, status=400)
-            create_blood_test(patient_id, vitamins, minerals, cholesterol, glucose, hemoglobin, whiteBC, redBC)
+            create_blood_test(patient_id, vitamins, minerals, cholesterol, glucose, hemoglobin, whiteBC, redBC, doctor_id)
             return JsonResponse({"success": True, "message": "Blood test created."})
         except Exception as e:
             return JsonResponse({"success": False, "message": str(e)}, status=500)
     else:
         return JsonResponse({"success": False, "message": "Only POST allowed."}, status=405)
 
+@csrf_exempt
+def import_blood_tests_view(request):
+    """
+    POST endpoint to import a batch of blood test results: CSV or NDJSON as the
+    request body or as an uploaded "file" (?format=csv|ndjson, ?dry_run=true)
+    """
+    if request.method == "POST":
+        try:
+            upload = request.FILES.get("file")
+            default_format = "csv" if request.content_type == "text/csv" or (upload and upload.name.endswith(".csv")) else "ndjson"
+            report = import_blood_tests(
+                upload or request,
+                file_format=request.GET.get("format", default_format),
+                dry_run=request.GET.get("dry_run", "false").lower() == "true"
+            )
+            return JsonResponse({"success": True, **report})
+        except ValueError as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=400)
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+    else:
+        return JsonResponse({"success": False, "message": "Only POST allowed."}, status=405)
 
 
 @csrf_exempt
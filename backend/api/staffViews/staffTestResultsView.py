@@ -3,6 +3,7 @@ from django.views.decorators.csrf import csrf_exempt
 import json
 
 from sql_scripts.staff_scripts import get_patient_blood_tests, update_blood_test_results, get_recent_blood_tests
+from sql_scripts.lab_trends import get_lab_trends, LAB_TREND_WINDOW
 
 @csrf_exempt
 def get_patient_blood_tests_view(request, patient_id):
@@ -58,4 +59,26 @@ def get_recent_blood_tests_view(request):
         except Exception as e:
             return JsonResponse({"success": False, "message": str(e)}, status=500)
     else:
-        return JsonResponse({"success": False, "message": "Only GET allowed."}, status=405) 
\ No newline at end of file
+        return JsonResponse({"success": False, "message": "Only GET allowed."}, status=405) 
+
+@csrf_exempt
+def get_lab_trends_view(request, patient_id):
+    """
+    GET endpoint for the trends of a patient's blood test results
+    """
+    if request.method == "GET":
+        try:
+            trends = get_lab_trends(
+                patient_id,
+                window=request.GET.get("window", LAB_TREND_WINDOW),
+                start_date=request.GET.get("start_date"),
+                end_date=request.GET.get("end_date"),
+                series=request.GET.get("series", "true").lower() != "false"
+            )
+            return JsonResponse({"success": True, "trends": trends})
+        except ValueError as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=400)
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+    else:
+        return JsonResponse({"success": False, "message": "Only GET allowed."}, status=405)
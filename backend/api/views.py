@@ -8,12 +8,18 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../sql_scripts')))
 from login import login as login_func
 from registration import register as register_func
-from make_appointment import make_appointment as make_appointment_func
+from make_appointment import make_appointment as make_appointment_func, make_appointments as make_appointments_func, recurring_items
+from booking_engine import BookingError
 from filter_doctors_by_dept import filter_doctors_by_dept as filter_doctors_by_dept_func
 from list_available_timeslots_of_doctor import list_available_timeslots_of_doctor as list_timeslots_func
-from doctor_declare_unavailability import declare_unavailability
+from search_availability import search_availability as search_availability_func
+from doctor_declare_unavailability import declare_unavailability, declare_unavailability_range, lift_unavailability
+from rebalance import rebalance_clashes
 from get_patient_balance import get_patient_balance as get_patient_balance_func
 from give_feedback import give_feedback as give_feedback_func
+from session_revocation import SESSION_TOKEN_TTL, revoke as revoke_sessions
+from user_cache import get_user as get_cached_user
+from api.session_tokens import SESSION_COOKIE, issue_token
 
 
 @csrf_exempt
@@ -29,14 +35,18 @@ def user_login(request):
 
             if result:
                 u_id, role, name, surname = result
-                return JsonResponse({
+                token = issue_token(u_id, role)
+                response = JsonResponse({
                     "success": True, 
                     "message": "Login successful.", 
                     "u_id": u_id, 
                     "role": role,
                     "name": name,
-                    "surname": surname
+                    "surname": surname,
+                    "token": token
                 })
+                response.set_cookie(SESSION_COOKIE, token, max_age=SESSION_TOKEN_TTL, httponly=True, samesite='Lax')
+                return response
             else:
                 return JsonResponse({"success": False, "message": "Invalid credentials."}, status=401)
         except Exception as e:
@@ -45,6 +55,47 @@ def user_login(request):
         return JsonResponse({"success": False, "message": "Only POST allowed."}, status=405)
 
 
+@csrf_exempt
+def user_logout(request):
+    """Revokes every session token of the logged-in user."""
+    if request.method == "POST":
+        try:
+            if request.identity is None:
+                return JsonResponse({"success": False, "message": "Not logged in."}, status=401)
+            revoke_sessions([request.identity["u_id"]])
+            response = JsonResponse({"success": True, "message": "Logged out."})
+            response.delete_cookie(SESSION_COOKIE)
+            return response
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+    else:
+        return JsonResponse({"success": False, "message": "Only POST allowed."}, status=405)
+
+
+@csrf_exempt
+def current_user(request):
+    """Role and name of the logged-in user, served from user_cache."""
+    if request.method == "GET":
+        try:
+            if request.identity is None:
+                return JsonResponse({"success": False, "message": "Not logged in."}, status=401)
+            user = get_cached_user(request.identity["u_id"])
+            if user is None:
+                return JsonResponse({"success": False, "message": "User no longer exists."}, status=401)
+            role, name, surname = user
+            return JsonResponse({
+                "success": True,
+                "u_id": request.identity["u_id"],
+                "role": role,
+                "name": name,
+                "surname": surname
+            })
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+    else:
+        return JsonResponse({"success": False, "message": "Only GET allowed."}, status=405)
+
+
 @csrf_exempt
 def user_registration(request):
     if request.method == "POST":
@@ -83,12 +134,47 @@ def make_appointment_view(request):
                 return JsonResponse({"success": False, "message": "All fields are required."}, status=400)
             make_appointment_func(patient_id, doc_id, ts_id, date)
             return JsonResponse({"success": True, "message": "Appointment created."})
+        except BookingError as e:
+            return JsonResponse({"success": False, "message": str(e), "reason": e.status}, status=e.http_status)
         except Exception as e:
             return JsonResponse({"success": False, "message": str(e)}, status=500)
     else:
         return JsonResponse({"success": False, "message": "Only POST allowed."}, status=405)
 
 
+@csrf_exempt
+def make_appointments_view(request):
+    """
+    Books several appointments for one patient in one transaction.
+    Body: patient_id plus either "appointments": [{doc_id, ts_id, date}, ...]
+    or "recurrence": {doc_id, ts_id, start_date, count, every_days (default 7)}.
+    "atomic": true books nothing unless every appointment can be booked.
+    """
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+            patient_id = data.get("patient_id")
+            recurrence = data.get("recurrence")
+            if recurrence:
+                items = recurring_items(
+                    recurrence["doc_id"], recurrence["ts_id"], recurrence["start_date"],
+                    int(recurrence["count"]), int(recurrence.get("every_days", 7))
+                )
+            else:
+                items = data.get("appointments") or []
+            if not patient_id or not items:
+                return JsonResponse({"success": False, "message": "Patient ID and appointments or a recurrence are required."}, status=400)
+            summary = make_appointments_func(patient_id, items, bool(data.get("atomic", False)))
+            return JsonResponse({"success": True, **summary})
+        except BookingError as e:
+            return JsonResponse({"success": False, "message": str(e), "reason": e.status}, status=e.http_status)
+        except (KeyError, TypeError, ValueError) as e:
+            return JsonResponse({"success": False, "message": f"Invalid request: {e}"}, status=400)
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+    else:
+        return JsonResponse({"success": False, "message": "Only POST allowed."}, status=405)
+
 @csrf_exempt
 def filter_doctors_by_dept_view(request):
     if request.method == "GET":
@@ -120,6 +206,31 @@ def list_available_timeslots_of_doctor_view(request):
         return JsonResponse({"success": False, "message": "Only GET allowed."}, status=405)
 
 
+@csrf_exempt
+def search_availability_view(request):
+    """
+    Free slots of all doctors of a department (dept_name) or of a list of doctors
+    (doc_ids=U0006,U0007) between start_date and end_date; limit keeps the earliest N.
+    """
+    if request.method == "GET":
+        dept_name = request.GET.get("dept_name")
+        doc_ids = [doc_id for doc_id in request.GET.get("doc_ids", "").split(",") if doc_id]
+        start_date = request.GET.get("start_date")
+        end_date = request.GET.get("end_date", start_date)
+        limit = request.GET.get("limit")
+        if not (dept_name or doc_ids) or not start_date:
+            return JsonResponse({"success": False, "message": "A department or doctor list and a start date are required."}, status=400)
+        try:
+            limit = int(limit) if limit else None
+            doctors = search_availability_func(start_date, end_date, dept_name, doc_ids, limit)
+        except ValueError as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=400)
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+        return JsonResponse({"success": True, "doctors": doctors})
+    else:
+        return JsonResponse({"success": False, "message": "Only GET allowed."}, status=405)
+
 @csrf_exempt
 def doctor_declare_unavailability_view(request):
     if request.method == "POST":
@@ -138,6 +249,55 @@ def doctor_declare_unavailability_view(request):
         return JsonResponse({"success": False, "message": "Only POST allowed."}, status=405)
 
 
+@csrf_exempt
+def doctor_declare_unavailability_range_view(request):
+    """
+    Declares a doctor unavailable over a date range.
+    Body: doc_id, start_date, end_date (default start_date) and either
+    "ts_ids": [...] or "whole_day": true. "rebalance": true moves the
+    clashing appointments to other doctors of the department right away.
+    """
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+            doc_id = data.get("doc_id")
+            start_date = data.get("start_date")
+            end_date = data.get("end_date", start_date)
+            ts_ids = data.get("ts_ids")
+            whole_day = data.get("whole_day", False)
+            if not all([doc_id, start_date]) or (not ts_ids and not whole_day):
+                return JsonResponse({"success": False, "message": "Doctor ID, start date and time slots (or whole_day) are required."}, status=400)
+            summary = declare_unavailability_range(doc_id, start_date, end_date, None if whole_day else ts_ids)
+            if data.get("rebalance") and summary["clashes"]["appointments"]:
+                summary["rebalance"] = rebalance_clashes(doc_id, start_date, end_date)
+            return JsonResponse({"success": True, **summary})
+        except ValueError as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=400)
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+    else:
+        return JsonResponse({"success": False, "message": "Only POST allowed."}, status=405)
+
+
+@csrf_exempt
+def doctor_lift_unavailability_view(request):
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+            ts_id = data.get("ts_id")
+            doc_id = data.get("doc_id")
+            date = data.get("date")
+            if not all([ts_id, doc_id, date]):
+                return JsonResponse({"success": False, "message": "All fields are required."}, status=400)
+            lifted, handed_to = lift_unavailability(ts_id, doc_id, date)
+            if not lifted:
+                return JsonResponse({"success": False, "message": "No unavailability found for this slot."}, status=404)
+            return JsonResponse({"success": True, "message": "Unavailability lifted.", "booked_for": handed_to})
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=500)
+    else:
+        return JsonResponse({"success": False, "message": "Only POST allowed."}, status=405)
+
 @csrf_exempt
 def get_patient_balance_view(request, patient_id):
     if request.method == "GET":
@@ -61,6 +61,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.SessionTokenMiddleware',
+    'api.middleware.ReplicaPinMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -17,25 +17,33 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 
-from api.views import user_login, user_registration, make_appointment_view, filter_doctors_by_dept_view, list_available_timeslots_of_doctor_view, doctor_declare_unavailability_view, get_patient_balance_view, give_feedback_view
+from api.views import user_login, user_logout, current_user, user_registration, make_appointment_view, make_appointments_view, filter_doctors_by_dept_view, list_available_timeslots_of_doctor_view, search_availability_view, doctor_declare_unavailability_view, doctor_declare_unavailability_range_view, doctor_lift_unavailability_view, get_patient_balance_view, give_feedback_view
 
 from api.patientViews.healthCardViews import get_health_card_view
-from api.staffViews.staffBloodTestView import create_blood_test_view, create_prescripton_view, prescribe_medication_view
+from api.patientViews.waitlistViews import join_waitlist_view, get_waitlist_view, cancel_waitlist_view
+from api.patientViews.slotHoldViews import hold_slot_view, release_hold_view
+from api.staffViews.staffBloodTestView import create_blood_test_view, import_blood_tests_view, create_prescripton_view, prescribe_medication_view
 from api.staffViews.medicalEquipmentView import get_equipment_view
 from api.staffViews.createEquipmentView import create_equipment_view
-from api.staffViews.staffTestResultsView import get_patient_blood_tests_view, update_blood_test_results_view, get_recent_blood_tests_view
+from api.staffViews.staffTestResultsView import get_patient_blood_tests_view, update_blood_test_results_view, get_recent_blood_tests_view, get_lab_trends_view
 
-from api.patientViews.getAppointmentViews import get_appointments_view, getDoctorAppointments
+from api.patientViews.getAppointmentViews import get_appointments_view, getDoctorAppointments, get_doctor_schedule_view
+from api.exportViews.exportViews import export_users_view, export_equipment_view, export_patient_blood_tests_view, export_doctor_appointments_view, export_appointments_view, export_blood_tests_view
+from api.asyncViews.asyncReadViews import get_appointments_async_view, get_doctor_appointments_async_view, list_available_timeslots_of_doctor_async_view, filter_doctors_by_dept_async_view, get_health_card_async_view, get_equipment_async_view
 
 # Import admin views
-from api.admin_views import admin_users_view, admin_stats_view, admin_user_detail_view, admin_departments_view
+from api.admin_views import admin_users_view, admin_stats_view, admin_user_detail_view, admin_departments_view, admin_pool_stats_view, admin_query_stats_view, admin_bulk_delete_users_view, admin_availability_index_view, admin_health_card_cache_view, admin_booking_stats_view, admin_rebalance_view, admin_occupancy_view, admin_lab_stats_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/login/', user_login, name='user_login'),
+    path('api/logout/', user_logout, name='user_logout'),
+    path('api/me/', current_user, name='current_user'),
     path('api/register/', user_registration, name='user_registration'),
     path('api/make_appointment/', make_appointment_view, name='make_appointment'),
+    path('api/make_appointments/', make_appointments_view, name='make_appointments'),
     path('api/create_blood_test/', create_blood_test_view, name='create_blood_test'),
+    path('api/import_blood_tests/', import_blood_tests_view, name='import_blood_tests'),
     path('api/equipment/', get_equipment_view, name='get_equipment'),
     path('api/create_equipment/', create_equipment_view, name='create_equipment'),
     path('api/create_prescription/', create_prescripton_view, name='create_prescription'),
@@ -43,20 +51,55 @@ urlpatterns = [
     path('api/get_appointments/<str:patient_id>/', get_appointments_view),
     path('api/get_health_card/<str:patient_id>/', get_health_card_view),
     path('api/get_doctor_appointments/<str:doc_id>/', getDoctorAppointments),
+    path('api/doctor_schedule/<str:doc_id>/', get_doctor_schedule_view, name='doctor_schedule'),
     path('api/get_patient_balance/<str:patient_id>/', get_patient_balance_view, name='get_patient_balance'),
     path('api/filter_doctors_by_dept/', filter_doctors_by_dept_view, name='filter_doctors_by_dept'),
     path('api/list_available_timeslots_of_doctor/', list_available_timeslots_of_doctor_view, name='list_available_timeslots_of_doctor'),
+    path('api/search_availability/', search_availability_view, name='search_availability'),
     path('api/doctor_declare_unavailability/', doctor_declare_unavailability_view, name='doctor_declare_unavailability'),
+    path('api/doctor_declare_unavailability_range/', doctor_declare_unavailability_range_view, name='doctor_declare_unavailability_range'),
+    path('api/doctor_lift_unavailability/', doctor_lift_unavailability_view, name='doctor_lift_unavailability'),
+    path('api/waitlist/', join_waitlist_view, name='join_waitlist'),
+    path('api/waitlist/cancel/', cancel_waitlist_view, name='cancel_waitlist'),
+    path('api/waitlist/<str:patient_id>/', get_waitlist_view, name='get_waitlist'),
+    path('api/hold_slot/', hold_slot_view, name='hold_slot'),
+    path('api/release_hold/', release_hold_view, name='release_hold'),
     path('api/get_patient_blood_tests/<str:patient_id>/', get_patient_blood_tests_view, name='get_patient_blood_tests'),
     path('api/update_blood_test_results/', update_blood_test_results_view, name='update_blood_test_results'),
     path('api/get_recent_blood_tests/', get_recent_blood_tests_view, name='get_recent_blood_tests'),
+    path('api/lab_trends/<str:patient_id>/', get_lab_trends_view, name='lab_trends'),
     path('api/give_feedback/', give_feedback_view, name='give_feedback'),
+
+    # Async read endpoints (ASGI)
+    path('api/async/get_appointments/<str:patient_id>/', get_appointments_async_view),
+    path('api/async/get_doctor_appointments/<str:doc_id>/', get_doctor_appointments_async_view),
+    path('api/async/list_available_timeslots_of_doctor/', list_available_timeslots_of_doctor_async_view),
+    path('api/async/filter_doctors_by_dept/', filter_doctors_by_dept_async_view),
+    path('api/async/get_health_card/<str:patient_id>/', get_health_card_async_view),
+    path('api/async/equipment/', get_equipment_async_view),
+
+    # Streaming exports (NDJSON, or CSV with ?format=csv)
+    path('api/export/users/', export_users_view),
+    path('api/export/equipment/', export_equipment_view),
+    path('api/export/blood_tests/', export_blood_tests_view),
+    path('api/export/blood_tests/<str:patient_id>/', export_patient_blood_tests_view),
+    path('api/export/appointments/', export_appointments_view),
+    path('api/export/doctor_appointments/<str:doc_id>/', export_doctor_appointments_view),
     
     # Admin endpoints
     path('api/admin/users/', admin_users_view, name='admin_users'),
+    path('api/admin/users/bulk_delete/', admin_bulk_delete_users_view, name='admin_bulk_delete_users'),
     path('api/admin/users/<str:user_id>/', admin_user_detail_view, name='admin_user_detail'),
     path('api/admin/stats/', admin_stats_view, name='admin_stats'),
     path('api/admin/departments/', admin_departments_view, name='admin_departments'),
+    path('api/admin/occupancy/', admin_occupancy_view, name='admin_occupancy'),
+    path('api/admin/pool/', admin_pool_stats_view, name='admin_pool_stats'),
+    path('api/admin/queries/', admin_query_stats_view, name='admin_query_stats'),
+    path('api/admin/availability_index/', admin_availability_index_view, name='admin_availability_index'),
+    path('api/admin/health_card_cache/', admin_health_card_cache_view, name='admin_health_card_cache'),
+    path('api/admin/bookings/', admin_booking_stats_view, name='admin_booking_stats'),
+    path('api/admin/rebalance/', admin_rebalance_view, name='admin_rebalance'),
+    path('api/admin/lab_stats/', admin_lab_stats_view, name='admin_lab_stats'),
 ]
 
 
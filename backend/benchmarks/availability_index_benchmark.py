@@ -0,0 +1,80 @@
+"""
+Compares availability lookups through list_available_timeslots_of_doctor.sql
+with the in-memory availability index, and checks that both agree.
+
+Usage (from the backend directory, against a scratch database):
+    python benchmarks/availability_index_benchmark.py --lookups 20000
+"""
+import argparse
+import datetime
+import random
+import time
+
+from bench_data import BENCH_START_DATE, create_dataset, doctor_id, drop_dataset
+
+import availability_index
+from db_pool import get_connection, release_connection
+from doctor_declare_unavailability import declare_unavailability
+from list_available_timeslots_of_doctor import list_available_timeslots_of_doctor_sql
+
+DOCTORS = 200
+DAYS = 105
+
+
+def random_pairs(count: int, seed: int = 1) -> list:
+    """(doctor, date) pairs; dates run a week past the booked range so some days are free."""
+    rng = random.Random(seed)
+    start = datetime.date.fromisoformat(BENCH_START_DATE)
+    return [
+        (doctor_id(rng.randrange(DOCTORS)), str(start + datetime.timedelta(days=rng.randrange(DAYS + 7))))
+        for _ in range(count)
+    ]
+
+
+def lookups_per_second(pairs, lookup) -> float:
+    started = time.perf_counter()
+    for doc_id, date in pairs:
+        lookup(doc_id, date)
+    return len(pairs) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the availability index")
+    parser.add_argument('--lookups', type=int, default=20000)
+    parser.add_argument('--check', type=int, default=2000, help="Pairs compared with the SQL path")
+    parser.add_argument('--keep-data', action='store_true', help="Do not delete the benchmark rows afterwards")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        print("Loading ~1M appointments...")
+        create_dataset(conn, doctors=DOCTORS, days=DAYS)
+        # Free a few slots so lookups do not all return an empty list
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM appointment WHERE doc_id LIKE 'R%' AND random() < 0.2")
+
+        pairs = random_pairs(args.lookups)
+        sql_rate = lookups_per_second(pairs, list_available_timeslots_of_doctor_sql)
+        cold_rate = lookups_per_second(pairs, availability_index.available_slots)
+        warm_rate = lookups_per_second(pairs, availability_index.available_slots)
+        print(f"SQL query:        {sql_rate:12.0f} lookups/s")
+        print(f"index (cold):     {cold_rate:12.0f} lookups/s")
+        print(f"index (warm):     {warm_rate:12.0f} lookups/s  ({warm_rate / sql_rate:.0f}x)")
+        print(availability_index.index_stats())
+
+        # Incremental updates must keep the index in step with the database
+        for doc_id, date in random_pairs(50, seed=2):
+            declare_unavailability('TS010', doc_id, date)
+        mismatches = availability_index.check_consistency(random_pairs(args.check) + random_pairs(50, seed=2))
+        print(f"consistency check: {len(mismatches)} mismatches")
+        for mismatch in mismatches[:10]:
+            print(mismatch)
+    finally:
+        if not args.keep_data:
+            drop_dataset(conn)
+        release_connection(conn)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Synthetic data for the benchmark scripts in this folder.
+
+Run the benchmarks against a scratch database created with init_db.py and
+seed_db.py. Benchmark rows use their own ID prefixes ('Q' for patients,
+'R' for doctors) so they never collide with the seed data, and
+drop_dataset() removes them again.
+"""
+import os
+import sys
+
+# Make personalSettings and the sql_scripts modules importable
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.join(BACKEND_DIR, 'sql_scripts'))
+
+BENCH_START_DATE = '2030-01-01'
+
+
+def patient_id(i: int) -> str:
+    return 'Q' + str(i).zfill(4)
+
+
+def doctor_id(i: int) -> str:
+    return 'R' + str(i).zfill(4)
+
+
+def create_dataset(conn, patients: int = 10000, doctors: int = 200, days: int = 105, dept_id: str = 'D0001'):
+    """
+    Inserts `patients` patients, `doctors` doctors in department `dept_id` and
+    an appointment in every time slot of every doctor for `days` days starting
+    at BENCH_START_DATE. 200 doctors x 48 slots x 105 days is about a million
+    appointments.
+    """
+    with conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO "user" (u_id, name, surname, email_address, password, phone_no)
+                SELECT 'Q' || LPAD(i::TEXT, 4, '0'), 'Bench', 'Patient' || i,
+                       'bench.patient' || i || '@example.com', 'pass1234', NULL
+                FROM generate_series(0, %(patients)s - 1) AS i
+            """, {'patients': patients})
+            cur.execute("""
+                INSERT INTO patient (u_id, hc_id, balance)
+                SELECT 'Q' || LPAD(i::TEXT, 4, '0'), 'Q' || LPAD(i::TEXT, 4, '0'), 999999
+                FROM generate_series(0, %(patients)s - 1) AS i
+            """, {'patients': patients})
+            cur.execute("""
+                INSERT INTO "user" (u_id, name, surname, email_address, password, phone_no)
+                SELECT 'R' || LPAD(i::TEXT, 4, '0'), 'Bench', 'Doctor' || i,
+                       'bench.doctor' || i || '@example.com', 'pass1234', NULL
+                FROM generate_series(0, %(doctors)s - 1) AS i
+            """, {'doctors': doctors})
+            cur.execute("""
+                INSERT INTO doctor (u_id, d_id, rating, price, specialization)
+                SELECT 'R' || LPAD(i::TEXT, 4, '0'), %(dept_id)s, 4.0, 50 + i %% 30, 'Bench'
+                FROM generate_series(0, %(doctors)s - 1) AS i
+            """, {'doctors': doctors, 'dept_id': dept_id})
+
+            # Bulk load without charging every appointment through the balance trigger
+            cur.execute('ALTER TABLE appointment DISABLE TRIGGER trg_reduce_balance')
+            cur.execute("""
+                INSERT INTO appointment (patient_id, doc_id, ts_id, date)
+                SELECT 'Q' || LPAD(floor(random() * %(patients)s)::INT::TEXT, 4, '0'),
+                       'R' || LPAD(d::TEXT, 4, '0'),
+                       t.ts_id,
+                       %(start)s::DATE + day
+                FROM generate_series(0, %(doctors)s - 1) AS d
+                CROSS JOIN time_slot t
+                CROSS JOIN generate_series(0, %(days)s - 1) AS day
+            """, {'patients': patients, 'doctors': doctors, 'days': days, 'start': BENCH_START_DATE})
+            cur.execute('ALTER TABLE appointment ENABLE TRIGGER trg_reduce_balance')
+            cur.execute('ANALYZE')
+
+
+def drop_dataset(conn):
+    """Removes every row created by create_dataset()."""
+    with conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM waitlist WHERE patient_id LIKE 'Q%' OR doc_id LIKE 'R%'")
+            cur.execute("DELETE FROM slot_hold WHERE patient_id LIKE 'Q%' OR doc_id LIKE 'R%'")
+            cur.execute("DELETE FROM appointment WHERE patient_id LIKE 'Q%' OR doc_id LIKE 'R%'")
+            cur.execute("DELETE FROM unavailability WHERE doc_id LIKE 'R%'")
+            cur.execute("DELETE FROM feedback WHERE patient_id LIKE 'Q%' OR doc_id LIKE 'R%'")
+            cur.execute("DELETE FROM blood_test WHERE hc_id LIKE 'Q%'")
+            cur.execute("DELETE FROM patient WHERE u_id LIKE 'Q%'")
+            cur.execute("DELETE FROM health_card WHERE hc_id LIKE 'Q%'")
+            cur.execute("DELETE FROM doctor WHERE u_id LIKE 'R%'")
+            cur.execute("""DELETE FROM "user" WHERE u_id LIKE 'Q%' OR u_id LIKE 'R%'""")
@@ -0,0 +1,96 @@
+"""
+Fires thousands of parallel bookings at a handful of slots and checks that
+every slot was booked at most once and no balance went negative.
+
+Usage (from the backend directory, against a scratch database):
+    python benchmarks/booking_stress_test.py --bookings 5000 --workers 16
+
+Keep --workers at or below dbPoolMaxSize, otherwise threads also queue for
+pool connections.
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_data import create_dataset, doctor_id, drop_dataset, patient_id
+
+from booking_engine import BookingError, book, booking_stats
+from db_pool import get_connection, release_connection
+
+PATIENTS = 2000
+DOCTORS = 5
+DATE = '2031-06-01'
+SLOTS = ['TS%03d' % i for i in range(1, 11)]
+# Patients whose balance covers only two bookings
+POOR_PATIENTS = 100
+
+
+def attempt(patient: str, doctor: str, ts_id: str) -> str:
+    try:
+        return book(patient, doctor, ts_id, DATE)
+    except BookingError as e:
+        return e.status
+
+
+def check(conn) -> list:
+    problems = []
+    with conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT doc_id, ts_id, COUNT(*) FROM appointment
+                WHERE doc_id LIKE 'R%%' AND date = %s
+                GROUP BY doc_id, ts_id HAVING COUNT(*) > 1
+            """, [DATE])
+            problems += [f"double booking: {row}" for row in cur.fetchall()]
+            cur.execute("SELECT u_id, balance FROM patient WHERE u_id LIKE 'Q%' AND balance < 0")
+            problems += [f"negative balance: {row}" for row in cur.fetchall()]
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent booking stress test")
+    parser.add_argument('--bookings', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        create_dataset(conn, patients=PATIENTS, doctors=DOCTORS, days=0)
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE patient p SET balance = 2 * d.price
+                    FROM doctor d
+                    WHERE d.u_id = %s AND p.u_id < %s AND p.u_id LIKE 'Q%%'
+                """, [doctor_id(0), patient_id(POOR_PATIENTS)])
+
+        rng = random.Random(7)
+        jobs = [
+            (patient_id(rng.randrange(PATIENTS)), doctor_id(rng.randrange(DOCTORS)), rng.choice(SLOTS))
+            for _ in range(args.bookings)
+        ]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            results = list(executor.map(lambda job: attempt(*job), jobs))
+        elapsed = time.perf_counter() - started
+
+        outcomes = {}
+        for result in results:
+            outcomes[result] = outcomes.get(result, 0) + 1
+        print(f"{len(jobs)} bookings for {DOCTORS * len(SLOTS)} slots in {elapsed:.2f} s "
+              f"({len(jobs) / elapsed:.0f} bookings/s)")
+        print(f"outcomes: {outcomes}")
+        print(f"engine stats: {booking_stats()}")
+
+        problems = check(conn)
+        if outcomes.get('booked', 0) > DOCTORS * len(SLOTS):
+            problems.append("more bookings than slots")
+        print("OK: no double bookings, no negative balances" if not problems else "\n".join(problems))
+    finally:
+        drop_dataset(conn)
+        release_connection(conn)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Times deleting 10k users (9,800 patients and 200 doctors with their
+appointments) one call per user and in set-based batches.
+
+Usage (from the backend directory, against a scratch database):
+    python benchmarks/delete_users_benchmark.py --batch-size 1000
+"""
+import argparse
+import time
+
+from bench_data import create_dataset, doctor_id, drop_dataset, patient_id
+
+from admin_scripts import delete_user, delete_users
+from db_pool import get_connection, release_connection
+
+PATIENTS = 9800
+DOCTORS = 200
+DAYS = 10
+
+
+def user_ids() -> list:
+    return [patient_id(i) for i in range(PATIENTS)] + [doctor_id(i) for i in range(DOCTORS)]
+
+
+def load(conn):
+    create_dataset(conn, patients=PATIENTS, doctors=DOCTORS, days=DAYS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark user deletion")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    ids = user_ids()
+    conn = get_connection()
+    try:
+        print(f"Loading {len(ids)} users with {DOCTORS * 48 * DAYS} appointments...")
+        load(conn)
+        started = time.perf_counter()
+        for user_id in ids:
+            delete_user(user_id)
+        single = time.perf_counter() - started
+        print(f"one call per user:   {single:8.3f} s  ({len(ids) / single:8.0f} users/s)")
+
+        load(conn)
+        started = time.perf_counter()
+        deleted = delete_users(ids, batch_size=args.batch_size)
+        bulk = time.perf_counter() - started
+        print(f"batches of {args.batch_size:<6}    {bulk:8.3f} s  ({deleted / bulk:8.0f} users/s)")
+    finally:
+        drop_dataset(conn)
+        release_connection(conn)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Compares the old MAX()+1 user ID query with id_allocator.next_id(), on a
+"user" table filled with the benchmark dataset.
+
+Usage (from the backend directory, against a scratch database):
+    python benchmarks/id_allocator_benchmark.py --ids 20000 --workers 8
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_data import create_dataset, drop_dataset
+
+import id_allocator
+from db_pool import get_connection, release_connection
+
+PATIENTS = 50000
+
+# admin_scripts.create_user before it used the allocator, for comparison
+MAX_ID_SQL = """
+    SELECT 'U' || LPAD((COALESCE(MAX(CAST(SUBSTRING(u_id, 2) AS INTEGER)), 0) + 1)::TEXT, 4, '0')
+    FROM "user" WHERE u_id ~ '^U[0-9]{4}$'
+"""
+
+
+def max_plus_one(_):
+    conn = get_connection(readonly=True)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(MAX_ID_SQL)
+            return cur.fetchone()[0]
+    finally:
+        release_connection(conn)
+
+
+def ids_per_second(func, count: int, workers: int) -> tuple:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        ids = list(executor.map(func, range(count)))
+    return count / (time.perf_counter() - started), ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ID allocation")
+    parser.add_argument('--ids', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        create_dataset(conn, patients=PATIENTS, doctors=1, days=0)
+
+        before, _ = ids_per_second(max_plus_one, args.ids, args.workers)
+        after, ids = ids_per_second(lambda _: id_allocator.next_id('user'), args.ids, args.workers)
+        print(f"MAX()+1:     {before:10.0f} ids/s (and every concurrent caller gets the same id)")
+        print(f"next_id():   {after:10.0f} ids/s  ({after / before:.1f}x)")
+        print("unique" if len(set(ids)) == len(ids) else "DUPLICATE IDS")
+        print(id_allocator.allocator_stats())
+    finally:
+        drop_dataset(conn)
+        release_connection(conn)
+
+
+if __name__ == '__main__':
+    main()
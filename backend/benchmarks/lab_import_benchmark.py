@@ -0,0 +1,59 @@
+"""
+Compares the bulk blood test import (COPY into staging, one merge) with
+inserting the same results one staff_scripts.create_blood_test call at a time.
+About 1% of the generated rows are invalid, to check they are reported.
+
+Usage (from the backend directory, against a scratch database):
+    python benchmarks/lab_import_benchmark.py --patients 500 --rows 50000
+"""
+import argparse
+import io
+import random
+import time
+
+from bench_data import create_dataset, drop_dataset, patient_id
+
+import lab_import
+from db_pool import get_connection, release_connection
+from staff_scripts import create_blood_test
+
+
+def make_csv(patients: int, rows: int) -> str:
+    lines = ['patient_id,test_date,vitamins,minerals,cholesterol,glucose,hemoglobin,white_blood_cells,red_blood_cells']
+    for i in range(rows):
+        glucose = 'n/a' if i % 100 == 99 else f'{random.uniform(70, 130):.1f}'
+        lines.append(f'{patient_id(i % patients)},2030-01-{i % 28 + 1:02d},"A,D",Iron,'
+                     f'{random.uniform(150, 250):.1f},{glucose},{random.uniform(12, 18):.1f},'
+                     f'{random.uniform(4, 11):.1f},{random.uniform(4, 6):.2f}')
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bulk blood test import")
+    parser.add_argument('--patients', type=int, default=500)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--single', type=int, default=500, help="Rows inserted one call at a time for comparison")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        create_dataset(conn, patients=args.patients, doctors=1, days=0)
+
+        report = lab_import.import_blood_tests(io.StringIO(make_csv(args.patients, args.rows)), 'csv')
+        print(f"bulk: {report['imported']} of {report['rows']} rows imported, {report['rejected']} rejected, "
+              f"{report['rows_per_second']:,} rows/s {report['timings_ms']}")
+        expected = args.rows // 100
+        print("OK" if report['rejected'] == expected else f"expected {expected} rejects, got {report['rejected']}")
+
+        started = time.perf_counter()
+        for i in range(args.single):
+            create_blood_test(patient_id(i % args.patients), 'A,D', 'Iron', 180, 95, 14, 6, 5)
+        elapsed = time.perf_counter() - started
+        print(f"one at a time: {args.single} rows, {args.single / elapsed:,.0f} rows/s")
+    finally:
+        drop_dataset(conn)
+        release_connection(conn)
+
+
+if __name__ == '__main__':
+    main()
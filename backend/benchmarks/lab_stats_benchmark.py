@@ -0,0 +1,80 @@
+"""
+Times the population lab statistics job: a full rebuild over many blood
+tests, then an incremental run after a batch of new tests. Reports rows per
+second and the peak Python memory of each run (which should not grow with the
+number of tests), and checks the merged summaries against PostgreSQL's own
+aggregates.
+
+Usage (from the backend directory, against a scratch database):
+    python benchmarks/lab_stats_benchmark.py --patients 200 --tests 2000
+"""
+import argparse
+import math
+import tracemalloc
+
+from bench_data import create_dataset, drop_dataset, doctor_id
+from lab_trends_benchmark import insert_blood_tests
+
+import lab_stats
+from db_pool import get_connection, release_connection
+
+
+def timed_run(full: bool) -> dict:
+    tracemalloc.start()
+    run = lab_stats.run_lab_stats(full=full)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rate = run['rows_processed'] / run['elapsed_ms'] * 1000 if run['elapsed_ms'] else 0
+    print(f"{'full' if full else 'incremental'}: {run['rows_processed']} tests in {run['elapsed_ms']:.0f} ms "
+          f"({rate:,.0f} rows/s), {run['slices_updated']} slices, {run['outliers']} outliers, "
+          f"peak memory {peak / 1024 / 1024:.1f} MiB")
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the population lab statistics job")
+    parser.add_argument('--patients', type=int, default=200)
+    parser.add_argument('--tests', type=int, default=2000, help="Blood tests per patient")
+    parser.add_argument('--new', type=int, default=5, help="Patients whose tests arrive before the incremental run")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        create_dataset(conn, patients=args.patients, doctors=1, days=0)
+        insert_blood_tests(conn, args.patients - args.new, args.tests)
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("UPDATE blood_test SET doc_id = %s WHERE hc_id LIKE 'Q%%' AND random() < 0.5",
+                            (doctor_id(0),))
+        timed_run(full=True)
+
+        # The last patients' tests arrive after the full run
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO blood_test (bt_id, hc_id, doc_id, glucose, test_date)
+                    SELECT 'Q' || base36_encode(%(first)s * %(tests)s + n, 4),
+                           'Q' || LPAD((%(first)s + n %% %(new)s)::TEXT, 4, '0'),
+                           %(doctor)s, 85 + random() * 25, DATE '2000-01-01' + n / %(new)s
+                    FROM generate_series(0, %(new)s * %(tests)s - 1) AS n
+                """, {'first': args.patients - args.new, 'new': args.new, 'tests': args.tests,
+                      'doctor': doctor_id(0)})
+        timed_run(full=False)
+
+        stats = lab_stats.get_lab_stats(analyte='glucose', outliers=0)['groups'][0]['analytes']['glucose']
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT count(glucose), avg(glucose), stddev_samp(glucose) FROM blood_test")
+                n, mean, std = cur.fetchone()
+        agrees = (stats['n'] == n and math.isclose(stats['mean'], float(mean), abs_tol=1e-2)
+                  and math.isclose(stats['std'], float(std), abs_tol=1e-2))
+        print("OK" if agrees else f"glucose summary {stats} != n {n}, mean {mean}, std {std}")
+    finally:
+        drop_dataset(conn)
+        release_connection(conn)
+        # Forget the benchmark's tests
+        lab_stats.run_lab_stats(full=True)
+
+
+if __name__ == '__main__':
+    main()
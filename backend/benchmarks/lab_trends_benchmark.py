@@ -0,0 +1,109 @@
+"""
+Times lab_trends on patients with thousands of blood tests and compares the
+vectorized statistics with a plain per-row Python implementation of the same
+formulas (which also checks that both agree).
+
+Usage (from the backend directory, against a scratch database):
+    python benchmarks/lab_trends_benchmark.py --patients 20 --tests 5000
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+from bench_data import create_dataset, drop_dataset, patient_id
+
+import lab_trends
+from db_pool import get_connection, release_connection
+
+
+def insert_blood_tests(conn, patients: int, tests: int):
+    """`tests` results per patient on consecutive days, drifting around the reference ranges."""
+    with conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO blood_test (bt_id, hc_id, cholesterol, glucose, hemoglobin,
+                                        white_blood_cells, red_blood_cells, test_date)
+                SELECT 'Q' || base36_encode(p * %(tests)s + t, 4),
+                       'Q' || LPAD(p::TEXT, 4, '0'),
+                       180 + 40 * sin(t / 90.0) + random() * 20,
+                       85 + t * 0.004 + random() * 25,
+                       CASE WHEN random() < 0.05 THEN NULL ELSE 12 + random() * 6 END,
+                       4 + random() * 8,
+                       4.2 + random() * 2,
+                       DATE '2000-01-01' + t
+                FROM generate_series(0, %(patients)s - 1) AS p
+                CROSS JOIN generate_series(0, %(tests)s - 1) AS t
+            """, {'patients': patients, 'tests': tests})
+            cur.execute('ANALYZE blood_test')
+
+
+def loop_trends(days, values, window):
+    """The statistics of lab_trends.compute_trends, one row and one analyte at a time."""
+    result = {}
+    for j, name in enumerate(lab_trends.ANALYTES):
+        points = [(float(days[i] - days[0]), values[i][j]) for i in range(len(days)) if not math.isnan(values[i][j])]
+        x_mean = sum(x for x, _ in points) / len(points)
+        y_mean = sum(y for _, y in points) / len(points)
+        sxx = sum((x - x_mean) ** 2 for x, _ in points)
+        sxy = sum((x - x_mean) * (y - y_mean) for x, y in points)
+        rolling = []
+        for i in range(len(days)):
+            recent = [v[j] for v in values[max(0, i + 1 - window):i + 1] if not math.isnan(v[j])]
+            rolling.append(sum(recent) / len(recent) if recent else math.nan)
+        _, low, high = lab_trends.LAB_REFERENCE_RANGES[name]
+        flags = sum(1 for _, y in points if (low is not None and y < low) or (high is not None and y > high))
+        result[name] = (sxy / sxx * lab_trends.LAB_TREND_PERIOD_DAYS, rolling, flags)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark lab trend analytics")
+    parser.add_argument('--patients', type=int, default=20)
+    parser.add_argument('--tests', type=int, default=5000, help="Blood tests per patient")
+    parser.add_argument('--window', type=int, default=5)
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        create_dataset(conn, patients=args.patients, doctors=1, days=0)
+        insert_blood_tests(conn, args.patients, args.tests)
+
+        load = compute = 0.0
+        for i in range(args.patients):
+            trends = lab_trends.get_lab_trends(patient_id(i), args.window)
+            load += trends['timings_ms']['load']
+            compute += trends['timings_ms']['compute']
+        print(f"{args.patients} patients x {args.tests} tests: "
+              f"load {load / args.patients:.1f} ms, compute {compute / args.patients:.1f} ms per patient")
+
+        days, values = lab_trends.load_lab_series(patient_id(0))
+        started = time.perf_counter()
+        trends = lab_trends.compute_trends(days, values, args.window)
+        vectorized = time.perf_counter() - started
+        started = time.perf_counter()
+        expected = loop_trends(days, values.tolist(), args.window)
+        looped = time.perf_counter() - started
+        print(f"one patient: vectorized {vectorized * 1000:.1f} ms, per-row loops {looped * 1000:.1f} ms "
+              f"({looped / vectorized:.0f}x)")
+
+        problems = []
+        slope_key = f'slope_per_{lab_trends.LAB_TREND_PERIOD_DAYS}_days'
+        for name, (slope, rolling, flags) in expected.items():
+            analyte = trends['analytes'][name]
+            if not math.isclose(analyte[slope_key], slope, rel_tol=1e-3, abs_tol=1e-5):
+                problems.append(f"{name}: slope {analyte[slope_key]} != {slope}")
+            got = np.array(trends['series'][name]['rolling_average'], dtype=float)
+            if not np.allclose(got, rolling, atol=1e-3, equal_nan=True):
+                problems.append(f"{name}: rolling averages differ")
+            if analyte['below_range'] + analyte['above_range'] != flags:
+                problems.append(f"{name}: {flags} out of range, vectorized says "
+                                f"{analyte['below_range'] + analyte['above_range']}")
+        print("OK" if not problems else "\n".join(problems))
+    finally:
+        drop_dataset(conn)
+        release_connection(conn)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Compares login throughput of the old four-branch UNION query with the
+single-lookup login() and the u_id -> role cache behind user_cache.get_user().
+
+Usage (from the backend directory, against a scratch database):
+    python benchmarks/login_benchmark.py --logins 20000 --workers 8
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_data import create_dataset, drop_dataset, patient_id
+
+import user_cache
+from db_pool import get_connection, release_connection
+from login import login
+
+PATIENTS = 10000
+
+# login.sql before it was rewritten, for comparison
+UNION_LOGIN_SQL = """
+    (SELECT u.u_id, 'patient' AS role, u.name, u.surname FROM "user" u
+       JOIN patient p ON u.u_id = p.u_id WHERE u.email_address = %s AND u.password = %s)
+    UNION
+    (SELECT u.u_id, 'doctor' AS role, u.name, u.surname FROM "user" u
+       JOIN doctor d ON u.u_id = d.u_id WHERE u.email_address = %s AND u.password = %s)
+    UNION
+    (SELECT u.u_id, 'staff' AS role, u.name, u.surname FROM "user" u
+       JOIN staff s ON u.u_id = s.u_id WHERE u.email_address = %s AND u.password = %s)
+    UNION
+    (SELECT u.u_id, 'admin' AS role, u.name, u.surname FROM "user" u
+       JOIN admin a ON u.u_id = a.u_id WHERE u.email_address = %s AND u.password = %s)
+"""
+
+
+def union_login(email: str, password: str):
+    conn = get_connection(readonly=True)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(UNION_LOGIN_SQL, (email, password) * 4)
+            return cur.fetchone()
+    finally:
+        release_connection(conn)
+
+
+def logins_per_second(func, args_list, workers: int) -> float:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda args: func(*args), args_list))
+    elapsed = time.perf_counter() - started
+    if any(result is None for result in results):
+        raise RuntimeError(f"{func.__name__}: some logins failed")
+    return len(args_list) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark login")
+    parser.add_argument('--logins', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    credentials = [('bench.patient%d@example.com' % (i % PATIENTS), 'pass1234') for i in range(args.logins)]
+    user_ids = [(patient_id(i % PATIENTS),) for i in range(args.logins)]
+    conn = get_connection()
+    try:
+        create_dataset(conn, patients=PATIENTS, doctors=1, days=0)
+
+        before = logins_per_second(union_login, credentials, args.workers)
+        after = logins_per_second(login, credentials, args.workers)
+        print(f"UNION query:      {before:10.0f} logins/s")
+        print(f"single lookup:    {after:10.0f} logins/s  ({after / before:.1f}x)")
+
+        user_cache.invalidate()
+        cold = logins_per_second(user_cache.get_user, user_ids, args.workers)
+        warm = logins_per_second(user_cache.get_user, user_ids, args.workers)
+        print(f"role lookup cold: {cold:10.0f} lookups/s")
+        print(f"role lookup warm: {warm:10.0f} lookups/s")
+        print(user_cache.cache_stats())
+    finally:
+        drop_dataset(conn)
+        release_connection(conn)
+
+
+if __name__ == '__main__':
+    main()
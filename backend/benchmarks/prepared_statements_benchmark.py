@@ -0,0 +1,80 @@
+"""
+Compares plain execution of the hot SQL templates with server-side prepared
+statements on a dataset of about a million appointments.
+
+Usage (from the backend directory, against a scratch database):
+    python benchmarks/prepared_statements_benchmark.py --iterations 2000
+"""
+import argparse
+import re
+import time
+
+from bench_data import BENCH_START_DATE, create_dataset, doctor_id, drop_dataset, patient_id
+
+from db_pool import get_connection, release_connection
+from prepared_statements import PREPARED_TEMPLATES, execute_prepared
+from sql_registry import execute as execute_sql, get_sql
+
+PLANNING_TIME = re.compile(r'Planning Time: ([\d.]+) ms')
+
+
+def sample_params(name: str, i: int):
+    patient = patient_id(i % 1000)
+    doctor = doctor_id(i % 200)
+    if name == 'login':
+        return {'email': 'bench.patient%d@example.com' % (i % 1000), 'password': 'pass1234'}
+    if name == 'list_available_timeslots_of_doctor':
+        return {'doc_id': doctor, 'date': BENCH_START_DATE}
+    if name == 'make_appointment':
+        # Outside the benchmark date range so the slot is always free
+        return {'patient_id': patient, 'doc_id': doctor, 'ts_id': 'TS001', 'date': '2031-01-01', 'lock_timeout_ms': 2000}
+    if name == 'filter_doctors_by_dept':
+        return ['Cardiology']
+    return [patient]
+
+
+def run(conn, name: str, iterations: int, runner) -> float:
+    started = time.perf_counter()
+    with conn.cursor() as cur:
+        for i in range(iterations):
+            runner(cur, name, sample_params(name, i))
+            if cur.description:
+                cur.fetchall()
+            conn.rollback()
+    return (time.perf_counter() - started) * 1000 / iterations
+
+
+def planning_time(conn, name: str) -> float:
+    with conn.cursor() as cur:
+        cur.execute('EXPLAIN (ANALYZE) ' + get_sql(name), sample_params(name, 0))
+        plan = '\n'.join(row[0] for row in cur.fetchall())
+    conn.rollback()
+    match = PLANNING_TIME.search(plan)
+    return float(match.group(1)) if match else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prepared statements")
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--keep-data', action='store_true', help="Do not delete the benchmark rows afterwards")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        print("Loading ~1M appointments...")
+        create_dataset(conn)
+        print(f"{'template':45} {'plan ms':>8} {'plain ms':>9} {'prepared ms':>12} {'saved':>7}")
+        for name in PREPARED_TEMPLATES:
+            planning = planning_time(conn, name)
+            plain = run(conn, name, args.iterations, execute_sql)
+            prepared = run(conn, name, args.iterations, execute_prepared)
+            saved = (plain - prepared) / plain * 100 if plain else 0.0
+            print(f"{name:45} {planning:8.3f} {plain:9.3f} {prepared:12.3f} {saved:6.1f}%")
+    finally:
+        if not args.keep_data:
+            drop_dataset(conn)
+        release_connection(conn)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Closes half of a department for a week and times moving every clashing
+appointment to the other doctors, then checks the result: no slot booked
+twice, no patient in two places at once, no clash left unhandled silently.
+
+Usage (from the backend directory, against a scratch database):
+    python benchmarks/rebalance_benchmark.py --doctors 40 --closed 20 --days 21
+"""
+import argparse
+import datetime
+import time
+
+from bench_data import BENCH_START_DATE, create_dataset, doctor_id, drop_dataset
+
+from db_pool import get_connection, release_connection
+from doctor_declare_unavailability import declare_unavailability_range
+from rebalance import rebalance_clashes
+
+PATIENTS = 5000
+# Share of slots left booked before the closure
+OCCUPANCY = 0.5
+
+
+def check(conn) -> list:
+    problems = []
+    with conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT patient_id, date, ts_id, COUNT(*) FROM appointment
+                WHERE patient_id LIKE 'Q%%' AND date >= %s
+                GROUP BY patient_id, date, ts_id HAVING COUNT(*) > 1
+            """, [BENCH_START_DATE])
+            problems += [f"patient booked twice in one slot: {row}" for row in cur.fetchall()]
+            cur.execute("SELECT u_id, balance FROM patient WHERE u_id LIKE 'Q%' AND balance < 0")
+            problems += [f"negative balance: {row}" for row in cur.fetchall()]
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rescheduling after a closure")
+    parser.add_argument('--doctors', type=int, default=40)
+    parser.add_argument('--closed', type=int, default=20, help="Doctors closed for the week")
+    parser.add_argument('--days', type=int, default=21)
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        create_dataset(conn, patients=PATIENTS, doctors=args.doctors, days=args.days)
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM appointment WHERE doc_id LIKE 'R%%' AND random() > %s", [OCCUPANCY])
+                cur.execute('ANALYZE appointment')
+
+        closed_from = datetime.date.fromisoformat(BENCH_START_DATE) + datetime.timedelta(days=args.days // 3)
+        closed_to = closed_from + datetime.timedelta(days=6)
+        started = time.perf_counter()
+        clashes = 0
+        for i in range(args.closed):
+            summary = declare_unavailability_range(doctor_id(i), str(closed_from), str(closed_to))
+            clashes += summary['clashes']['appointments']
+        print(f"closure of {args.closed} doctors declared in {time.perf_counter() - started:.2f} s, "
+              f"{clashes} clashing appointments")
+
+        started = time.perf_counter()
+        result = rebalance_clashes()
+        elapsed = time.perf_counter() - started
+        print(f"rebalanced in {elapsed:.2f} s: moved {result['moved']} of {result['clashes']}, "
+              f"{len(result['unassigned'])} unassigned, average {result['average_days_moved']} days moved")
+        print(f"timings (ms): {result['timings_ms']}")
+
+        problems = check(conn)
+        if rebalance_clashes(dry_run=True)['clashes'] != len(result['unassigned']):
+            problems.append("clashes left that were neither moved nor reported")
+        print("OK" if not problems else "\n".join(problems))
+    finally:
+        drop_dataset(conn)
+        release_connection(conn)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Measures what session tokens add to each request: issuing a token at login,
+verifying one on its own, and a request passing through
+SessionTokenMiddleware compared with the same request without it.
+
+Usage (from the backend directory, against a scratch database):
+    python benchmarks/session_token_benchmark.py --requests 50000
+"""
+import argparse
+import os
+import time
+
+import bench_data  # noqa: F401  (puts the backend folders on sys.path)
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+import django
+
+django.setup()
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from api.middleware import SessionTokenMiddleware
+from api.session_tokens import issue_token, verify_token
+from session_revocation import revocation_stats
+
+
+def per_call_us(func, count: int) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        func()
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark session token verification")
+    parser.add_argument('--requests', type=int, default=50000)
+    args = parser.parse_args()
+
+    token = issue_token('Q0001', 'patient')
+    factory = RequestFactory()
+    request = factory.get('/api/get_appointments/Q0001/', HTTP_AUTHORIZATION=f'Bearer {token}')
+    view = lambda request: HttpResponse('ok')
+    middleware = SessionTokenMiddleware(view)
+
+    # First call loads the revocation list from the database
+    verify_token(token)
+
+    issue = per_call_us(lambda: issue_token('Q0001', 'patient'), args.requests)
+    verify = per_call_us(lambda: verify_token(token), args.requests)
+    bare = per_call_us(lambda: view(request), args.requests)
+    wrapped = per_call_us(lambda: middleware(request), args.requests)
+    print(f"issue token:             {issue:8.2f} us")
+    print(f"verify token:            {verify:8.2f} us")
+    print(f"request without tokens:  {bare:8.2f} us")
+    print(f"request with middleware: {wrapped:8.2f} us  (+{wrapped - bare:.2f} us per request)")
+    print(f"token length: {len(token)} characters")
+    print(revocation_stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,2 @@
+-- Delete users (array of u_id) with all dependent rows; returns the number removed
+SELECT delete_users(%s::CHAR(5)[]);
@@ -0,0 +1,13 @@
+-- Booked and unavailable slots per department between two dates, from doctor_day_schedule
+SELECT
+    dept.d_id,
+    dept.dept_name,
+    COUNT(DISTINCT d.u_id) AS doctors,
+    COALESCE(SUM(s.booked), 0) AS booked,
+    COALESCE(SUM(s.unavailable), 0) AS unavailable
+FROM department dept
+JOIN doctor d ON d.d_id = dept.d_id
+LEFT JOIN doctor_day_schedule s
+       ON s.doc_id = d.u_id AND s.date BETWEEN %(start_date)s::DATE AND %(end_date)s::DATE
+GROUP BY dept.d_id, dept.dept_name
+ORDER BY dept.dept_name;
@@ -0,0 +1,36 @@
+-- One page of users in u_id order, starting after the cursor u_id.
+-- Filters left NULL are ignored; name and email are lower-case LIKE prefixes.
+SELECT
+    u.u_id,
+    u.name,
+    u.surname,
+    u.email_address,
+    u.phone_no,
+    CASE
+        WHEN p.u_id IS NOT NULL THEN 'patient'
+        WHEN d.u_id IS NOT NULL THEN 'doctor'
+        WHEN s.u_id IS NOT NULL THEN 'staff'
+        WHEN a.u_id IS NOT NULL THEN 'admin'
+        ELSE 'unknown'
+    END AS role,
+    d.specialization,
+    d.price,
+    d.d_id,
+    p.balance
+FROM "user" u
+LEFT JOIN patient p ON u.u_id = p.u_id
+LEFT JOIN doctor d ON u.u_id = d.u_id
+LEFT JOIN staff s ON u.u_id = s.u_id
+LEFT JOIN admin a ON u.u_id = a.u_id
+WHERE (%(after)s::CHAR(5) IS NULL OR u.u_id > %(after)s)
+  AND (%(name)s::TEXT IS NULL
+       OR lower(u.name) LIKE %(name)s
+       OR lower(u.surname) LIKE %(name)s)
+  AND (%(email)s::TEXT IS NULL OR lower(u.email_address) LIKE %(email)s)
+  AND (%(role)s::TEXT IS NULL
+       OR (%(role)s = 'patient' AND p.u_id IS NOT NULL)
+       OR (%(role)s = 'doctor' AND d.u_id IS NOT NULL)
+       OR (%(role)s = 'staff' AND s.u_id IS NOT NULL)
+       OR (%(role)s = 'admin' AND a.u_id IS NOT NULL))
+ORDER BY u.u_id
+LIMIT %(limit)s;
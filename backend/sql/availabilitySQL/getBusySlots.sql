@@ -0,0 +1,18 @@
+-- Time slots of a doctor on a date that are booked, declared unavailable or held,
+-- read from the precomputed doctor_day_schedule row.
+-- held_until (seconds since the epoch) is set for holds only.
+WITH slots AS (
+    SELECT array_agg(ts_id ORDER BY start_time, ts_id) AS ts_ids
+    FROM time_slot
+)
+SELECT slots.ts_ids[st.pos] AS ts_id, NULL::DOUBLE PRECISION AS held_until
+FROM doctor_day_schedule s
+CROSS JOIN slots
+CROSS JOIN LATERAL unnest(s.slot_states) WITH ORDINALITY AS st(state, pos)
+WHERE s.doc_id = %(doc_id)s AND s.date = %(date)s AND st.state <> 0
+
+UNION ALL
+
+SELECT h.ts_id, EXTRACT(EPOCH FROM h.expires_at)::DOUBLE PRECISION
+FROM slot_hold h
+WHERE h.doc_id = %(doc_id)s AND h.date = %(date)s AND h.expires_at > now();
@@ -0,0 +1,4 @@
+-- All time slots in the order they are shown to patients
+SELECT ts_id, start_time, end_time
+FROM time_slot
+ORDER BY start_time, ts_id;
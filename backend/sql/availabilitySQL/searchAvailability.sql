@@ -0,0 +1,43 @@
+-- Free time slots of several doctors over a date range, earliest first.
+-- Doctors come from a department name or an array of u_id (NULL = not used).
+WITH doctors AS (
+    SELECT d.u_id, u.name, u.surname, d.specialization, d.price
+    FROM doctor d
+    JOIN "user" u ON u.u_id = d.u_id
+    -- LEFT: doctors without a department can still be searched by doc_ids
+    LEFT JOIN department dept ON dept.d_id = d.d_id
+    WHERE (%(dept_name)s::TEXT IS NULL OR dept.dept_name = %(dept_name)s)
+      AND (%(doc_ids)s::CHAR(5)[] IS NULL OR d.u_id = ANY(%(doc_ids)s::CHAR(5)[]))
+),
+days AS (
+    SELECT day::DATE AS date
+    FROM generate_series(%(start_date)s::DATE, %(end_date)s::DATE, INTERVAL '1 day') AS day
+)
+SELECT
+    doc.u_id AS doctor_id,
+    doc.name AS doctor_name,
+    doc.surname AS doctor_surname,
+    doc.specialization,
+    doc.price,
+    days.date,
+    t.ts_id,
+    t.start_time,
+    t.end_time
+FROM doctors doc
+CROSS JOIN days
+CROSS JOIN time_slot t
+WHERE NOT EXISTS (
+        SELECT 1 FROM appointment a
+        WHERE a.doc_id = doc.u_id AND a.date = days.date AND a.ts_id = t.ts_id
+    )
+  AND NOT EXISTS (
+        SELECT 1 FROM unavailability ua
+        WHERE ua.doc_id = doc.u_id AND ua.date = days.date AND ua.ts_id = t.ts_id
+    )
+  AND NOT EXISTS (
+        SELECT 1 FROM slot_hold h
+        WHERE h.doc_id = doc.u_id AND h.date = days.date AND h.ts_id = t.ts_id
+          AND h.expires_at > now()
+    )
+ORDER BY days.date, t.start_time, doc.u_id
+LIMIT %(limit)s;
@@ -0,0 +1,28 @@
+-- Price and availability of each requested (doc_id, ts_id, date), in request order
+WITH items AS (
+    SELECT *
+    FROM unnest(%(doc_ids)s::CHAR(5)[], %(ts_ids)s::CHAR(5)[], %(dates)s::DATE[])
+        WITH ORDINALITY AS i(doc_id, ts_id, date, idx)
+)
+SELECT
+    i.idx,
+    d.u_id IS NOT NULL AS doctor_exists,
+    d.price,
+    t.ts_id IS NOT NULL AS slot_exists,
+    EXISTS (
+        SELECT 1 FROM appointment a
+        WHERE a.doc_id = i.doc_id AND a.date = i.date AND a.ts_id = i.ts_id
+    ) AS taken,
+    EXISTS (
+        SELECT 1 FROM unavailability ua
+        WHERE ua.doc_id = i.doc_id AND ua.date = i.date AND ua.ts_id = i.ts_id
+    ) AS unavailable,
+    EXISTS (
+        SELECT 1 FROM slot_hold h
+        WHERE h.doc_id = i.doc_id AND h.date = i.date AND h.ts_id = i.ts_id
+          AND h.expires_at > now() AND h.patient_id <> %(patient_id)s
+    ) AS held
+FROM items i
+LEFT JOIN doctor d ON d.u_id = i.doc_id
+LEFT JOIN time_slot t ON t.ts_id = i.ts_id
+ORDER BY i.idx;
@@ -0,0 +1,16 @@
+-- Book several slots for one patient with one multi-row insert (trg_reduce_balance charges each row).
+-- Slots booked concurrently by someone else are skipped and missing from the result.
+-- The patient's holds on the booked slots are released in the same statement.
+WITH booked AS (
+    INSERT INTO appointment (patient_id, doc_id, ts_id, date)
+    SELECT %(patient_id)s, i.doc_id, i.ts_id, i.date
+    FROM unnest(%(doc_ids)s::CHAR(5)[], %(ts_ids)s::CHAR(5)[], %(dates)s::DATE[]) AS i(doc_id, ts_id, date)
+    ON CONFLICT (doc_id, date, ts_id) DO NOTHING
+    RETURNING doc_id, ts_id, date
+),
+released AS (
+    DELETE FROM slot_hold h
+    USING booked b
+    WHERE h.doc_id = b.doc_id AND h.date = b.date AND h.ts_id = b.ts_id
+)
+SELECT doc_id, ts_id, date FROM booked;
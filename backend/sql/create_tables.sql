@@ -67,7 +67,7 @@ CREATE TABLE IF NOT EXISTS appointment (
 
 -- Doctor unavailability
 CREATE TABLE IF NOT EXISTS unavailability (
-    ua_id CHAR(5) PRIMARY KEY,
+    ua_id VARCHAR(8) PRIMARY KEY,
     ts_id CHAR(5),
     doc_id CHAR(5),
     date DATE NOT NULL,
@@ -103,7 +103,7 @@ CREATE TABLE IF NOT EXISTS presc_medication (
 
 -- Blood tests
 CREATE TABLE IF NOT EXISTS blood_test (
-    bt_id CHAR(5) PRIMARY KEY,
+    bt_id VARCHAR(8) PRIMARY KEY,
     hc_id CHAR(5) REFERENCES health_card(hc_id),
     vitamins VARCHAR(100),
     minerals VARCHAR(100),
@@ -205,3 +205,559 @@ DROP TRIGGER IF EXISTS trg_increment_department ON doctor;
 CREATE TRIGGER trg_increment_department
 AFTER INSERT ON doctor
 FOR EACH ROW EXECUTE FUNCTION increment_department_count();
+
+
+-- A doctor time slot on a date can be booked once. Databases created before
+-- this index may already hold double bookings; stop with a list of them rather
+-- than a bare index error (see documentation/databaseCreation.txt to clean up)
+DO $$
+DECLARE
+    duplicates TEXT;
+BEGIN
+    IF to_regclass('uq_appointment_doctor_slot') IS NOT NULL THEN
+        RETURN;
+    END IF;
+    SELECT string_agg(format('%s %s %s (patients %s)', doc_id, date, ts_id, patients), E'\n')
+    INTO duplicates
+    FROM (
+        SELECT doc_id, date, ts_id, string_agg(patient_id, ', ' ORDER BY patient_id) AS patients
+        FROM appointment
+        GROUP BY doc_id, date, ts_id
+        HAVING COUNT(*) > 1
+        ORDER BY doc_id, date, ts_id
+    ) d;
+    IF duplicates IS NOT NULL THEN
+        RAISE EXCEPTION 'Double-booked appointments must be removed before uq_appointment_doctor_slot can be created:%', E'\n' || duplicates;
+    END IF;
+END;
+$$;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_appointment_doctor_slot ON appointment (doc_id, date, ts_id);
+
+-- Indexes on the foreign key columns used when deleting users
+-- (uq_appointment_doctor_slot and the doctor/date one also serve the availability lookups)
+CREATE INDEX IF NOT EXISTS idx_feedback_patient_id ON feedback (patient_id);
+CREATE INDEX IF NOT EXISTS idx_feedback_doc_id ON feedback (doc_id);
+CREATE INDEX IF NOT EXISTS idx_unavailability_doc_date ON unavailability (doc_id, date, ts_id);
+CREATE INDEX IF NOT EXISTS idx_prescription_hc_id ON prescription (hc_id);
+CREATE INDEX IF NOT EXISTS idx_prescription_doc_id ON prescription (doc_id);
+CREATE INDEX IF NOT EXISTS idx_presc_medication_p_id ON presc_medication (p_id);
+CREATE INDEX IF NOT EXISTS idx_blood_test_hc_id ON blood_test (hc_id);
+
+-- Indexes for the prefix filters of the admin user listing
+CREATE INDEX IF NOT EXISTS idx_user_name_lower ON "user" (lower(name) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_user_surname_lower ON "user" (lower(surname) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_user_email_lower ON "user" (lower(email_address) text_pattern_ops);
+
+-- Function: delete users and every row that references them in one call.
+-- Works on a whole array of IDs with one statement per table.
+CREATE OR REPLACE FUNCTION delete_users(user_ids CHAR(5)[])
+RETURNS INT AS $$
+DECLARE
+    card_ids CHAR(5)[];
+    deleted INT;
+BEGIN
+    SELECT array_agg(hc_id) INTO card_ids
+    FROM patient WHERE u_id = ANY(user_ids) AND hc_id IS NOT NULL;
+
+    -- Leave the waitlist first so the slots freed below are not handed to these users
+    DELETE FROM waitlist WHERE patient_id = ANY(user_ids) OR doc_id = ANY(user_ids);
+    DELETE FROM slot_hold WHERE patient_id = ANY(user_ids) OR doc_id = ANY(user_ids);
+    DELETE FROM feedback WHERE patient_id = ANY(user_ids) OR doc_id = ANY(user_ids);
+    DELETE FROM appointment WHERE patient_id = ANY(user_ids) OR doc_id = ANY(user_ids);
+
+    DELETE FROM presc_medication WHERE p_id IN (
+        SELECT p_id FROM prescription WHERE hc_id = ANY(card_ids) OR doc_id = ANY(user_ids)
+    );
+    DELETE FROM prescription WHERE hc_id = ANY(card_ids) OR doc_id = ANY(user_ids);
+    DELETE FROM blood_test WHERE hc_id = ANY(card_ids);
+
+    DELETE FROM unavailability WHERE doc_id = ANY(user_ids);
+    DELETE FROM usage_log WHERE doc_id = ANY(user_ids);
+    DELETE FROM doctor_report WHERE doc_id = ANY(user_ids);
+
+    -- Undo increment_department_count for the doctors that go away
+    UPDATE department d SET employee_count = d.employee_count - gone.n
+    FROM (
+        SELECT d_id, COUNT(*) AS n FROM doctor WHERE u_id = ANY(user_ids) GROUP BY d_id
+    ) gone
+    WHERE d.d_id = gone.d_id;
+
+    DELETE FROM patient WHERE u_id = ANY(user_ids);
+    DELETE FROM doctor WHERE u_id = ANY(user_ids);
+    DELETE FROM staff WHERE u_id = ANY(user_ids);
+    DELETE FROM admin WHERE u_id = ANY(user_ids);
+    DELETE FROM health_card WHERE hc_id = ANY(card_ids);
+
+    DELETE FROM "user" WHERE u_id = ANY(user_ids);
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+    RETURN deleted;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Slot holds: a slot reserved for one patient while they check out.
+-- Expired holds are simply ignored by every reader and are overwritten by the
+-- next hold of the same slot; no sweeper is needed.
+CREATE TABLE IF NOT EXISTS slot_hold (
+    doc_id CHAR(5) NOT NULL REFERENCES doctor(u_id),
+    date DATE NOT NULL,
+    ts_id CHAR(5) NOT NULL REFERENCES time_slot(ts_id),
+    patient_id CHAR(5) NOT NULL REFERENCES patient(u_id),
+    expires_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (doc_id, date, ts_id)
+);
+CREATE INDEX IF NOT EXISTS idx_slot_hold_expires_at ON slot_hold (expires_at);
+CREATE INDEX IF NOT EXISTS idx_slot_hold_patient ON slot_hold (patient_id);
+
+-- Function: book an appointment in one call.
+-- The patient row is locked while the balance is checked so concurrent bookings
+-- cannot overdraw it, and uq_appointment_doctor_slot lets exactly one booking
+-- of a slot win. Returns 'booked' or the reason the booking was refused.
+CREATE OR REPLACE FUNCTION book_appointment(p_patient_id CHAR(5), p_doc_id CHAR(5), p_ts_id CHAR(5), p_date DATE, p_lock_timeout_ms INT DEFAULT 2000)
+RETURNS TEXT AS $$
+DECLARE
+    patient_balance NUMERIC(8,2);
+    doctor_price NUMERIC(5,0);
+BEGIN
+    -- Give up quickly instead of queueing behind a long lock
+    PERFORM set_config('lock_timeout', p_lock_timeout_ms || 'ms', true);
+
+    SELECT price INTO doctor_price FROM doctor WHERE u_id = p_doc_id;
+    IF NOT FOUND THEN
+        RETURN 'doctor_not_found';
+    END IF;
+    IF doctor_price IS NULL THEN
+        RETURN 'price_not_set';
+    END IF;
+
+    SELECT balance INTO patient_balance FROM patient WHERE u_id = p_patient_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN 'patient_not_found';
+    END IF;
+    IF patient_balance < doctor_price THEN
+        RETURN 'insufficient_balance';
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM unavailability WHERE doc_id = p_doc_id AND date = p_date AND ts_id = p_ts_id) THEN
+        RETURN 'doctor_unavailable';
+    END IF;
+    IF EXISTS (
+        SELECT 1 FROM slot_hold
+        WHERE doc_id = p_doc_id AND date = p_date AND ts_id = p_ts_id
+          AND expires_at > now() AND patient_id <> p_patient_id
+    ) THEN
+        RETURN 'slot_held';
+    END IF;
+
+    -- trg_reduce_balance charges the patient
+    INSERT INTO appointment (patient_id, doc_id, ts_id, date)
+    VALUES (p_patient_id, p_doc_id, p_ts_id, p_date)
+    ON CONFLICT (doc_id, date, ts_id) DO NOTHING;
+    IF NOT FOUND THEN
+        RETURN 'slot_taken';
+    END IF;
+    DELETE FROM slot_hold WHERE doc_id = p_doc_id AND date = p_date AND ts_id = p_ts_id;
+    RETURN 'booked';
+END;
+$$ LANGUAGE plpgsql;
+
+-- Waitlist: one row per patient, doctor and day the patient would accept.
+-- Rows registered together share a request_id; once one of them gets a slot
+-- the others are cancelled.
+CREATE SEQUENCE IF NOT EXISTS waitlist_request_seq;
+
+CREATE TABLE IF NOT EXISTS waitlist (
+    w_id BIGSERIAL PRIMARY KEY,
+    request_id BIGINT NOT NULL,
+    patient_id CHAR(5) NOT NULL REFERENCES patient(u_id),
+    doc_id CHAR(5) NOT NULL REFERENCES doctor(u_id),
+    date DATE NOT NULL,
+    priority INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT now(),
+    status VARCHAR(10) NOT NULL DEFAULT 'waiting',  -- waiting, booked, skipped, cancelled
+    ts_id CHAR(5) REFERENCES time_slot(ts_id)       -- slot handed over when booked
+);
+
+-- Head of the queue for a freed (doctor, date) is the first entry of this index
+CREATE INDEX IF NOT EXISTS idx_waitlist_queue ON waitlist (doc_id, date, priority DESC, created_at, w_id)
+    WHERE status = 'waiting';
+CREATE INDEX IF NOT EXISTS idx_waitlist_request ON waitlist (request_id);
+CREATE INDEX IF NOT EXISTS idx_waitlist_patient ON waitlist (patient_id);
+
+-- Function: give a freed slot to the first waitlisted patient who can pay for it.
+-- Returns the patient who got the slot, or NULL.
+CREATE OR REPLACE FUNCTION hand_off_slot(p_doc_id CHAR(5), p_ts_id CHAR(5), p_date DATE)
+RETURNS CHAR(5) AS $$
+DECLARE
+    doctor_price NUMERIC(5,0);
+    head RECORD;
+BEGIN
+    IF p_date < CURRENT_DATE
+       OR EXISTS (SELECT 1 FROM appointment WHERE doc_id = p_doc_id AND date = p_date AND ts_id = p_ts_id)
+       OR EXISTS (SELECT 1 FROM unavailability WHERE doc_id = p_doc_id AND date = p_date AND ts_id = p_ts_id)
+       -- A patient holding the slot at checkout keeps it
+       OR EXISTS (SELECT 1 FROM slot_hold
+                  WHERE doc_id = p_doc_id AND date = p_date AND ts_id = p_ts_id AND expires_at > now()) THEN
+        RETURN NULL;
+    END IF;
+    SELECT price INTO doctor_price FROM doctor WHERE u_id = p_doc_id;
+    IF doctor_price IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    LOOP
+        SELECT w.w_id, w.request_id, w.patient_id INTO head
+        FROM waitlist w
+        WHERE w.doc_id = p_doc_id AND w.date = p_date AND w.status = 'waiting'
+        ORDER BY w.priority DESC, w.created_at, w.w_id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED;
+        IF NOT FOUND THEN
+            RETURN NULL;
+        END IF;
+
+        PERFORM 1 FROM patient
+        WHERE u_id = head.patient_id AND balance >= doctor_price
+        FOR UPDATE;
+        IF FOUND THEN
+            -- trg_reduce_balance charges the patient
+            INSERT INTO appointment (patient_id, doc_id, ts_id, date)
+            VALUES (head.patient_id, p_doc_id, p_ts_id, p_date)
+            ON CONFLICT DO NOTHING;
+            IF NOT FOUND THEN
+                RETURN NULL;
+            END IF;
+            UPDATE waitlist SET status = 'booked', ts_id = p_ts_id WHERE w_id = head.w_id;
+            UPDATE waitlist SET status = 'cancelled'
+            WHERE request_id = head.request_id AND status = 'waiting';
+            RETURN head.patient_id;
+        END IF;
+
+        -- Cannot pay: skip this entry and offer the slot to the next one
+        UPDATE waitlist SET status = 'skipped' WHERE w_id = head.w_id;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger: offer slots freed by deleted appointments or lifted unavailability.
+-- Statement level, so bulk deletes only visit the freed slots that have waiters.
+CREATE OR REPLACE FUNCTION offer_freed_slots()
+RETURNS TRIGGER AS $$
+DECLARE
+    freed_slot RECORD;
+BEGIN
+    FOR freed_slot IN
+        SELECT DISTINCT f.doc_id, f.ts_id, f.date
+        FROM freed f
+        WHERE EXISTS (
+            SELECT 1 FROM waitlist w
+            WHERE w.doc_id = f.doc_id AND w.date = f.date AND w.status = 'waiting'
+        )
+        ORDER BY f.date, f.ts_id
+    LOOP
+        PERFORM hand_off_slot(freed_slot.doc_id, freed_slot.ts_id, freed_slot.date);
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_offer_freed_appointment ON appointment;
+CREATE TRIGGER trg_offer_freed_appointment
+AFTER DELETE ON appointment
+REFERENCING OLD TABLE AS freed
+FOR EACH STATEMENT EXECUTE FUNCTION offer_freed_slots();
+
+DROP TRIGGER IF EXISTS trg_offer_freed_unavailability ON unavailability;
+CREATE TRIGGER trg_offer_freed_unavailability
+AFTER DELETE ON unavailability
+REFERENCING OLD TABLE AS freed
+FOR EACH STATEMENT EXECUTE FUNCTION offer_freed_slots();
+
+-- Doctor day schedule: one row per doctor and date with the state of every
+-- time slot, in time_slot order (start_time, ts_id):
+--   0 free, 1 booked, 2 unavailable, 3 booked although unavailable (clash)
+-- patient_ids holds the booked patient per slot. Kept current by the triggers
+-- below, so a doctor's day or week is one primary key lookup. Days without a
+-- row are entirely free.
+CREATE TABLE IF NOT EXISTS doctor_day_schedule (
+    doc_id CHAR(5) NOT NULL REFERENCES doctor(u_id) ON DELETE CASCADE,
+    date DATE NOT NULL,
+    slot_states SMALLINT[] NOT NULL,
+    patient_ids CHAR(5)[] NOT NULL,
+    booked INT NOT NULL,
+    unavailable INT NOT NULL,
+    PRIMARY KEY (doc_id, date)
+);
+
+-- Function: rebuild the schedule rows of the given (doctor, date) pairs.
+-- Every day is rebuilt from scratch, so two transactions writing the same day
+-- must not rebuild it at the same time: the later one would overwrite the
+-- other's booking with a day read before it committed. The first statements
+-- make sure every day has a row and lock those rows until commit, in a fixed
+-- order so transactions touching several days cannot deadlock. Row locks are
+-- kept in the rows themselves, so bulk writes touching many thousands of days
+-- do not run out of lock table space. The rebuild is a separate statement and
+-- so (in READ COMMITTED) reads the days after any earlier holder of the rows
+-- has committed.
+CREATE OR REPLACE FUNCTION refresh_doctor_day_schedule(p_doc_ids CHAR(5)[], p_dates DATE[])
+RETURNS VOID AS $$
+BEGIN
+    -- Placeholder rows, replaced by the rebuild below before anyone sees them
+    INSERT INTO doctor_day_schedule (doc_id, date, slot_states, patient_ids, booked, unavailable)
+    SELECT DISTINCT k.doc_id, k.date, '{}'::SMALLINT[], '{}'::CHAR(5)[], 0, 0
+    FROM unnest(p_doc_ids, p_dates) AS k(doc_id, date)
+    JOIN doctor d ON d.u_id = k.doc_id
+    ORDER BY k.doc_id, k.date
+    ON CONFLICT (doc_id, date) DO NOTHING;
+
+    PERFORM 1
+    FROM doctor_day_schedule s
+    WHERE (s.doc_id, s.date) IN (SELECT * FROM unnest(p_doc_ids, p_dates))
+    ORDER BY s.doc_id, s.date
+    FOR UPDATE;
+
+    WITH days AS (
+        SELECT DISTINCT k.doc_id, k.date
+        FROM unnest(p_doc_ids, p_dates) AS k(doc_id, date)
+        JOIN doctor d ON d.u_id = k.doc_id
+    ),
+    slots AS (
+        SELECT
+            days.doc_id,
+            days.date,
+            t.start_time,
+            t.ts_id,
+            a.patient_id,
+            EXISTS (
+                SELECT 1 FROM unavailability ua
+                WHERE ua.doc_id = days.doc_id AND ua.date = days.date AND ua.ts_id = t.ts_id
+            ) AS unavailable
+        FROM days
+        CROSS JOIN time_slot t
+        LEFT JOIN appointment a ON a.doc_id = days.doc_id AND a.date = days.date AND a.ts_id = t.ts_id
+    )
+    INSERT INTO doctor_day_schedule (doc_id, date, slot_states, patient_ids, booked, unavailable)
+    SELECT
+        doc_id,
+        date,
+        array_agg((CASE WHEN patient_id IS NOT NULL THEN 1 ELSE 0 END
+                   + CASE WHEN unavailable THEN 2 ELSE 0 END)::SMALLINT ORDER BY start_time, ts_id),
+        array_agg(patient_id ORDER BY start_time, ts_id),
+        COUNT(patient_id),
+        COUNT(*) FILTER (WHERE unavailable)
+    FROM slots
+    GROUP BY doc_id, date
+    ON CONFLICT (doc_id, date) DO UPDATE
+        SET slot_states = EXCLUDED.slot_states,
+            patient_ids = EXCLUDED.patient_ids,
+            booked = EXCLUDED.booked,
+            unavailable = EXCLUDED.unavailable;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger: refresh the days touched by a statement on appointment or unavailability.
+-- Statement level, so bulk writes rebuild each touched day once.
+CREATE OR REPLACE FUNCTION sync_doctor_day_schedule()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM refresh_doctor_day_schedule(array_agg(doc_id), array_agg(date)) FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM refresh_doctor_day_schedule(array_agg(doc_id), array_agg(date)) FROM old_rows;
+    ELSE
+        PERFORM refresh_doctor_day_schedule(array_agg(doc_id), array_agg(date))
+        FROM (SELECT doc_id, date FROM old_rows UNION SELECT doc_id, date FROM new_rows) touched;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_schedule_appointment_insert ON appointment;
+CREATE TRIGGER trg_schedule_appointment_insert
+AFTER INSERT ON appointment
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION sync_doctor_day_schedule();
+
+DROP TRIGGER IF EXISTS trg_schedule_appointment_update ON appointment;
+CREATE TRIGGER trg_schedule_appointment_update
+AFTER UPDATE ON appointment
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION sync_doctor_day_schedule();
+
+DROP TRIGGER IF EXISTS trg_schedule_appointment_delete ON appointment;
+CREATE TRIGGER trg_schedule_appointment_delete
+AFTER DELETE ON appointment
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION sync_doctor_day_schedule();
+
+DROP TRIGGER IF EXISTS trg_schedule_unavailability_insert ON unavailability;
+CREATE TRIGGER trg_schedule_unavailability_insert
+AFTER INSERT ON unavailability
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION sync_doctor_day_schedule();
+
+DROP TRIGGER IF EXISTS trg_schedule_unavailability_update ON unavailability;
+CREATE TRIGGER trg_schedule_unavailability_update
+AFTER UPDATE ON unavailability
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION sync_doctor_day_schedule();
+
+DROP TRIGGER IF EXISTS trg_schedule_unavailability_delete ON unavailability;
+CREATE TRIGGER trg_schedule_unavailability_delete
+AFTER DELETE ON unavailability
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION sync_doctor_day_schedule();
+
+-- Build the schedule for data that existed before the table
+SELECT refresh_doctor_day_schedule(array_agg(doc_id), array_agg(date))
+FROM (
+    SELECT doc_id, date FROM appointment
+    UNION
+    SELECT doc_id, date FROM unavailability
+) existing
+WHERE NOT EXISTS (SELECT 1 FROM doctor_day_schedule);
+
+-- Session revocations: signed session tokens of a user issued at or before
+-- revoked_at are rejected. Rows only matter until the last such token has
+-- expired; api.middleware.SessionTokenMiddleware caches the recent ones.
+CREATE TABLE IF NOT EXISTS session_revocation (
+    u_id CHAR(5) PRIMARY KEY,
+    revoked_at TIMESTAMPTZ NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_session_revocation_revoked_at ON session_revocation (revoked_at);
+
+-- ID sequences: IDs are a one-letter prefix plus the sequence value in
+-- base-36 digits: four (e.g. 'U01A3', up to 1,679,616 per kind) for the
+-- CHAR(5) keys, seven (e.g. 'L00001A3', about 78 billion) for unavailability
+-- and blood tests, which are created in bulk. The application fetches values
+-- in blocks (sql_scripts/id_allocator.py); bulk statements call nextval()
+-- directly.
+CREATE SEQUENCE IF NOT EXISTS user_id_seq;
+CREATE SEQUENCE IF NOT EXISTS health_card_id_seq;
+CREATE SEQUENCE IF NOT EXISTS equipment_id_seq;
+CREATE SEQUENCE IF NOT EXISTS feedback_id_seq;
+CREATE SEQUENCE IF NOT EXISTS unavailability_id_seq;
+CREATE SEQUENCE IF NOT EXISTS blood_test_id_seq;
+
+CREATE OR REPLACE FUNCTION base36_encode(n BIGINT, width INT)
+RETURNS TEXT AS $$
+DECLARE
+    digits CONSTANT TEXT := '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ';
+    result TEXT := '';
+BEGIN
+    IF n < 0 OR n >= 36::NUMERIC ^ width THEN
+        RAISE EXCEPTION 'ID value % does not fit in % base-36 digits', n, width;
+    END IF;
+    FOR i IN 1..width LOOP
+        result := substr(digits, (n % 36)::INT + 1, 1) || result;
+        n := n / 36;
+    END LOOP;
+    RETURN result;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION base36_decode(t TEXT)
+RETURNS BIGINT AS $$
+    SELECT COALESCE(SUM((strpos('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ', substr(t, i, 1)) - 1)
+                        * 36::BIGINT ^ (length(t) - i)), 0)::BIGINT
+    FROM generate_series(1, length(t)) AS i;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Function: move every ID sequence past the IDs already in its table that
+-- have the sequence's format, so allocated IDs never collide with them.
+-- Run after loading data with explicit IDs (seed_tables.sql does).
+CREATE OR REPLACE FUNCTION sync_id_sequences()
+RETURNS VOID AS $$
+DECLARE
+    kind RECORD;
+    highest BIGINT;
+BEGIN
+    FOR kind IN
+        SELECT * FROM (VALUES
+            ('user_id_seq', 'user', 'u_id', 'U', 4),
+            ('health_card_id_seq', 'health_card', 'hc_id', 'C', 4),
+            ('equipment_id_seq', 'medical_equipment', 'me_id', 'E', 4),
+            ('feedback_id_seq', 'feedback', 'f_id', 'F', 4),
+            ('unavailability_id_seq', 'unavailability', 'ua_id', 'V', 7),
+            ('blood_test_id_seq', 'blood_test', 'bt_id', 'L', 7)
+        ) AS k(seq, tbl, col, prefix, width)
+    LOOP
+        EXECUTE format(
+            'SELECT MAX(base36_decode(substr(%I, 2))) FROM %I WHERE %I ~ %L',
+            kind.col, kind.tbl, kind.col, '^' || kind.prefix || '[0-9A-Z]{' || kind.width || '}$'
+        ) INTO highest;
+        IF highest IS NOT NULL THEN
+            PERFORM setval(kind.seq::REGCLASS, GREATEST(highest, 1, (SELECT last_value FROM pg_sequences
+                WHERE schemaname = current_schema() AND sequencename = kind.seq)));
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT sync_id_sequences();
+
+-- Health card pages: a patient's blood tests newest first, read in index order
+CREATE INDEX IF NOT EXISTS idx_blood_test_hc_date ON blood_test (hc_id, test_date, bt_id);
+
+-- Population lab statistics (sql_scripts/lab_stats.py)
+-- The doctor who ordered a blood test, when known
+ALTER TABLE blood_test ADD COLUMN IF NOT EXISTS doc_id CHAR(5) REFERENCES doctor(u_id) ON DELETE SET NULL;
+-- Cleared once the statistics job has counted the row
+ALTER TABLE blood_test ADD COLUMN IF NOT EXISTS stats_pending BOOLEAN NOT NULL DEFAULT TRUE;
+CREATE INDEX IF NOT EXISTS idx_blood_test_stats_pending ON blood_test (bt_id) WHERE stats_pending;
+
+-- Mergeable summary of one analyte for one department and month: count, mean
+-- and sum of squared deviations (Welford), range and a fixed-bin histogram.
+-- d_id is '' for tests without a known ordering doctor.
+CREATE TABLE IF NOT EXISTS lab_stats (
+    analyte VARCHAR(20) NOT NULL,
+    d_id VARCHAR(5) NOT NULL,
+    month DATE NOT NULL,
+    n BIGINT NOT NULL,
+    mean FLOAT8 NOT NULL,
+    m2 FLOAT8 NOT NULL,
+    min_value FLOAT8 NOT NULL,
+    max_value FLOAT8 NOT NULL,
+    histogram BIGINT[] NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (analyte, d_id, month)
+);
+
+-- Results far from the mean of their department and month when they were counted
+CREATE TABLE IF NOT EXISTS lab_outlier (
+    bt_id VARCHAR(8) REFERENCES blood_test(bt_id) ON DELETE CASCADE,
+    analyte VARCHAR(20) NOT NULL,
+    d_id VARCHAR(5) NOT NULL,
+    month DATE NOT NULL,
+    value FLOAT8 NOT NULL,
+    z FLOAT8 NOT NULL,
+    PRIMARY KEY (bt_id, analyte)
+);
+CREATE INDEX IF NOT EXISTS idx_lab_outlier_slice ON lab_outlier (analyte, d_id, month);
+
+-- Databases created with CHAR(5) unavailability and blood test IDs: widen them
+-- for the seven-digit IDs. Existing IDs keep their value. lab_outlier first,
+-- so its foreign key always matches the blood_test column.
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'blood_test' AND column_name = 'bt_id') = 'character' THEN
+        ALTER TABLE lab_outlier ALTER COLUMN bt_id TYPE VARCHAR(8);
+        ALTER TABLE blood_test ALTER COLUMN bt_id TYPE VARCHAR(8);
+    END IF;
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'unavailability' AND column_name = 'ua_id') = 'character' THEN
+        ALTER TABLE unavailability ALTER COLUMN ua_id TYPE VARCHAR(8);
+    END IF;
+END;
+$$;
+
+-- One row per run of the statistics job
+CREATE TABLE IF NOT EXISTS lab_stats_run (
+    run_id SERIAL PRIMARY KEY,
+    started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    elapsed_ms FLOAT8 NOT NULL,
+    full_rebuild BOOLEAN NOT NULL,
+    rows_processed BIGINT NOT NULL,
+    slices_updated INT NOT NULL,
+    outliers INT NOT NULL
+);
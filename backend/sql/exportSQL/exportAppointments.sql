@@ -0,0 +1,18 @@
+-- Every appointment with patient, doctor and time slot (audit export)
+SELECT
+    a.date,
+    t.start_time,
+    t.end_time,
+    a.patient_id,
+    pu.name AS patient_name,
+    pu.surname AS patient_surname,
+    a.doc_id,
+    du.name AS doctor_name,
+    du.surname AS doctor_surname,
+    d.d_id
+FROM appointment a
+JOIN "user" pu ON a.patient_id = pu.u_id
+JOIN doctor d ON a.doc_id = d.u_id
+JOIN "user" du ON d.u_id = du.u_id
+JOIN time_slot t ON a.ts_id = t.ts_id
+ORDER BY a.date, t.start_time, a.doc_id;
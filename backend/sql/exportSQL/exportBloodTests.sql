@@ -0,0 +1,15 @@
+-- Every blood test with the patient it belongs to (audit export)
+SELECT
+    bt.bt_id,
+    p.u_id AS patient_id,
+    bt.test_date,
+    bt.vitamins,
+    bt.minerals,
+    bt.cholesterol,
+    bt.glucose,
+    bt.hemoglobin,
+    bt.white_blood_cells,
+    bt.red_blood_cells
+FROM blood_test bt
+JOIN patient p ON p.hc_id = bt.hc_id
+ORDER BY bt.test_date, bt.bt_id;
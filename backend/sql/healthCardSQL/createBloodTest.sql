@@ -1,5 +1,3 @@
-CREATE SEQUENCE IF NOT EXISTS bt_id_seq START 3;
-
 INSERT INTO blood_test (
     bt_id,
     hc_id,
@@ -10,10 +8,11 @@ INSERT INTO blood_test (
     hemoglobin,
     white_blood_cells,
     red_blood_cells,
-    test_date
+    test_date,
+    doc_id
 )
 VALUES (
-    'BT' || LPAD(NEXTVAL('bt_id_seq')::TEXT, 3, '0'),  -- Auto-generated ID like 'BT001'
+    'L' || base36_encode(nextval('blood_test_id_seq'), 7),  -- Auto-generated ID like 'L000001A'
     (SELECT hc_id FROM patient WHERE u_id = %s),
     %s,
     %s,
@@ -22,5 +21,6 @@ VALUES (
     %s,
     %s,
     %s,
-    CURRENT_DATE  -- Or a specific date like '2025-05-25'
+    CURRENT_DATE,  -- Or a specific date like '2025-05-25'
+    %s  -- Ordering doctor, NULL when unknown
 );
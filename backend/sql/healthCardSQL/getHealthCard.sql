@@ -1,26 +1,70 @@
-SELECT 
-    -- Blood Test Info
-    bt.test_date AS testDate,
-    bt.cholesterol AS cholesterol,
-    bt.glucose AS glucose,
-    bt.hemoglobin AS hemoglobin,
-    bt.white_blood_cells AS whiteBloodCell,
-    bt.red_blood_cells AS redBloodCell,
-
-    -- Prescription Info
-    pr.prescription_date AS prescriptionDate,
-    pr.usage_info AS usageInfo,
-
-    -- Medication Info
-    m.name AS medicationName,
-    m.format AS medicationFormat,
-    m.dosage AS medicationDosage
-
+-- A patient's health card as one row: the card header plus one page of blood
+-- tests and one page of prescriptions (each with its medications) as JSON
+-- arrays. Each section is aggregated on its own, so the result grows with the
+-- number of tests plus prescriptions instead of their product.
+-- Both sections are newest first. A section starts after its (date, id)
+-- cursor when one is given; the page limit is one more than the page size, so
+-- the caller can tell whether the section has more rows.
+-- Prescriptions without a date sort last (as -infinity).
+SELECT
+    p.u_id AS patient_id,
+    p.hc_id,
+    u.name,
+    u.surname,
+    (
+        SELECT COALESCE(json_agg(json_build_object(
+                   'bt_id', bt.bt_id,
+                   'test_date', bt.test_date,
+                   'vitamins', bt.vitamins,
+                   'minerals', bt.minerals,
+                   'cholesterol', bt.cholesterol,
+                   'glucose', bt.glucose,
+                   'hemoglobin', bt.hemoglobin,
+                   'white_blood_cells', bt.white_blood_cells,
+                   'red_blood_cells', bt.red_blood_cells
+               ) ORDER BY bt.test_date DESC, bt.bt_id DESC), '[]')
+        FROM (
+            SELECT *
+            FROM blood_test b
+            WHERE b.hc_id = p.hc_id
+              AND (%(bt_after_date)s::DATE IS NULL
+                   OR (b.test_date, b.bt_id) < (%(bt_after_date)s::DATE, %(bt_after_id)s::VARCHAR(8)))
+            ORDER BY b.test_date DESC, b.bt_id DESC
+            LIMIT %(limit)s
+        ) bt
+    ) AS blood_tests,
+    (
+        SELECT COALESCE(json_agg(json_build_object(
+                   'p_id', pr.p_id,
+                   'prescription_date', pr.prescription_date,
+                   'usage_info', pr.usage_info,
+                   'doc_id', pr.doc_id,
+                   'doctor_name', du.name,
+                   'doctor_surname', du.surname,
+                   'medications', (
+                       SELECT COALESCE(json_agg(json_build_object(
+                                  'm_id', m.m_id,
+                                  'name', m.name,
+                                  'format', m.format,
+                                  'dosage', m.dosage
+                              ) ORDER BY m.name, m.m_id), '[]')
+                       FROM presc_medication pm
+                       JOIN medication m ON pm.m_id = m.m_id
+                       WHERE pm.p_id = pr.p_id
+                   )
+               ) ORDER BY pr.sort_date DESC, pr.p_id DESC), '[]')
+        FROM (
+            SELECT r.*, COALESCE(r.prescription_date, '-infinity'::DATE) AS sort_date
+            FROM prescription r
+            WHERE r.hc_id = p.hc_id
+              AND (%(rx_after_date)s::DATE IS NULL
+                   OR (COALESCE(r.prescription_date, '-infinity'::DATE), r.p_id)
+                      < (%(rx_after_date)s::DATE, %(rx_after_id)s::CHAR(5)))
+            ORDER BY sort_date DESC, r.p_id DESC
+            LIMIT %(limit)s
+        ) pr
+        LEFT JOIN "user" du ON pr.doc_id = du.u_id
+    ) AS prescriptions
 FROM patient p
 JOIN "user" u ON p.u_id = u.u_id
-LEFT JOIN blood_test bt ON p.hc_id = bt.hc_id
-LEFT JOIN prescription pr ON p.hc_id = pr.hc_id
-LEFT JOIN presc_medication pm ON pr.p_id = pm.p_id
-LEFT JOIN medication m ON pm.m_id = m.m_id
-
-WHERE p.u_id = %s; 
+WHERE p.u_id = %(patient_id)s;
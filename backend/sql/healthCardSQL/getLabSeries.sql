@@ -0,0 +1,16 @@
+-- A patient's blood test results in date order, ready to load into arrays:
+-- test_date as days since 1970-01-01 and every analyte as a float (NULL when
+-- not measured). start_date / end_date limit the range when not NULL.
+SELECT
+    bt.test_date - DATE '1970-01-01' AS day,
+    bt.cholesterol::FLOAT8,
+    bt.glucose::FLOAT8,
+    bt.hemoglobin::FLOAT8,
+    bt.white_blood_cells::FLOAT8,
+    bt.red_blood_cells::FLOAT8
+FROM patient p
+JOIN blood_test bt ON bt.hc_id = p.hc_id
+WHERE p.u_id = %(patient_id)s
+  AND (%(start_date)s::DATE IS NULL OR bt.test_date >= %(start_date)s::DATE)
+  AND (%(end_date)s::DATE IS NULL OR bt.test_date <= %(end_date)s::DATE)
+ORDER BY bt.test_date, bt.bt_id;
@@ -1,2 +1,7 @@
 INSERT INTO presc_medication
-(p_id, m_id) VALUES (%s, %s)
\ No newline at end of file
+(p_id, m_id) VALUES (%s, %s)
+-- Whose health card changed
+RETURNING (
+    SELECT pa.u_id FROM prescription pr JOIN patient pa ON pa.hc_id = pr.hc_id
+    WHERE pr.p_id = presc_medication.p_id
+);
@@ -9,4 +9,6 @@ SET
     white_blood_cells = %s,
     red_blood_cells = %s,
     test_date = COALESCE(%s, test_date)  -- Update test_date only if provided, otherwise keep existing
-WHERE bt_id = %s; 
\ No newline at end of file
+WHERE bt_id = %s
+-- Whose health card changed
+RETURNING (SELECT u_id FROM patient WHERE patient.hc_id = blood_test.hc_id);
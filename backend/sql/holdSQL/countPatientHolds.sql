@@ -0,0 +1,5 @@
+-- Live holds of a patient, not counting the slot being (re)held
+SELECT COUNT(*)
+FROM slot_hold
+WHERE patient_id = %(patient_id)s AND expires_at > now()
+  AND (doc_id, date, ts_id) <> (%(doc_id)s, %(date)s, %(ts_id)s);
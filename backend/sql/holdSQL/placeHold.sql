@@ -0,0 +1,17 @@
+-- Hold a free slot for a patient until now() + ttl seconds.
+-- An expired hold, or the patient's own hold, is taken over in place; a live
+-- hold of another patient makes the upsert a no-op and nothing is returned.
+INSERT INTO slot_hold (doc_id, date, ts_id, patient_id, expires_at)
+SELECT %(doc_id)s, %(date)s, %(ts_id)s, %(patient_id)s, now() + make_interval(secs => %(ttl)s)
+WHERE NOT EXISTS (
+        SELECT 1 FROM appointment a
+        WHERE a.doc_id = %(doc_id)s AND a.date = %(date)s AND a.ts_id = %(ts_id)s
+    )
+  AND NOT EXISTS (
+        SELECT 1 FROM unavailability u
+        WHERE u.doc_id = %(doc_id)s AND u.date = %(date)s AND u.ts_id = %(ts_id)s
+    )
+ON CONFLICT (doc_id, date, ts_id) DO UPDATE
+    SET patient_id = EXCLUDED.patient_id, expires_at = EXCLUDED.expires_at
+    WHERE slot_hold.expires_at <= now() OR slot_hold.patient_id = EXCLUDED.patient_id
+RETURNING expires_at;
@@ -0,0 +1,9 @@
+-- Remove a small batch of expired holds; piggybacks on hold writes instead of a sweeper job
+DELETE FROM slot_hold
+WHERE ctid IN (
+    SELECT ctid FROM slot_hold
+    WHERE expires_at < now()
+    ORDER BY expires_at
+    LIMIT %(limit)s
+    FOR UPDATE SKIP LOCKED
+);
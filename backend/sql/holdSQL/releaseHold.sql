@@ -0,0 +1,4 @@
+-- Give up a patient's hold on a slot
+DELETE FROM slot_hold
+WHERE doc_id = %(doc_id)s AND date = %(date)s AND ts_id = %(ts_id)s AND patient_id = %(patient_id)s
+RETURNING expires_at > now() AS was_live;
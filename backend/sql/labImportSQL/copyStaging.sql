@@ -0,0 +1,5 @@
+-- Run with cursor.copy_expert(); rows are CSV without a header, in this column order
+COPY lab_import_staging (
+    line, bt_id, patient_id, doc_id, test_date, vitamins, minerals,
+    cholesterol, glucose, hemoglobin, white_blood_cells, red_blood_cells
+) FROM STDIN WITH (FORMAT csv);
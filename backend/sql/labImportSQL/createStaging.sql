@@ -0,0 +1,17 @@
+-- Staging table of one bulk import, filled by COPY and dropped at commit.
+-- line is the line of the input file, for reporting rejects.
+CREATE TEMP TABLE lab_import_staging (
+    line INT PRIMARY KEY,
+    bt_id VARCHAR(8),
+    patient_id CHAR(5) NOT NULL,
+    hc_id CHAR(5),
+    doc_id CHAR(5),
+    test_date DATE,
+    vitamins VARCHAR(100),
+    minerals VARCHAR(100),
+    cholesterol NUMERIC(5,2),
+    glucose NUMERIC(5,2),
+    hemoglobin NUMERIC(5,2),
+    white_blood_cells NUMERIC(5,2),
+    red_blood_cells NUMERIC(5,2)
+) ON COMMIT DROP;
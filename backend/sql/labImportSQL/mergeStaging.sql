@@ -0,0 +1,32 @@
+-- Merges the staged rows in one statement: rows with a bt_id replace that
+-- test's results (keeping its date and doctor when not given), the others
+-- become new tests (dated today when not given). Returns the number of
+-- updated and inserted tests and the patients whose health card changed.
+WITH updated AS (
+    UPDATE blood_test bt
+    SET vitamins = s.vitamins,
+        minerals = s.minerals,
+        cholesterol = s.cholesterol,
+        glucose = s.glucose,
+        hemoglobin = s.hemoglobin,
+        white_blood_cells = s.white_blood_cells,
+        red_blood_cells = s.red_blood_cells,
+        test_date = COALESCE(s.test_date, bt.test_date),
+        doc_id = COALESCE(s.doc_id, bt.doc_id)
+    FROM lab_import_staging s
+    WHERE s.bt_id IS NOT NULL AND bt.bt_id = s.bt_id
+    RETURNING bt.bt_id
+), inserted AS (
+    INSERT INTO blood_test (
+        bt_id, hc_id, doc_id, test_date, vitamins, minerals,
+        cholesterol, glucose, hemoglobin, white_blood_cells, red_blood_cells
+    )
+    SELECT 'L' || base36_encode(nextval('blood_test_id_seq'), 7), hc_id, doc_id, COALESCE(test_date, CURRENT_DATE),
+           vitamins, minerals, cholesterol, glucose, hemoglobin, white_blood_cells, red_blood_cells
+    FROM (SELECT * FROM lab_import_staging WHERE bt_id IS NULL ORDER BY line) s
+    RETURNING bt_id
+)
+SELECT
+    (SELECT count(*) FROM updated),
+    (SELECT count(*) FROM inserted),
+    ARRAY(SELECT DISTINCT patient_id FROM lab_import_staging);
@@ -0,0 +1,17 @@
+-- Removes the staged rows that cannot be merged and returns why, by line
+DELETE FROM lab_import_staging s
+USING (
+    SELECT s.line,
+           CASE
+               WHEN s.hc_id IS NULL THEN 'unknown patient ' || trim(s.patient_id)
+               WHEN s.doc_id IS NOT NULL AND d.u_id IS NULL THEN 'unknown doctor ' || trim(s.doc_id)
+               WHEN s.bt_id IS NOT NULL AND bt.bt_id IS NULL THEN 'unknown blood test ' || trim(s.bt_id)
+               WHEN s.bt_id IS NOT NULL AND bt.hc_id IS DISTINCT FROM s.hc_id
+                   THEN 'blood test ' || trim(s.bt_id) || ' belongs to another patient'
+           END AS reason
+    FROM lab_import_staging s
+    LEFT JOIN doctor d ON d.u_id = s.doc_id
+    LEFT JOIN blood_test bt ON bt.bt_id = s.bt_id
+) r
+WHERE r.line = s.line AND r.reason IS NOT NULL
+RETURNING s.line, r.reason;
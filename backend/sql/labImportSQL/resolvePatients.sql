@@ -0,0 +1,5 @@
+-- Every staged patient -> health card in one set lookup; unknown patients keep a NULL hc_id
+UPDATE lab_import_staging s
+SET hc_id = p.hc_id
+FROM patient p
+WHERE p.u_id = s.patient_id;
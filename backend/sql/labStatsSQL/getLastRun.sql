@@ -0,0 +1,4 @@
+SELECT run_id, started_at, elapsed_ms, full_rebuild, rows_processed, slices_updated, outliers
+FROM lab_stats_run
+ORDER BY run_id DESC
+LIMIT 1;
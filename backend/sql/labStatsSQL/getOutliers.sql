@@ -0,0 +1,12 @@
+-- The most extreme recorded outliers, with the same filters as getStats
+SELECT o.bt_id, o.analyte, NULLIF(o.d_id, '') AS d_id, o.month, o.value, round(o.z::NUMERIC, 2)::FLOAT8 AS z,
+       bt.test_date, p.u_id AS patient_id
+FROM lab_outlier o
+JOIN blood_test bt ON bt.bt_id = o.bt_id
+LEFT JOIN patient p ON p.hc_id = bt.hc_id
+WHERE (%(analyte)s::VARCHAR IS NULL OR o.analyte = %(analyte)s)
+  AND (%(d_id)s::VARCHAR IS NULL OR o.d_id = %(d_id)s)
+  AND (%(start_month)s::DATE IS NULL OR o.month >= date_trunc('month', %(start_month)s::DATE))
+  AND (%(end_month)s::DATE IS NULL OR o.month <= %(end_month)s::DATE)
+ORDER BY abs(o.z) DESC
+LIMIT %(limit)s;
@@ -0,0 +1,8 @@
+-- Stored summaries, optionally limited to one analyte, department and month range
+SELECT analyte, d_id, month - DATE '1970-01-01' AS month, n, mean, m2, min_value, max_value, histogram
+FROM lab_stats
+WHERE (%(analyte)s::VARCHAR IS NULL OR analyte = %(analyte)s)
+  AND (%(d_id)s::VARCHAR IS NULL OR d_id = %(d_id)s)
+  AND (%(start_month)s::DATE IS NULL OR month >= date_trunc('month', %(start_month)s::DATE))
+  AND (%(end_month)s::DATE IS NULL OR month <= %(end_month)s::DATE)
+ORDER BY analyte, d_id, month;
@@ -0,0 +1,12 @@
+-- Records outlying results, one per array position.
+INSERT INTO lab_outlier (bt_id, analyte, d_id, month, value, z)
+SELECT bt_id, analyte, d_id, DATE '1970-01-01' + month, value, z
+FROM unnest(
+    %(bt_ids)s::VARCHAR(8)[], %(analytes)s::VARCHAR[], %(d_ids)s::VARCHAR[], %(months)s::INT[],
+    %(values)s::FLOAT8[], %(zs)s::FLOAT8[]
+) AS o(bt_id, analyte, d_id, month, value, z)
+ON CONFLICT (bt_id, analyte) DO UPDATE SET
+    d_id = EXCLUDED.d_id,
+    month = EXCLUDED.month,
+    value = EXCLUDED.value,
+    z = EXCLUDED.z;
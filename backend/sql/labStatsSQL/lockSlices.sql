@@ -0,0 +1,7 @@
+-- Stored summaries of the given (department, month) slices, locked until the
+-- job commits its merged summaries.
+SELECT s.analyte, s.d_id, s.month - DATE '1970-01-01' AS month, s.n, s.mean, s.m2, s.min_value, s.max_value, s.histogram
+FROM lab_stats s
+JOIN unnest(%(d_ids)s::VARCHAR[], %(months)s::INT[]) AS slice(d_id, month)
+  ON s.d_id = slice.d_id AND s.month = DATE '1970-01-01' + slice.month
+FOR UPDATE OF s;
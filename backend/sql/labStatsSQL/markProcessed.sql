@@ -0,0 +1,4 @@
+-- Marks one streamed chunk of blood tests as counted. Only the tests the job
+-- read are touched, so tests committed while it runs stay pending for the next run.
+UPDATE blood_test SET stats_pending = FALSE
+WHERE bt_id = ANY(%(bt_ids)s::VARCHAR(8)[]) AND stats_pending;
@@ -0,0 +1,3 @@
+INSERT INTO lab_stats_run (elapsed_ms, full_rebuild, rows_processed, slices_updated, outliers)
+VALUES (%(elapsed_ms)s, %(full_rebuild)s, %(rows_processed)s, %(slices_updated)s, %(outliers)s)
+RETURNING run_id, started_at;
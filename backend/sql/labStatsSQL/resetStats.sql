@@ -0,0 +1,3 @@
+-- Full rebuild: forget every summary and outlier before every test is counted again
+DELETE FROM lab_outlier;
+DELETE FROM lab_stats;
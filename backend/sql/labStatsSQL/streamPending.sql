@@ -0,0 +1,24 @@
+-- Blood tests not yet counted by the statistics job (every test when full is
+-- true), with the department of the ordering doctor ('' when unknown) and the
+-- month as days since 1970-01-01. Tests recorded without an ordering doctor
+-- are attributed to the doctor of the patient's latest appointment on or
+-- before the test date.
+SELECT
+    bt.bt_id,
+    COALESCE(d.d_id, '') AS d_id,
+    date_trunc('month', bt.test_date)::DATE - DATE '1970-01-01' AS month,
+    bt.cholesterol::FLOAT8,
+    bt.glucose::FLOAT8,
+    bt.hemoglobin::FLOAT8,
+    bt.white_blood_cells::FLOAT8,
+    bt.red_blood_cells::FLOAT8
+FROM blood_test bt
+LEFT JOIN patient p ON p.hc_id = bt.hc_id
+LEFT JOIN doctor d ON d.u_id = COALESCE(bt.doc_id, (
+    SELECT a.doc_id
+    FROM appointment a
+    WHERE a.patient_id = p.u_id AND a.date <= bt.test_date
+    ORDER BY a.date DESC
+    LIMIT 1
+))
+WHERE %(full)s OR bt.stats_pending;
@@ -0,0 +1,2 @@
+-- Only one statistics job at a time; released when the job's transaction ends
+SELECT pg_try_advisory_xact_lock(hashtext('lab_stats'));
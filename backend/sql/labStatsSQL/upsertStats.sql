@@ -0,0 +1,16 @@
+-- Writes merged summaries, one per array position. Histograms arrive as
+-- array literals because unnest() would flatten a two-dimensional array.
+INSERT INTO lab_stats (analyte, d_id, month, n, mean, m2, min_value, max_value, histogram, updated_at)
+SELECT analyte, d_id, DATE '1970-01-01' + month, n, mean, m2, min_value, max_value, histogram::BIGINT[], now()
+FROM unnest(
+    %(analytes)s::VARCHAR[], %(d_ids)s::VARCHAR[], %(months)s::INT[], %(ns)s::BIGINT[],
+    %(means)s::FLOAT8[], %(m2s)s::FLOAT8[], %(mins)s::FLOAT8[], %(maxs)s::FLOAT8[], %(histograms)s::TEXT[]
+) AS s(analyte, d_id, month, n, mean, m2, min_value, max_value, histogram)
+ON CONFLICT (analyte, d_id, month) DO UPDATE SET
+    n = EXCLUDED.n,
+    mean = EXCLUDED.mean,
+    m2 = EXCLUDED.m2,
+    min_value = EXCLUDED.min_value,
+    max_value = EXCLUDED.max_value,
+    histogram = EXCLUDED.histogram,
+    updated_at = EXCLUDED.updated_at;
@@ -0,0 +1,13 @@
+-- Remove a doctor's unavailability for one time slot and date; returns how many rows went
+-- and the patient who already held the slot, if any (read before the slot is offered).
+-- trg_offer_freed_unavailability then offers the slot to the waitlist.
+WITH held AS (
+    SELECT patient_id FROM appointment
+    WHERE doc_id = %(doc_id)s AND ts_id = %(ts_id)s AND date = %(date)s
+),
+lifted AS (
+    DELETE FROM unavailability
+    WHERE doc_id = %(doc_id)s AND ts_id = %(ts_id)s AND date = %(date)s
+    RETURNING ua_id
+)
+SELECT (SELECT COUNT(*) FROM lifted), (SELECT patient_id FROM held);
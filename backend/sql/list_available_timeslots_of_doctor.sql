@@ -7,13 +7,20 @@ WHERE t.ts_id NOT IN (
     -- Exclude slots already appointed
     SELECT a.ts_id
     FROM appointment a
-    WHERE a.doc_id = %s AND a.date = %s
+    WHERE a.doc_id = %(doc_id)s AND a.date = %(date)s
 
     UNION
 
     -- Exclude slots marked as unavailable by the doctor
     SELECT u.ts_id
     FROM unavailability u
-    WHERE u.doc_id = %s AND u.date = %s
+    WHERE u.doc_id = %(doc_id)s AND u.date = %(date)s
+
+    UNION
+
+    -- Exclude slots held by a patient who is checking out
+    SELECT h.ts_id
+    FROM slot_hold h
+    WHERE h.doc_id = %(doc_id)s AND h.date = %(date)s AND h.expires_at > now()
 )
-ORDER BY t.start_time;
\ No newline at end of file
+ORDER BY t.start_time;
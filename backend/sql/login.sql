@@ -1,34 +1,22 @@
 -- backend/sql/login.sql
--- Returns (u_id, role, name, surname) if email & password match any patient/doctor/staff/admin
-
-(
-  SELECT u.u_id, 'patient' AS role, u.name, u.surname
-    FROM "user" u
-    JOIN patient    p ON u.u_id = p.u_id
-   WHERE u.email_address = %s
-     AND u.password      = %s
-)
-UNION
-(
-  SELECT u.u_id, 'doctor'  AS role, u.name, u.surname
-    FROM "user" u
-    JOIN doctor     d ON u.u_id = d.u_id
-   WHERE u.email_address = %s
-     AND u.password      = %s
-)
-UNION
-(
-  SELECT u.u_id, 'staff'   AS role, u.name, u.surname
-    FROM "user" u
-    JOIN staff      s ON u.u_id = s.u_id
-   WHERE u.email_address = %s
-     AND u.password      = %s
-)
-UNION
-(
-  SELECT u.u_id, 'admin'   AS role, u.name, u.surname
-    FROM "user" u
-    JOIN admin      a ON u.u_id = a.u_id
-   WHERE u.email_address = %s
-     AND u.password      = %s
-);
+-- Returns (u_id, role, name, surname) if email & password match a patient/doctor/staff/admin.
+-- One lookup through the unique index on email_address; the role tables are
+-- probed by primary key in the same pass.
+SELECT
+    u.u_id,
+    CASE
+        WHEN p.u_id IS NOT NULL THEN 'patient'
+        WHEN d.u_id IS NOT NULL THEN 'doctor'
+        WHEN s.u_id IS NOT NULL THEN 'staff'
+        ELSE 'admin'
+    END AS role,
+    u.name,
+    u.surname
+FROM "user" u
+LEFT JOIN patient p ON p.u_id = u.u_id
+LEFT JOIN doctor  d ON d.u_id = u.u_id
+LEFT JOIN staff   s ON s.u_id = u.u_id
+LEFT JOIN admin   a ON a.u_id = u.u_id
+WHERE u.email_address = %(email)s
+  AND u.password      = %(password)s
+  AND COALESCE(p.u_id, d.u_id, s.u_id, a.u_id) IS NOT NULL;
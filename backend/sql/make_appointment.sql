@@ -1,3 +1,2 @@
--- Insert a new appointment
-INSERT INTO appointment (patient_id, doc_id, ts_id, date)
-VALUES (%(patient_id)s, %(doc_id)s, %(ts_id)s, %(date)s);
\ No newline at end of file
+-- Book an appointment; returns 'booked' or why it was refused (see book_appointment in create_tables.sql)
+SELECT book_appointment(%(patient_id)s, %(doc_id)s, %(ts_id)s, %(date)s, %(lock_timeout_ms)s);
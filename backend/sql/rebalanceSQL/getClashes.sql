@@ -0,0 +1,19 @@
+-- Upcoming appointments in slots their doctor has since declared unavailable.
+-- doc_id, start_date and end_date narrow the search (NULL = not used).
+SELECT
+    a.patient_id,
+    a.doc_id,
+    a.ts_id,
+    a.date,
+    d.d_id,
+    d.price,
+    p.balance
+FROM appointment a
+JOIN unavailability ua ON ua.doc_id = a.doc_id AND ua.date = a.date AND ua.ts_id = a.ts_id
+JOIN doctor d ON d.u_id = a.doc_id
+JOIN patient p ON p.u_id = a.patient_id
+WHERE a.date >= CURRENT_DATE
+  AND (%(doc_id)s::CHAR(5) IS NULL OR a.doc_id = %(doc_id)s)
+  AND (%(start_date)s::DATE IS NULL OR a.date >= %(start_date)s)
+  AND (%(end_date)s::DATE IS NULL OR a.date <= %(end_date)s)
+ORDER BY a.date, a.ts_id, a.doc_id;
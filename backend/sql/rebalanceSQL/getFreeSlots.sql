@@ -0,0 +1,23 @@
+-- Free slots of every priced doctor in the given departments between two dates
+SELECT d.u_id AS doc_id, d.d_id, d.price, days.date, t.ts_id
+FROM doctor d
+CROSS JOIN (
+    SELECT day::DATE AS date
+    FROM generate_series(GREATEST(%(start_date)s::DATE, CURRENT_DATE), %(end_date)s::DATE, INTERVAL '1 day') AS day
+) days
+CROSS JOIN time_slot t
+WHERE d.d_id = ANY(%(dept_ids)s::CHAR(5)[])
+  AND d.price IS NOT NULL
+  AND NOT EXISTS (
+        SELECT 1 FROM appointment a
+        WHERE a.doc_id = d.u_id AND a.date = days.date AND a.ts_id = t.ts_id
+    )
+  AND NOT EXISTS (
+        SELECT 1 FROM unavailability ua
+        WHERE ua.doc_id = d.u_id AND ua.date = days.date AND ua.ts_id = t.ts_id
+    )
+  AND NOT EXISTS (
+        SELECT 1 FROM slot_hold h
+        WHERE h.doc_id = d.u_id AND h.date = days.date AND h.ts_id = t.ts_id
+          AND h.expires_at > now()
+    );
@@ -0,0 +1,5 @@
+-- Slots in which the given patients already have an appointment
+SELECT a.patient_id, a.date, a.ts_id
+FROM appointment a
+WHERE a.patient_id = ANY(%(patient_ids)s::CHAR(5)[])
+  AND a.date BETWEEN %(start_date)s::DATE AND %(end_date)s::DATE;
@@ -0,0 +1,32 @@
+-- Move appointments to new doctors and slots in one statement. Patients are
+-- charged or refunded the price difference between the two doctors.
+WITH moves AS (
+    SELECT *
+    FROM unnest(
+        %(patient_ids)s::CHAR(5)[],
+        %(old_doc_ids)s::CHAR(5)[], %(old_ts_ids)s::CHAR(5)[], %(old_dates)s::DATE[],
+        %(new_doc_ids)s::CHAR(5)[], %(new_ts_ids)s::CHAR(5)[], %(new_dates)s::DATE[]
+    ) AS m(patient_id, old_doc_id, old_ts_id, old_date, new_doc_id, new_ts_id, new_date)
+),
+moved AS (
+    UPDATE appointment a
+    SET doc_id = m.new_doc_id, ts_id = m.new_ts_id, date = m.new_date
+    FROM moves m
+    WHERE a.patient_id = m.patient_id
+      AND a.doc_id = m.old_doc_id AND a.ts_id = m.old_ts_id AND a.date = m.old_date
+    RETURNING m.patient_id, m.old_doc_id, m.old_ts_id, m.old_date, m.new_doc_id
+),
+charged AS (
+    UPDATE patient p
+    SET balance = p.balance - diff.amount
+    FROM (
+        SELECT mv.patient_id, SUM(nd.price - od.price) AS amount
+        FROM moved mv
+        JOIN doctor od ON od.u_id = mv.old_doc_id
+        JOIN doctor nd ON nd.u_id = mv.new_doc_id
+        GROUP BY mv.patient_id
+    ) diff
+    WHERE p.u_id = diff.patient_id AND diff.amount <> 0
+)
+-- The appointments actually moved; those cancelled since planning are missing
+SELECT patient_id, old_doc_id, old_ts_id, old_date FROM moved;
@@ -0,0 +1,5 @@
+-- Precomputed schedule rows of a doctor between two dates (primary key range scan)
+SELECT date, slot_states, patient_ids, booked, unavailable
+FROM doctor_day_schedule
+WHERE doc_id = %(doc_id)s AND date BETWEEN %(start_date)s::DATE AND %(end_date)s::DATE
+ORDER BY date;
@@ -165,3 +165,6 @@ INSERT INTO department_report (r_id, d_id, num_appointments, start_date, end_dat
 INSERT INTO doctor_report (r_id, doc_id, num_appointments, start_date, end_date) VALUES
 ('R001', 'U0006', 5, '2024-11-01', '2024-11-30'),
 ('R002', 'U0007', 6, '2024-11-01', '2024-11-30');
+
+-- Move the ID sequences past the IDs inserted above
+SELECT sync_id_sequences();
@@ -0,0 +1,4 @@
+-- Revocations recent enough to affect tokens that have not expired yet
+SELECT u_id, EXTRACT(EPOCH FROM revoked_at)::DOUBLE PRECISION
+FROM session_revocation
+WHERE revoked_at > to_timestamp(%(since)s);
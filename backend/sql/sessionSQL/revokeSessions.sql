@@ -0,0 +1,5 @@
+-- Revoke every session token issued to these users up to revoked_at (seconds since the epoch)
+INSERT INTO session_revocation (u_id, revoked_at)
+SELECT u_id, to_timestamp(%(revoked_at)s)
+FROM unnest(%(u_ids)s::CHAR(5)[]) AS u_id
+ON CONFLICT (u_id) DO UPDATE SET revoked_at = GREATEST(session_revocation.revoked_at, EXCLUDED.revoked_at);
@@ -0,0 +1,19 @@
+-- Declare a doctor unavailable for a set of time slots (NULL = every slot) on every
+-- day of a date range, in one statement. Slots already declared are skipped.
+-- ua_id values come from unavailability_id_seq, like id_allocator.next_id('unavailability').
+WITH wanted AS (
+    SELECT
+        day::DATE AS date,
+        t.ts_id
+    FROM generate_series(%(start_date)s::DATE, %(end_date)s::DATE, INTERVAL '1 day') AS day
+    JOIN time_slot t
+      ON %(ts_ids)s::CHAR(5)[] IS NULL OR t.ts_id = ANY(%(ts_ids)s::CHAR(5)[])
+    WHERE NOT EXISTS (
+        SELECT 1 FROM unavailability u
+        WHERE u.doc_id = %(doc_id)s AND u.date = day::DATE AND u.ts_id = t.ts_id
+    )
+)
+INSERT INTO unavailability (ua_id, ts_id, doc_id, date)
+SELECT 'V' || base36_encode(nextval('unavailability_id_seq'), 7), w.ts_id, %(doc_id)s, w.date
+FROM wanted w
+RETURNING date, ts_id;
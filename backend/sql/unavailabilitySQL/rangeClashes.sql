@@ -0,0 +1,9 @@
+-- Appointments of a doctor that fall into a declared unavailability range
+SELECT a.date, a.ts_id, t.start_time, a.patient_id, u.name, u.surname
+FROM appointment a
+JOIN time_slot t ON t.ts_id = a.ts_id
+JOIN "user" u ON u.u_id = a.patient_id
+WHERE a.doc_id = %(doc_id)s
+  AND a.date BETWEEN %(start_date)s::DATE AND %(end_date)s::DATE
+  AND (%(ts_ids)s::CHAR(5)[] IS NULL OR a.ts_id = ANY(%(ts_ids)s::CHAR(5)[]))
+ORDER BY a.date, t.start_time;
@@ -0,0 +1,17 @@
+-- Role and name of one user (no row if the user has no role)
+SELECT
+    CASE
+        WHEN p.u_id IS NOT NULL THEN 'patient'
+        WHEN d.u_id IS NOT NULL THEN 'doctor'
+        WHEN s.u_id IS NOT NULL THEN 'staff'
+        ELSE 'admin'
+    END AS role,
+    u.name,
+    u.surname
+FROM "user" u
+LEFT JOIN patient p ON p.u_id = u.u_id
+LEFT JOIN doctor  d ON d.u_id = u.u_id
+LEFT JOIN staff   s ON s.u_id = u.u_id
+LEFT JOIN admin   a ON a.u_id = u.u_id
+WHERE u.u_id = %(u_id)s
+  AND COALESCE(p.u_id, d.u_id, s.u_id, a.u_id) IS NOT NULL;
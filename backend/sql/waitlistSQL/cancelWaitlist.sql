@@ -0,0 +1,4 @@
+-- Withdraw the still waiting days of a patient's waitlist request
+UPDATE waitlist
+SET status = 'cancelled'
+WHERE request_id = %(request_id)s AND patient_id = %(patient_id)s AND status = 'waiting';
@@ -0,0 +1,10 @@
+-- Patient the waitlist booked into a slot: the appointment's patient, if their
+-- waitlist entry for the slot was marked booked by hand_off_slot
+SELECT a.patient_id
+FROM appointment a
+WHERE a.doc_id = %(doc_id)s AND a.ts_id = %(ts_id)s AND a.date = %(date)s
+  AND EXISTS (
+      SELECT 1 FROM waitlist w
+      WHERE w.patient_id = a.patient_id AND w.doc_id = a.doc_id AND w.date = a.date
+        AND w.ts_id = a.ts_id AND w.status = 'booked'
+  );
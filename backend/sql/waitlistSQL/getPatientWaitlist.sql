@@ -0,0 +1,22 @@
+-- Waitlist requests of a patient, newest first, with the slot they got if any
+SELECT
+    w.request_id,
+    w.doc_id,
+    u.name AS doctor_name,
+    u.surname AS doctor_surname,
+    MIN(w.date) AS start_date,
+    MAX(w.date) AS end_date,
+    MAX(w.priority) AS priority,
+    MIN(w.created_at) AS created_at,
+    CASE
+        WHEN bool_or(w.status = 'booked') THEN 'booked'
+        WHEN bool_or(w.status = 'waiting') THEN 'waiting'
+        ELSE 'cancelled'
+    END AS status,
+    MAX(CASE WHEN w.status = 'booked' THEN w.date END) AS booked_date,
+    MAX(w.ts_id) AS booked_ts_id
+FROM waitlist w
+JOIN "user" u ON u.u_id = w.doc_id
+WHERE w.patient_id = %s
+GROUP BY w.request_id, w.doc_id, u.name, u.surname
+ORDER BY created_at DESC;
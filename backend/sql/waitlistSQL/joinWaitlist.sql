@@ -0,0 +1,9 @@
+-- Put a patient on a doctor's waitlist for every day of a date range; returns the request_id
+WITH request AS (
+    SELECT nextval('waitlist_request_seq') AS request_id
+)
+INSERT INTO waitlist (request_id, patient_id, doc_id, date, priority)
+SELECT r.request_id, %(patient_id)s, %(doc_id)s, day::DATE, %(priority)s
+FROM request r
+CROSS JOIN generate_series(%(start_date)s::DATE, %(end_date)s::DATE, INTERVAL '1 day') AS day
+RETURNING request_id;
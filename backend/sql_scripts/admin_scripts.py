@@ -1,175 +1,105 @@
-import os
-import psycopg2
-import personalSettings
+from db_pool import get_connection, release_connection
+from sql_registry import execute as execute_sql
+import availability_index
+import user_cache
+import health_card_cache
+import session_revocation
+from id_allocator import next_id
 import hashlib
 
-# SQL file paths
-GET_ALL_USERS_SQL_PATH = os.path.abspath(
-    os.path.join(os.path.dirname(__file__), '..', 'sql', 'adminSQL', 'adminSQL', 'getAllUsers.sql')
-)
-
-GET_SYSTEM_STATS_SQL_PATH = os.path.abspath(
-    os.path.join(os.path.dirname(__file__), '..', 'sql', 'adminSQL', 'adminSQL', 'getSystemStats.sql')
-)
-
-GET_ALL_DEPARTMENTS_SQL_PATH = os.path.abspath(
-    os.path.join(os.path.dirname(__file__), '..', 'sql', 'adminSQL', 'adminSQL', 'getAllDepartments.sql')
-)
+# Users removed per transaction by delete_users()
+DELETE_BATCH_SIZE = 1000
 
 def get_all_users():
     """
     Gets all users in the system with their roles and additional info.
     Returns list of users.
     """
-    with open(GET_ALL_USERS_SQL_PATH, 'r') as f:
-        sql = f.read()
-
-    conn = psycopg2.connect(
-        dbname=personalSettings.tableName,
-        user=personalSettings.dbUser,
-        password=personalSettings.dbPassword,
-        host="localhost",
-        port=personalSettings.dbPort
-    )
+    conn = get_connection(readonly=True)
     try:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql)
+                execute_sql(cur, 'adminSQL/adminSQL/getAllUsers')
                 rows = cur.fetchall()
                 columns = [desc[0] for desc in cur.description]
                 users = [dict(zip(columns, row)) for row in rows]
                 return users
     finally:
-        conn.close()
+        release_connection(conn)
 
 def get_system_stats():
     """
     Gets system statistics for admin dashboard.
     Returns dictionary with system stats.
     """
-    with open(GET_SYSTEM_STATS_SQL_PATH, 'r') as f:
-        sql = f.read()
-
-    conn = psycopg2.connect(
-        dbname=personalSettings.tableName,
-        user=personalSettings.dbUser,
-        password=personalSettings.dbPassword,
-        host="localhost",
-        port=personalSettings.dbPort
-    )
+    conn = get_connection(readonly=True)
     try:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql)
+                execute_sql(cur, 'adminSQL/adminSQL/getSystemStats')
                 row = cur.fetchone()
                 columns = [desc[0] for desc in cur.description]
                 stats = dict(zip(columns, row))
                 return stats
     finally:
-        conn.close()
+        release_connection(conn)
 
 def get_all_departments():
     """
     Gets all departments with doctor counts.
     Returns list of departments.
     """
-    with open(GET_ALL_DEPARTMENTS_SQL_PATH, 'r') as f:
-        sql = f.read()
-
-    conn = psycopg2.connect(
-        dbname=personalSettings.tableName,
-        user=personalSettings.dbUser,
-        password=personalSettings.dbPassword,
-        host="localhost",
-        port=personalSettings.dbPort
-    )
+    conn = get_connection(readonly=True)
     try:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql)
+                execute_sql(cur, 'adminSQL/adminSQL/getAllDepartments')
                 rows = cur.fetchall()
                 columns = [desc[0] for desc in cur.description]
                 departments = [dict(zip(columns, row)) for row in rows]
                 return departments
     finally:
-        conn.close()
+        release_connection(conn)
 
 def delete_user(user_id: str):
     """
     Deletes a user from the system (cascade delete).
     Returns True on success, raises exception on failure.
     """
-    conn = psycopg2.connect(
-        dbname=personalSettings.tableName,
-        user=personalSettings.dbUser,
-        password=personalSettings.dbPassword,
-        host="localhost",
-        port=personalSettings.dbPort
-    )
+    delete_users([user_id])
+    return True
+
+def delete_users(user_ids: list, batch_size: int = DELETE_BATCH_SIZE):
+    """
+    Deletes many users with all their dependent records.
+    Each batch of `batch_size` IDs is removed by one call to the delete_users()
+    database function in its own transaction, so locks are held only briefly.
+    Returns the number of users deleted.
+    """
+    deleted = 0
+    conn = get_connection()
     try:
-        with conn:
-            with conn.cursor() as cur:
-                # First, delete all related records that reference this user
-                # Get the patient's hc_id (if any)
-                cur.execute('SELECT hc_id FROM patient WHERE u_id = %s', [user_id])
-                hc_id_result = cur.fetchone()
-                hc_id = hc_id_result[0] if hc_id_result else None
-                
-                # Delete feedback where patient or doctor is this user
-                cur.execute('DELETE FROM feedback WHERE patient_id = %s', [user_id])
-                cur.execute('DELETE FROM feedback WHERE doc_id = %s', [user_id])
-                
-                # Delete appointments where this user is a patient
-                cur.execute('DELETE FROM appointment WHERE patient_id = %s', [user_id])
-                # Delete appointments where this user is a doctor
-                cur.execute('DELETE FROM appointment WHERE doc_id = %s', [user_id])
-                
-                # Delete blood tests, prescriptions if hc_id exists
-                if hc_id:
-                    # Delete presc_medication for all prescriptions of this patient
-                    cur.execute('SELECT p_id FROM prescription WHERE hc_id = %s', [hc_id])
-                    presc_ids = [row[0] for row in cur.fetchall()]
-                    if presc_ids:
-                        cur.execute('DELETE FROM presc_medication WHERE p_id = ANY(%s)', (presc_ids,))
-                    cur.execute('DELETE FROM blood_test WHERE hc_id = %s', [hc_id])
-                    cur.execute('DELETE FROM prescription WHERE hc_id = %s', [hc_id])
-                
-                # Delete all prescriptions where this user is a doctor
-                cur.execute('SELECT p_id FROM prescription WHERE doc_id = %s', [user_id])
-                doc_presc_ids = [row[0] for row in cur.fetchall()]
-                if doc_presc_ids:
-                    cur.execute('DELETE FROM presc_medication WHERE p_id = ANY(%s)', (doc_presc_ids,))
-                cur.execute('DELETE FROM prescription WHERE doc_id = %s', [user_id])
-                
-                # Delete doctor unavailability records (correct table name)
-                cur.execute('DELETE FROM unavailability WHERE doc_id = %s', [user_id])
-                
-                # Now delete from role-specific tables
-                cur.execute('DELETE FROM patient WHERE u_id = %s', [user_id])
-                cur.execute('DELETE FROM doctor WHERE u_id = %s', [user_id])
-                cur.execute('DELETE FROM staff WHERE u_id = %s', [user_id])
-                cur.execute('DELETE FROM admin WHERE u_id = %s', [user_id])
-                # Now delete health card (after patient is deleted)
-                if hc_id:
-                    cur.execute('DELETE FROM health_card WHERE hc_id = %s', [hc_id])
-                # Finally delete from user table
-                cur.execute('DELETE FROM "user" WHERE u_id = %s', [user_id])
-        return True
+        for start in range(0, len(user_ids), batch_size):
+            batch = list(user_ids[start:start + batch_size])
+            with conn:
+                with conn.cursor() as cur:
+                    execute_sql(cur, 'adminSQL/deleteUsers', [batch])
+                    deleted += cur.fetchone()[0]
+                    session_revocation.revoke(batch, cur)
+            # Deleted patients free slots of any doctor
+            availability_index.invalidate()
+            user_cache.invalidate(batch)
+            health_card_cache.invalidate(batch)
+        return deleted
     finally:
-        conn.close()
+        release_connection(conn)
 
 def update_user_role(user_id: str, new_role: str):
     """
     Updates a user's role by moving them between role tables.
     Returns True on success, raises exception on failure.
     """
-    conn = psycopg2.connect(
-        dbname=personalSettings.tableName,
-        user=personalSettings.dbUser,
-        password=personalSettings.dbPassword,
-        host="localhost",
-        port=personalSettings.dbPort
-    )
+    conn = get_connection()
     try:
         with conn:
             with conn.cursor() as cur:
@@ -199,7 +129,9 @@ def update_user_role(user_id: str, new_role: str):
                 
                 # If changing from patient to another role, we need to handle appointments
                 if current_role == 'patient' and new_role.lower() != 'patient':
-                    # Delete appointments where this user is a patient
+                    # Leave the waitlist, then delete appointments where this user is a patient
+                    cur.execute('DELETE FROM waitlist WHERE patient_id = %s', [user_id])
+                    cur.execute('DELETE FROM slot_hold WHERE patient_id = %s', [user_id])
                     cur.execute('DELETE FROM appointment WHERE patient_id = %s', [user_id])
                     # Delete blood tests for this patient
                     cur.execute('DELETE FROM blood_test WHERE patient_id = %s', [user_id])
@@ -210,7 +142,9 @@ def update_user_role(user_id: str, new_role: str):
                 
                 # If changing from doctor to another role, handle doctor-specific data
                 if current_role == 'doctor' and new_role.lower() != 'doctor':
-                    # Delete appointments where this user is a doctor
+                    # Drop the doctor's waitlist, then delete appointments where this user is a doctor
+                    cur.execute('DELETE FROM waitlist WHERE doc_id = %s', [user_id])
+                    cur.execute('DELETE FROM slot_hold WHERE doc_id = %s', [user_id])
                     cur.execute('DELETE FROM appointment WHERE doc_id = %s', [user_id])
                     # Delete doctor unavailability records
                     cur.execute('DELETE FROM unavailability WHERE doc_id = %s', [user_id])
@@ -223,13 +157,7 @@ def update_user_role(user_id: str, new_role: str):
                 
                 # Add to appropriate role table
                 if new_role.lower() == 'patient':
-                    # Generate health card ID
-                    cur.execute("SELECT 'HC' || LPAD((COALESCE(MAX(CAST(SUBSTRING(hc_id, 3) AS INTEGER)), 0) + 1)::TEXT, 3, '0') FROM health_card WHERE hc_id ~ '^HC[0-9]{3}$'")
-                    hc_id_result = cur.fetchone()
-                    if hc_id_result and hc_id_result[0]:
-                        hc_id = hc_id_result[0]
-                    else:
-                        hc_id = 'HC001'  # Default if no existing health cards
+                    hc_id = next_id('health_card', cur)
                     cur.execute('INSERT INTO patient (u_id, hc_id, balance) VALUES (%s, %s, %s)', [user_id, hc_id, 0])
                 elif new_role.lower() == 'doctor':
                     # Default to General department (D0010)
@@ -239,28 +167,26 @@ def update_user_role(user_id: str, new_role: str):
                     cur.execute('INSERT INTO staff (u_id) VALUES (%s)', [user_id])
                 elif new_role.lower() == 'admin':
                     cur.execute('INSERT INTO admin (u_id) VALUES (%s)', [user_id])
+                # Tokens issued before the change still carry the old role
+                session_revocation.revoke([user_id], cur)
+        # Leaving the patient or doctor role deletes appointments and unavailability
+        availability_index.invalidate()
+        user_cache.invalidate([user_id])
+        health_card_cache.invalidate([user_id])
         return True
     finally:
-        conn.close()
+        release_connection(conn)
 
 def create_user(name: str, surname: str, email: str, password: str, phone: str, role: str, specialization: str = None, price: str = None, department: str = None, balance: str = None, **kwargs):
     """
     Creates a new user and adds them to the appropriate role table.
     Returns the new user ID.
     """
-    conn = psycopg2.connect(
-        dbname=personalSettings.tableName,
-        user=personalSettings.dbUser,
-        password=personalSettings.dbPassword,
-        host="localhost",
-        port=personalSettings.dbPort
-    )
+    conn = get_connection()
     try:
         with conn:
             with conn.cursor() as cur:
-                # Generate new user ID
-                cur.execute("SELECT 'U' || LPAD((COALESCE(MAX(CAST(SUBSTRING(u_id, 2) AS INTEGER)), 0) + 1)::TEXT, 4, '0') FROM \"user\" WHERE u_id ~ '^U[0-9]{4}$'")
-                new_uid = cur.fetchone()[0]
+                new_uid = next_id('user', cur)
                 # Hash the password
                 hashed_pw = hashlib.sha256(password.encode()).hexdigest()
                 # Insert into user table
@@ -268,10 +194,7 @@ def create_user(name: str, surname: str, email: str, password: str, phone: str,
                             [new_uid, name, surname, email, hashed_pw, phone])
                 # Add to appropriate role table
                 if role.lower() == 'patient':
-                    # Generate health card ID
-                    cur.execute("SELECT 'HC' || LPAD((COALESCE(MAX(CAST(SUBSTRING(hc_id, 3) AS INTEGER)), 0) + 1)::TEXT, 3, '0') FROM health_card WHERE hc_id ~ '^HC[0-9]{3}$'")
-                    hc_id_result = cur.fetchone()
-                    hc_id = hc_id_result[0] if hc_id_result and hc_id_result[0] else 'HC001'
+                    hc_id = next_id('health_card', cur)
                     patient_balance = float(balance) if balance else 0
                     cur.execute('INSERT INTO patient (u_id, hc_id, balance) VALUES (%s, %s, %s)', [new_uid, hc_id, patient_balance])
                 elif role.lower() == 'doctor':
@@ -286,19 +209,13 @@ def create_user(name: str, surname: str, email: str, password: str, phone: str,
                     cur.execute('INSERT INTO admin (u_id) VALUES (%s)', [new_uid])
                 return new_uid
     finally:
-        conn.close()
+        release_connection(conn)
 
 def update_user_details(user_id: str, name: str = None, surname: str = None, email: str = None, phone: str = None, password: str = None, specialization: str = None, price: str = None, department: str = None, balance: str = None, **kwargs):
     """
     Updates user details (not role or ID). For doctors, updates department, specialization, and price. For patients, updates balance.
     """
-    conn = psycopg2.connect(
-        dbname=personalSettings.tableName,
-        user=personalSettings.dbUser,
-        password=personalSettings.dbPassword,
-        host="localhost",
-        port=personalSettings.dbPort
-    )
+    conn = get_connection()
     try:
         with conn:
             with conn.cursor() as cur:
@@ -327,6 +244,9 @@ def update_user_details(user_id: str, name: str = None, surname: str = None, ema
                     update_values.append(user_id)
                     sql = f'UPDATE "user" SET {", ".join(update_fields)} WHERE u_id=%s'
                     cur.execute(sql, update_values)
+                if password:
+                    # Tokens issued with the old password must not stay valid
+                    session_revocation.revoke([user_id], cur)
                 
                 # Check if user is a doctor
                 cur.execute('SELECT u_id FROM doctor WHERE u_id = %s', [user_id])
@@ -343,5 +263,7 @@ def update_user_details(user_id: str, name: str = None, surname: str = None, ema
                 cur.execute('SELECT u_id FROM patient WHERE u_id = %s', [user_id])
                 if cur.fetchone() and balance is not None:
                     cur.execute('UPDATE patient SET balance=%s WHERE u_id=%s', [float(balance), user_id])
+        user_cache.invalidate([user_id])
+        health_card_cache.invalidate([user_id])
     finally:
-        conn.close() 
\ No newline at end of file
+        release_connection(conn) 
\ No newline at end of file
@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool
+
+import personalSettings
+from db_pool import POOL_MIN_SIZE, POOL_MAX_SIZE, POOL_WORKERS, POOL_TIMEOUT
+from sql_registry import get_sql, record_timing
+
+# Async counterpart of db_pool for the ASGI views, sized from the same settings.
+# psycopg 3 prepares statements server-side by itself once a query has been run
+# a few times on a connection, so the hot reads get the benefit of
+# prepared_statements without extra bookkeeping.
+_pool = None
+_pool_lock = None
+
+
+async def get_async_pool() -> AsyncConnectionPool:
+    """Returns the process-wide async pool, opening it on first use."""
+    global _pool, _pool_lock
+    if _pool is None:
+        if _pool_lock is None:
+            _pool_lock = asyncio.Lock()
+        async with _pool_lock:
+            if _pool is None:
+                pool = AsyncConnectionPool(
+                    make_conninfo(
+                        dbname=personalSettings.tableName,
+                        user=personalSettings.dbUser,
+                        password=personalSettings.dbPassword,
+                        host="localhost",
+                        port=personalSettings.dbPort,
+                    ),
+                    min_size=min(POOL_MIN_SIZE, max(1, POOL_MAX_SIZE // max(1, POOL_WORKERS))),
+                    max_size=max(1, POOL_MAX_SIZE // max(1, POOL_WORKERS)),
+                    timeout=POOL_TIMEOUT,
+                    check=AsyncConnectionPool.check_connection,
+                    open=False,
+                )
+                await pool.open()
+                _pool = pool
+    return _pool
+
+
+async def fetch_all(name: str, params=None) -> list:
+    """
+    Runs registry template `name` and returns its rows as dicts.
+    If the awaiting task is cancelled (Django cancels async views whose client
+    disconnected) the running query is cancelled on the server as well.
+    """
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            started = time.perf_counter()
+            try:
+                await cur.execute(get_sql(name), params)
+                rows = await cur.fetchall()
+            except asyncio.CancelledError:
+                await conn.cancel_safe()
+                raise
+            finally:
+                record_timing(name, time.perf_counter() - started)
+            columns = [desc.name for desc in cur.description]
+            return [dict(zip(columns, row)) for row in rows]
@@ -0,0 +1,64 @@
+from asgiref.sync import sync_to_async
+
+from async_db import fetch_all
+from healthCardScript import HEALTH_CARD_PAGE_SIZE, health_card_params, health_card_page, health_card_from_row
+import health_card_cache
+
+# Async versions of the read functions used by api/asyncViews
+
+
+async def get_appointments_for_patient(patient_id: str):
+    """
+    Gets appointments for a patient.
+    Returns appointment list.
+    """
+    return await fetch_all('getAppointmentSQL/getPatientAppointment', [patient_id])
+
+
+async def get_appointments_for_doctor(doc_id: str):
+    """
+    Gets appointments for a doctor.
+    Returns appointment list.
+    """
+    return await fetch_all('getAppointmentSQL/getDoctorAppointments', [doc_id])
+
+
+async def list_available_timeslots_of_doctor(doc_id: str, date: str):
+    return await fetch_all('list_available_timeslots_of_doctor', {'doc_id': doc_id, 'date': date})
+
+
+async def filter_doctors_by_dept(dept_name: str):
+    return await fetch_all('filter_doctors_by_dept', [dept_name])
+
+
+async def _cache_lookup(patient_id: str, page: tuple):
+    # The local cache is in memory; any other backend may go over the network,
+    # so it is called from a worker thread to keep the event loop free
+    if health_card_cache.HEALTH_CARD_CACHE_BACKEND == 'local':
+        return health_card_cache.lookup(patient_id, page)
+    return await sync_to_async(health_card_cache.lookup, thread_sensitive=False)(patient_id, page)
+
+
+async def _cache_store(patient_id: str, version, page: tuple, card: dict):
+    if health_card_cache.HEALTH_CARD_CACHE_BACKEND == 'local':
+        health_card_cache.store(patient_id, version, page, card)
+    else:
+        await sync_to_async(health_card_cache.store, thread_sensitive=False)(patient_id, version, page, card)
+
+
+async def get_health_card_of_patient(patient_id: str, bt_after: str = None, rx_after: str = None, limit=HEALTH_CARD_PAGE_SIZE):
+    params, limit = health_card_params(patient_id, bt_after, rx_after, limit)
+    page = health_card_page(params)
+    card, version = await _cache_lookup(patient_id, page)
+    if card is not None:
+        return card
+    rows = await fetch_all('healthCardSQL/getHealthCard', params)
+    if not rows:
+        return None
+    card = health_card_from_row(rows[0], limit)
+    await _cache_store(patient_id, version, page, card)
+    return card
+
+
+async def get_equipment():
+    return await fetch_all('equipmentSQL/getEquipment')
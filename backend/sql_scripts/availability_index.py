@@ -0,0 +1,220 @@
+"""
+In-memory availability of doctors per (doctor, date).
+
+Each entry is a bitmap over the time_slot table (bit i set = slot i is booked
+or declared unavailable) plus the expiry times of slot holds, which stop
+hiding their slot on their own. Entries are loaded lazily from the primary
+with one indexed query, then kept current by the write paths in this process
+through mark_busy(), mark_held() and invalidate(). Writes made by other server
+processes are picked up when the entry expires after AVAILABILITY_INDEX_TTL
+seconds; double booking is still prevented by the database itself, the index
+only answers availability reads.
+"""
+import datetime
+import threading
+import time
+from collections import OrderedDict
+
+import personalSettings
+from db_pool import get_connection, release_connection
+from sql_registry import execute as execute_sql
+
+# Serve list_available_timeslots_of_doctor from the index
+AVAILABILITY_INDEX = getattr(personalSettings, 'availabilityIndex', True)
+# Maximum number of (doctor, date) entries kept; least recently used go first
+AVAILABILITY_INDEX_SIZE = getattr(personalSettings, 'availabilityIndexSize', 100000)
+# Seconds after which an entry is reloaded from the database
+AVAILABILITY_INDEX_TTL = getattr(personalSettings, 'availabilityIndexTtl', 30.0)
+
+
+class AvailabilityIndex:
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._slots = None       # [(ts_id, start_time, end_time)] in start_time order
+        self._slots_loaded_at = 0.0
+        self._bit = {}           # ts_id -> bit position
+        self._entries = OrderedDict()  # (doc_id, date) -> (busy bitmap, loaded_at, {bit: held until})
+        self._loading = {}       # (doc_id, date) -> token of the load in flight
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._updates = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def _key(doc_id: str, date) -> tuple:
+        # '2024-12-01' and date(2024, 12, 1) are the same entry
+        if isinstance(date, str):
+            try:
+                date = datetime.date.fromisoformat(date)
+            except ValueError:
+                pass
+        return (doc_id, str(date))
+
+    def _ensure_slots(self, cur):
+        # Time slots are re-read once per TTL like the entries; if they changed,
+        # every bitmap built on the old bit positions is dropped
+        if self._slots is not None and time.monotonic() - self._slots_loaded_at < self.ttl:
+            return
+        execute_sql(cur, 'availabilitySQL/getTimeSlots')
+        slots = cur.fetchall()
+        with self._lock:
+            if slots != self._slots:
+                self._entries.clear()
+                self._loading.clear()
+                self._bit = {row[0]: i for i, row in enumerate(slots)}
+                self._slots = slots
+            self._slots_loaded_at = time.monotonic()
+
+    def _load(self, key: tuple) -> int:
+        token = object()
+        with self._lock:
+            self._loading[key] = token
+        # From the primary: right after invalidate() a lagging replica would
+        # hand back the entry from before the write, cached for the whole TTL
+        conn = get_connection(pin=False)
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    self._ensure_slots(cur)
+                    execute_sql(cur, 'availabilitySQL/getBusySlots', {'doc_id': key[0], 'date': key[1]})
+                    busy = 0
+                    holds = {}
+                    for ts_id, held_until in cur.fetchall():
+                        if held_until is None:
+                            busy |= 1 << self._bit[ts_id]
+                        else:
+                            holds[self._bit[ts_id]] = held_until
+        finally:
+            release_connection(conn)
+
+        with self._lock:
+            # A write to this key while we were reading makes our result stale
+            if self._loading.get(key) is token:
+                del self._loading[key]
+                self._entries[key] = (busy, time.monotonic(), holds)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return self._with_holds(busy, holds)
+
+    @staticmethod
+    def _with_holds(busy: int, holds: dict) -> int:
+        now = time.time()
+        for bit, held_until in holds.items():
+            if held_until > now:
+                busy |= 1 << bit
+        return busy
+
+    def busy_bitmap(self, doc_id: str, date) -> int:
+        """Bitmap of the booked, unavailable or currently held slots of `doc_id` on `date`."""
+        key = self._key(doc_id, date)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._with_holds(entry[0], entry[2])
+            self._misses += 1
+        return self._load(key)
+
+    def available_slots(self, doc_id: str, date) -> list:
+        """Free time slots as dicts, in the same shape and order as the SQL query."""
+        busy = self.busy_bitmap(doc_id, date)
+        return [
+            {'ts_id': ts_id, 'start_time': start_time, 'end_time': end_time}
+            for i, (ts_id, start_time, end_time) in enumerate(self._slots)
+            if not busy >> i & 1
+        ]
+
+    def mark_busy(self, doc_id: str, date, ts_id: str):
+        """Records a committed appointment or unavailability for one slot."""
+        key = self._key(doc_id, date)
+        with self._lock:
+            self._loading.pop(key, None)
+            entry = self._entries.get(key)
+            if entry is not None and ts_id in self._bit:
+                self._entries[key] = (entry[0] | 1 << self._bit[ts_id], entry[1], entry[2])
+                self._updates += 1
+
+    def mark_held(self, doc_id: str, date, ts_id: str, held_until: float):
+        """Records a slot hold that lasts until `held_until` (seconds since the epoch)."""
+        key = self._key(doc_id, date)
+        with self._lock:
+            self._loading.pop(key, None)
+            entry = self._entries.get(key)
+            if entry is not None and ts_id in self._bit:
+                entry[2][self._bit[ts_id]] = held_until
+                self._updates += 1
+
+    def invalidate(self, doc_id: str = None, date=None):
+        """
+        Drops cached entries after rows were deleted: one (doctor, date), all
+        dates of a doctor, or everything when called without arguments.
+        """
+        with self._lock:
+            if doc_id is None:
+                keys = list(self._entries) + list(self._loading)
+            elif date is None:
+                keys = [key for key in list(self._entries) + list(self._loading) if key[0] == doc_id]
+            else:
+                keys = [self._key(doc_id, date)]
+            for key in keys:
+                self._loading.pop(key, None)
+                if self._entries.pop(key, None) is not None:
+                    self._invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0,
+                'updates': self._updates,
+                'invalidations': self._invalidations,
+            }
+
+
+_index = AvailabilityIndex(AVAILABILITY_INDEX_SIZE, AVAILABILITY_INDEX_TTL)
+
+
+def available_slots(doc_id: str, date) -> list:
+    return _index.available_slots(doc_id, date)
+
+
+def mark_busy(doc_id: str, date, ts_id: str):
+    _index.mark_busy(doc_id, date, ts_id)
+
+
+def mark_held(doc_id: str, date, ts_id: str, held_until: float):
+    _index.mark_held(doc_id, date, ts_id, held_until)
+
+
+def invalidate(doc_id: str = None, date=None):
+    _index.invalidate(doc_id, date)
+
+
+def index_stats() -> dict:
+    return _index.stats()
+
+
+def check_consistency(pairs) -> list:
+    """
+    Compares the index with the SQL query for each (doc_id, date) in `pairs`.
+    Returns the pairs whose free slots differ, with both answers.
+    """
+    from list_available_timeslots_of_doctor import list_available_timeslots_of_doctor_sql
+
+    mismatches = []
+    for doc_id, date in pairs:
+        from_index = [slot['ts_id'] for slot in available_slots(doc_id, date)]
+        from_sql = [slot['ts_id'] for slot in list_available_timeslots_of_doctor_sql(doc_id, date)]
+        if from_index != from_sql:
+            mismatches.append({'doc_id': doc_id, 'date': str(date), 'index': from_index, 'sql': from_sql})
+    return mismatches
@@ -0,0 +1,207 @@
+import random
+import threading
+import time
+
+from psycopg2 import errors
+
+import personalSettings
+from db_pool import get_connection, release_connection
+from prepared_statements import execute_prepared
+from sql_registry import execute as execute_sql
+
+# Attempts per booking when the database reports a serialization failure,
+# deadlock or lock timeout
+BOOKING_MAX_ATTEMPTS = getattr(personalSettings, 'bookingMaxAttempts', 5)
+# lock_timeout inside the booking transaction
+BOOKING_LOCK_TIMEOUT_MS = getattr(personalSettings, 'bookingLockTimeoutMs', 2000)
+# First retry waits about this long; each further retry doubles it
+BOOKING_RETRY_BASE_DELAY = 0.01
+
+RETRYABLE_ERRORS = (errors.SerializationFailure, errors.DeadlockDetected, errors.LockNotAvailable)
+
+# book_appointment() result -> (message, HTTP status)
+REFUSALS = {
+    'doctor_not_found': ("Doctor not found", 404),
+    'price_not_set': ("Doctor price not set", 400),
+    'patient_not_found': ("Patient not found", 404),
+    'insufficient_balance': ("Insufficient balance", 400),
+    'doctor_unavailable': ("Doctor is unavailable in this time slot", 409),
+    'slot_taken': ("Time slot is already booked", 409),
+    'slot_held': ("Time slot is held by another patient", 409),
+}
+
+
+class BookingError(Exception):
+    """Raised when a booking is refused or keeps failing after all retries."""
+
+    def __init__(self, status: str, message: str, http_status: int):
+        super().__init__(message)
+        self.status = status
+        self.http_status = http_status
+
+
+_stats_lock = threading.Lock()
+_stats = {'bookings': 0, 'attempts': 0, 'retries': 0}
+_outcomes = {}
+
+
+def _record(outcomes: list, attempts: int):
+    with _stats_lock:
+        _stats['bookings'] += len(outcomes)
+        _stats['attempts'] += attempts
+        _stats['retries'] += attempts - 1
+        for outcome in outcomes:
+            _outcomes[outcome] = _outcomes.get(outcome, 0) + 1
+
+
+def _with_retries(work, outcome_of):
+    """
+    Runs work(cur) in its own transaction, retrying transient lock conflicts
+    with jittered exponential backoff. outcome_of(result) names the outcomes
+    to count in the statistics.
+    """
+    conn = get_connection()
+    try:
+        for attempt in range(1, BOOKING_MAX_ATTEMPTS + 1):
+            try:
+                with conn:
+                    with conn.cursor() as cur:
+                        result = work(cur)
+            except RETRYABLE_ERRORS as e:
+                if attempt == BOOKING_MAX_ATTEMPTS:
+                    _record(['gave_up'], attempt)
+                    raise BookingError('gave_up', f"Booking failed after {attempt} attempts: {e}", 503) from e
+                time.sleep(BOOKING_RETRY_BASE_DELAY * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+                continue
+            _record(outcome_of(result), attempt)
+            return result
+    finally:
+        release_connection(conn)
+
+
+def book(patient_id: str, doc_id: str, ts_id: str, date) -> str:
+    """
+    Books one appointment through the book_appointment() database function.
+    Exactly one of several concurrent bookings of the same doctor, slot and
+    date succeeds; the others get BookingError('slot_taken').
+    Returns 'booked'.
+    """
+    params = {
+        'patient_id': patient_id,
+        'doc_id': doc_id,
+        'ts_id': ts_id,
+        'date': date,
+        'lock_timeout_ms': BOOKING_LOCK_TIMEOUT_MS,
+    }
+
+    def work(cur):
+        execute_prepared(cur, 'make_appointment', params)
+        return cur.fetchone()[0]
+
+    status = _with_retries(work, lambda status: [status])
+    if status != 'booked':
+        message, http_status = REFUSALS.get(status, (status, 400))
+        raise BookingError(status, message, http_status)
+    return status
+
+
+def _item_status(item: dict, check, seen: set) -> str:
+    idx, doctor_exists, price, slot_exists, taken, unavailable, held = check
+    key = (item['doc_id'], item['ts_id'], item['date'])
+    if key in seen:
+        return 'duplicate'
+    seen.add(key)
+    if not doctor_exists:
+        return 'doctor_not_found'
+    if price is None:
+        return 'price_not_set'
+    if not slot_exists:
+        return 'invalid_slot'
+    if unavailable:
+        return 'doctor_unavailable'
+    if taken:
+        return 'slot_taken'
+    if held:
+        return 'slot_held'
+    return 'ok'
+
+
+def book_batch(patient_id: str, items: list, atomic: bool = False) -> dict:
+    """
+    Books several appointments for one patient in a single transaction.
+    `items` are dicts with doc_id, ts_id and date (datetime.date). Availability
+    and the total cost are checked once with the patient row locked, then every
+    bookable item is inserted with one multi-row INSERT.
+    If the balance does not cover all bookable items nothing is booked; with
+    atomic=True nothing is booked unless every item can be.
+    Returns {'booked', 'total_cost', 'balance', 'results'} with one status per item.
+    """
+    params = {
+        'patient_id': patient_id,
+        'doc_ids': [item['doc_id'] for item in items],
+        'ts_ids': [item['ts_id'] for item in items],
+        'dates': [item['date'] for item in items],
+    }
+
+    def work(cur):
+        cur.execute("SELECT set_config('lock_timeout', %s, true)", [f'{BOOKING_LOCK_TIMEOUT_MS}ms'])
+        cur.execute('SELECT balance FROM patient WHERE u_id = %s FOR UPDATE', [patient_id])
+        row = cur.fetchone()
+        if row is None:
+            message, http_status = REFUSALS['patient_not_found']
+            raise BookingError('patient_not_found', message, http_status)
+        balance = row[0]
+
+        execute_sql(cur, 'bookingSQL/checkBatch', params)
+        seen = set()
+        checks = cur.fetchall()
+        statuses = [_item_status(item, check, seen) for item, check in zip(items, checks)]
+        bookable = [i for i, status in enumerate(statuses) if status == 'ok']
+        total_cost = sum(checks[i][2] for i in bookable)
+
+        if total_cost > balance:
+            statuses = ['insufficient_balance' if status == 'ok' else status for status in statuses]
+            bookable = []
+        elif atomic and len(bookable) < len(items):
+            statuses = ['not_booked' if status == 'ok' else status for status in statuses]
+            bookable = []
+
+        booked = set()
+        if bookable:
+            execute_sql(cur, 'bookingSQL/insertBatch', {
+                'patient_id': patient_id,
+                'doc_ids': [items[i]['doc_id'] for i in bookable],
+                'ts_ids': [items[i]['ts_id'] for i in bookable],
+                'dates': [items[i]['date'] for i in bookable],
+            })
+            booked = {(doc_id.strip(), ts_id.strip(), date) for doc_id, ts_id, date in cur.fetchall()}
+            for i in bookable:
+                key = (items[i]['doc_id'], items[i]['ts_id'], items[i]['date'])
+                statuses[i] = 'booked' if key in booked else 'slot_taken'
+            if atomic and len(booked) < len(bookable):
+                # Lost a race for one of the slots: undo the rest
+                cur.connection.rollback()
+                statuses = ['not_booked' if status == 'booked' else status for status in statuses]
+                booked = set()
+
+        spent = sum(checks[i][2] for i, status in enumerate(statuses) if status == 'booked')
+        return {
+            'booked': len(booked),
+            'total_cost': spent,
+            'balance': balance - spent,
+            'results': [dict(item, status=status) for item, status in zip(items, statuses)],
+        }
+
+    return _with_retries(work, lambda result: [item['status'] for item in result['results']])
+
+
+def booking_stats() -> dict:
+    """Counts per outcome plus conflict and retry rates."""
+    with _stats_lock:
+        bookings = _stats['bookings']
+        return {
+            **_stats,
+            'outcomes': dict(_outcomes),
+            'conflict_rate': round(_outcomes.get('slot_taken', 0) / bookings, 4) if bookings else 0.0,
+            'retry_rate': round(_stats['retries'] / _stats['attempts'], 4) if _stats['attempts'] else 0.0,
+        }
@@ -0,0 +1,319 @@
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+import personalSettings
+import db_router
+
+# Pool sizing (optional overrides in personalSettings.py).
+# dbPoolMaxSize is the connection budget for the whole deployment; it is split
+# evenly between the dbPoolWorkers processes so that all workers together stay
+# below Postgres' max_connections.
+POOL_MIN_SIZE = getattr(personalSettings, 'dbPoolMinSize', 2)
+POOL_MAX_SIZE = getattr(personalSettings, 'dbPoolMaxSize', 20)
+POOL_WORKERS = getattr(personalSettings, 'dbPoolWorkers', 1)
+POOL_TIMEOUT = getattr(personalSettings, 'dbPoolTimeout', 10.0)
+# Idle connections older than this many seconds are pinged before reuse
+POOL_CHECK_AFTER = getattr(personalSettings, 'dbPoolCheckAfter', 30.0)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of psycopg2 connections.
+    Connections are handed out most-recently-used first and health-checked
+    on checkout if they have been idle for longer than check_after seconds.
+    """
+
+    def __init__(self, connect_kwargs: dict, min_size: int, max_size: int, timeout: float, check_after: float):
+        self.connect_kwargs = connect_kwargs
+        self.max_size = max(1, max_size)
+        self.min_size = max(0, min(min_size, self.max_size))
+        self.timeout = timeout
+        self.check_after = check_after
+
+        self._idle = deque()  # (conn, last_used) pairs, newest on the right
+        self._size = 0        # idle + checked out + being opened
+        self._cond = threading.Condition()
+
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._opened = 0
+        self._discarded = 0
+        self._failed_checks = 0
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.connect_kwargs)
+        with self._cond:
+            self._opened += 1
+        return conn
+
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _forget(self, conn):
+        """Closes a broken connection and frees its slot."""
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    def warm_up(self):
+        """Opens connections until min_size are available."""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.appendleft((conn, time.monotonic()))
+                self._cond.notify()
+
+    def getconn(self):
+        """
+        Borrows a connection, waiting up to `timeout` seconds for one to free up.
+        Raises PoolTimeout if the pool stays exhausted.
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            with self._cond:
+                while True:
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        conn, last_used = None, None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(conn, last_used):
+                with self._cond:
+                    self._failed_checks += 1
+                self._forget(conn)
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._checkouts += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            return conn
+
+    def putconn(self, conn):
+        """Returns a borrowed connection, rolling back anything left open."""
+        if conn.closed:
+            self._forget(conn)
+            return
+        status = conn.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            self._forget(conn)
+            return
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                self._forget(conn)
+                return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def stats(self) -> dict:
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': idle,
+                'in_use': self._size - idle,
+                'checkouts': self._checkouts,
+                'wait_total_ms': round(self._wait_total * 1000, 3),
+                'wait_avg_ms': round(self._wait_total * 1000 / self._checkouts, 3) if self._checkouts else 0.0,
+                'wait_max_ms': round(self._wait_max * 1000, 3),
+                'timeouts': self._timeouts,
+                'opened': self._opened,
+                'discarded': self._discarded,
+                'failed_health_checks': self._failed_checks,
+            }
+
+
+PRIMARY = 'primary'
+
+# Optional read replicas, e.g. dbReplicas = [{'host': 'localhost', 'port': '5433'}].
+# Keys that are left out are taken from the primary's settings.
+REPLICAS = getattr(personalSettings, 'dbReplicas', [])
+REPLICA_NAMES = [f'replica{i}' for i in range(len(REPLICAS))]
+
+# Replays everything the replica has received; NULL-safe on a standalone server
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+_pools = {}
+_pools_pid = None
+_pools_lock = threading.Lock()
+# Checked-out connection -> pool it has to go back to
+_owners = {}
+
+
+def _connect_kwargs(name: str) -> dict:
+    kwargs = {
+        'dbname': personalSettings.tableName,
+        'user': personalSettings.dbUser,
+        'password': personalSettings.dbPassword,
+        'host': "localhost",
+        'port': personalSettings.dbPort,
+    }
+    if name != PRIMARY:
+        replica = REPLICAS[REPLICA_NAMES.index(name)]
+        kwargs.update({key: value for key, value in replica.items() if key in kwargs})
+    return kwargs
+
+
+def get_pool(name: str = PRIMARY) -> ConnectionPool:
+    """
+    Returns this process' pool for `name` ('primary' or 'replicaN'), creating it on first use.
+    A forked worker never reuses the sockets it inherited from its parent.
+    """
+    global _pools, _owners, _pools_pid
+    pid = os.getpid()
+    if _pools_pid != pid or name not in _pools:
+        with _pools_lock:
+            if _pools_pid != pid:
+                _pools, _owners, _pools_pid = {}, {}, pid
+            if name not in _pools:
+                _pools[name] = ConnectionPool(
+                    connect_kwargs=_connect_kwargs(name),
+                    min_size=POOL_MIN_SIZE,
+                    max_size=max(1, POOL_MAX_SIZE // max(1, POOL_WORKERS)),
+                    timeout=POOL_TIMEOUT,
+                    check_after=POOL_CHECK_AFTER,
+                )
+    return _pools[name]
+
+
+def _checkout(pool: ConnectionPool):
+    conn = pool.getconn()
+    _owners[conn] = pool
+    return conn
+
+
+def _measure_lag(conn) -> float:
+    with conn.cursor() as cur:
+        cur.execute(REPLICA_LAG_SQL)
+        lag = float(cur.fetchone()[0])
+    conn.rollback()
+    return lag
+
+
+def _get_replica_connection():
+    """Borrows a connection from the first usable replica, or returns None."""
+    for name in db_router.replica_order(REPLICA_NAMES):
+        pool = get_pool(name)
+        try:
+            conn = pool.getconn()
+        except (psycopg2.OperationalError, PoolTimeout):
+            db_router.mark_down(name)
+            continue
+        if db_router.lag_check_due(name):
+            try:
+                db_router.record_lag(name, _measure_lag(conn))
+            except psycopg2.Error:
+                pool.putconn(conn)
+                db_router.mark_down(name)
+                continue
+        if not db_router.replica_usable(name):
+            pool.putconn(conn)
+            continue
+        _owners[conn] = pool
+        return conn
+    return None
+
+
+def get_connection(readonly: bool = False, pin: bool = True):
+    """
+    Borrows a connection from the shared pool. Pair with release_connection().
+    readonly=True lets the router serve the call from a read replica, unless this
+    client wrote recently or every replica is down or lagging. pin=False takes a
+    primary connection without pinning the client's reads, for bookkeeping the
+    client never reads back (ID sequences, the revocation list).
+    """
+    if readonly:
+        if REPLICAS and not db_router.reads_pinned():
+            conn = _get_replica_connection()
+            if conn is not None:
+                return conn
+    elif pin:
+        db_router.note_write()
+    return _checkout(get_pool())
+
+
+def release_connection(conn):
+    """Hands a connection obtained from get_connection() back to the pool."""
+    pool = _owners.pop(conn, None) or get_pool()
+    pool.putconn(conn)
+
+
+def warm_up():
+    """Pre-opens the minimum number of pooled connections."""
+    get_pool().warm_up()
+
+
+def pool_stats() -> dict:
+    """Returns checkout counts, wait times and sizes for monitoring."""
+    return get_pool().stats()
+
+
+def replica_stats() -> dict:
+    """Returns pool statistics and routing state for every configured replica."""
+    return {
+        name: dict(get_pool(name).stats(), **db_router.replica_state(name))
+        for name in REPLICA_NAMES
+    }
@@ -0,0 +1,108 @@
+import contextvars
+import itertools
+import threading
+import time
+
+import personalSettings
+
+# Replicas further behind the primary than this many seconds are skipped
+REPLICA_MAX_LAG = getattr(personalSettings, 'dbReplicaMaxLag', 5.0)
+# After a write, the same client reads from the primary for this many seconds
+READ_YOUR_WRITES_WINDOW = getattr(personalSettings, 'dbReadYourWritesWindow', 5.0)
+# How often each replica's replay lag is re-measured
+LAG_CHECK_INTERVAL = getattr(personalSettings, 'dbReplicaLagCheckInterval', 1.0)
+# How long an unreachable replica is left alone before it is tried again
+REPLICA_RETRY_AFTER = getattr(personalSettings, 'dbReplicaRetryAfter', 30.0)
+
+# Wall-clock time (seconds since the epoch) until which the current client
+# reads from the primary. Set per request by api.middleware.ReplicaPinMiddleware
+# from a shared cache or a cookie, so the pin survives requests landing on
+# other workers.
+_pinned_until = contextvars.ContextVar('db_pinned_until', default=0.0)
+# Whether the current request checked out a primary connection for writing
+_wrote = contextvars.ContextVar('db_wrote', default=False)
+
+_lock = threading.Lock()
+_replicas = {}
+_round_robin = itertools.count()
+
+
+def begin_request(pinned_until: float = 0.0):
+    """Starts routing for one request; `pinned_until` comes from the client."""
+    _pinned_until.set(pinned_until)
+    _wrote.set(False)
+
+
+def note_write():
+    """Pins the current client to the primary for the read-your-writes window."""
+    _wrote.set(True)
+    _pinned_until.set(time.time() + READ_YOUR_WRITES_WINDOW)
+
+
+def wrote() -> bool:
+    return _wrote.get()
+
+
+def pinned_until() -> float:
+    return _pinned_until.get()
+
+
+def reads_pinned() -> bool:
+    """True while reads of the current client have to go to the primary."""
+    return _pinned_until.get() > time.time()
+
+
+def _state(name: str) -> dict:
+    return _replicas.setdefault(name, {'lag': None, 'checked_at': 0.0, 'down_until': 0.0, 'reads': 0, 'skipped': 0})
+
+
+def replica_order(names: list) -> list:
+    """Replica names rotated round-robin, leaving out replicas marked down."""
+    if not names:
+        return []
+    now = time.monotonic()
+    start = next(_round_robin) % len(names)
+    with _lock:
+        return [
+            name for name in names[start:] + names[:start]
+            if _state(name)['down_until'] <= now
+        ]
+
+
+def mark_down(name: str):
+    with _lock:
+        state = _state(name)
+        state['down_until'] = time.monotonic() + REPLICA_RETRY_AFTER
+        state['skipped'] += 1
+
+
+def lag_check_due(name: str) -> bool:
+    with _lock:
+        return time.monotonic() - _state(name)['checked_at'] >= LAG_CHECK_INTERVAL
+
+
+def record_lag(name: str, lag: float):
+    with _lock:
+        state = _state(name)
+        state['lag'] = lag
+        state['checked_at'] = time.monotonic()
+
+
+def replica_usable(name: str) -> bool:
+    """True if the last measured lag is within REPLICA_MAX_LAG; counts the outcome."""
+    with _lock:
+        state = _state(name)
+        usable = state['lag'] is not None and state['lag'] <= REPLICA_MAX_LAG
+        state['reads' if usable else 'skipped'] += 1
+        return usable
+
+
+def replica_state(name: str) -> dict:
+    with _lock:
+        state = _state(name)
+        return {
+            'lag_seconds': state['lag'],
+            'down': state['down_until'] > time.monotonic(),
+            'reads': state['reads'],
+            'skipped': state['skipped'],
+        }
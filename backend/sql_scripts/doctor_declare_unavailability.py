@@ -1,32 +1,94 @@
-import os
-import uuid
-import psycopg2
-import personalSettings
+import datetime
 
-SQL_PATH = os.path.abspath(
-    os.path.join(os.path.dirname(__file__), '..', 'sql', 'doctor_declare_unavailability.sql')
-)
+from db_pool import get_connection, release_connection
+from sql_registry import execute as execute_sql
+import availability_index
+from id_allocator import next_id
 
 def declare_unavailability(ts_id: str, doc_id: str, date: str):
-    ua_id = uuid.uuid4().hex[:5].upper()
-    with open(SQL_PATH, 'r') as f:
-        sql = f.read()
-    conn = psycopg2.connect(
-        dbname=personalSettings.tableName,
-        user=personalSettings.dbUser,
-        password=personalSettings.dbPassword,
-        host="localhost",
-        port=personalSettings.dbPort
-    )
+    ua_id = next_id('unavailability')
+    conn = get_connection()
     try:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql, {
+                execute_sql(cur, 'doctor_declare_unavailability', {
                     'ua_id': ua_id,
                     'ts_id': ts_id,
                     'doc_id': doc_id,
                     'date': date
                 })
+        availability_index.mark_busy(doc_id, date, ts_id)
         return ua_id
     finally:
-        conn.close()
\ No newline at end of file
+        release_connection(conn)
+
+def lift_unavailability(ts_id: str, doc_id: str, date: str):
+    """
+    Removes a doctor's unavailability. The freed slot goes to the waitlist.
+    Returns (rows removed, patient who got the slot or None).
+    """
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                params = {'ts_id': ts_id, 'doc_id': doc_id, 'date': date}
+                execute_sql(cur, 'liftUnavailability', params)
+                lifted, held_by = cur.fetchone()
+                row = None
+                # A booking that clashed with the unavailability keeps the slot
+                if lifted and held_by is None:
+                    execute_sql(cur, 'waitlistSQL/getHandedOffPatient', params)
+                    row = cur.fetchone()
+        availability_index.invalidate(doc_id, date)
+        return lifted, (row[0] if row else None)
+    finally:
+        release_connection(conn)
+
+# Longest date range one bulk declaration may cover
+UNAVAILABILITY_MAX_DAYS = 92
+
+def declare_unavailability_range(doc_id: str, start_date: str, end_date: str, ts_ids: list = None):
+    """
+    Declares a doctor unavailable for the time slots `ts_ids` (None = whole day)
+    on every day from start_date to end_date, with one INSERT. Slots that are
+    already unavailable are left alone.
+    Returns {'declared', 'clashes'}; clashes summarises the doctor's existing
+    appointments inside the range so they can be rescheduled together.
+    """
+    start = datetime.date.fromisoformat(start_date)
+    end = datetime.date.fromisoformat(end_date)
+    if end < start:
+        raise ValueError("end_date is before start_date")
+    if (end - start).days >= UNAVAILABILITY_MAX_DAYS:
+        raise ValueError(f"Date range is limited to {UNAVAILABILITY_MAX_DAYS} days")
+    if ts_ids is not None and not ts_ids:
+        raise ValueError("At least one time slot is required")
+
+    params = {'doc_id': doc_id, 'start_date': start, 'end_date': end, 'ts_ids': ts_ids}
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                execute_sql(cur, 'unavailabilitySQL/declareRange', params)
+                declared = cur.fetchall()
+                execute_sql(cur, 'unavailabilitySQL/rangeClashes', params)
+                columns = [desc[0] for desc in cur.description]
+                clashes = [dict(zip(columns, row)) for row in cur.fetchall()]
+    finally:
+        release_connection(conn)
+
+    for date, ts_id in declared:
+        availability_index.mark_busy(doc_id, date, ts_id)
+
+    by_date = {}
+    for clash in clashes:
+        by_date[str(clash['date'])] = by_date.get(str(clash['date']), 0) + 1
+    return {
+        'declared': len(declared),
+        'clashes': {
+            'appointments': len(clashes),
+            'patients': len({clash['patient_id'] for clash in clashes}),
+            'by_date': by_date,
+            'list': clashes,
+        },
+    }
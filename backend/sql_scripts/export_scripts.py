@@ -0,0 +1,54 @@
+import itertools
+
+import personalSettings
+from db_pool import get_connection, release_connection
+from sql_registry import execute as execute_sql
+
+# Rows fetched from the server-side cursor per round trip
+EXPORT_BATCH_SIZE = getattr(personalSettings, 'exportBatchSize', 2000)
+
+_cursor_ids = itertools.count()
+
+
+def stream_query(name: str, params=None, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Runs template `name` on a named (server-side) cursor.
+    Generator: yields the list of column names first, then every row as a tuple.
+    Only `batch_size` rows are held in memory at a time; the connection goes
+    back to the pool when the generator is exhausted or closed.
+    """
+    conn = get_connection(readonly=True)
+    try:
+        with conn.cursor(name=f'export_{next(_cursor_ids)}') as cur:
+            execute_sql(cur, name, params)
+            batch = cur.fetchmany(batch_size)
+            yield [desc[0] for desc in cur.description]
+            while batch:
+                yield from batch
+                batch = cur.fetchmany(batch_size)
+    finally:
+        release_connection(conn)
+
+
+def export_users():
+    return stream_query('adminSQL/getAllUsers')
+
+
+def export_equipment():
+    return stream_query('equipmentSQL/getEquipment')
+
+
+def export_patient_blood_tests(patient_id: str):
+    return stream_query('healthCardSQL/getBloodTestsByPatient', [patient_id])
+
+
+def export_doctor_appointments(doc_id: str):
+    return stream_query('getAppointmentSQL/getDoctorAppointments', [doc_id])
+
+
+def export_appointments():
+    return stream_query('exportSQL/exportAppointments')
+
+
+def export_blood_tests():
+    return stream_query('exportSQL/exportBloodTests')
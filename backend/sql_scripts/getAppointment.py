@@ -1,36 +1,21 @@
 
 
-import os
-import psycopg2
-import personalSettings
-
-# Path to the SQL template
-PATIENT_SQL_PATH = os.path.abspath(
-    os.path.join(os.path.dirname(__file__), '..', 'sql', 'getAppointmentSQL', 'getPatientAppointment.sql')
-)
+from db_pool import get_connection, release_connection
+from prepared_statements import execute_prepared
 
 def get_appointments_for_patient(patient_id: str):
     """
     Gets appointment.
     Returns appointment list.
     """
-    with open(PATIENT_SQL_PATH, 'r') as f:
-        sql = f.read()
-
-    conn = psycopg2.connect(
-        dbname=personalSettings.tableName,
-        user=personalSettings.dbUser,
-        password=personalSettings.dbPassword,
-        host="localhost",
-        port=personalSettings.dbPort
-    )
+    conn = get_connection(readonly=True)
     try:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql, [patient_id])
+                execute_prepared(cur, 'getAppointmentSQL/getPatientAppointment', [patient_id])
                 rows = cur.fetchall()
                 columns = [desc[0] for desc in cur.description]
                 appointments = [dict(zip(columns, row)) for row in rows]
                 return appointments
     finally:
-        conn.close()
\ No newline at end of file
+        release_connection(conn)
\ No newline at end of file
@@ -1,34 +1,71 @@
-import os
-import psycopg2
-import personalSettings
+import datetime
 
-# Path to the SQL template
-DOCTOR_SQL_PATH = os.path.abspath(
-    os.path.join(os.path.dirname(__file__), '..', 'sql', 'getAppointmentSQL', 'getDoctorAppointments.sql')
-)
+from db_pool import get_connection, release_connection
+from sql_registry import execute as execute_sql
 
 def get_appointments_for_doctor(doc_id: str):
     """
     Gets appointments for a doctor.
     Returns appointment list.
     """
-    with open(DOCTOR_SQL_PATH, 'r') as f:
-        sql = f.read()
-
-    conn = psycopg2.connect(
-        dbname=personalSettings.tableName,
-        user=personalSettings.dbUser,
-        password=personalSettings.dbPassword,
-        host="localhost",
-        port=personalSettings.dbPort
-    )
+    conn = get_connection(readonly=True)
     try:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql, [doc_id])
+                execute_sql(cur, 'getAppointmentSQL/getDoctorAppointments', [doc_id])
                 rows = cur.fetchall()
                 columns = [desc[0] for desc in cur.description]
                 appointments = [dict(zip(columns, row)) for row in rows]
                 return appointments
     finally:
-        conn.close()
\ No newline at end of file
+        release_connection(conn)
+
+
+# Longest range one schedule request may cover
+SCHEDULE_MAX_DAYS = 31
+# doctor_day_schedule.slot_states codes
+SLOT_STATES = ('free', 'booked', 'unavailable', 'clash')
+
+def get_doctor_schedule(doc_id: str, start_date: str, days: int = 7):
+    """
+    Gets a doctor's day or week from the precomputed doctor_day_schedule table.
+    Returns one entry per date with every time slot's state
+    (free, booked, unavailable or clash) and booked patient.
+    """
+    if not 0 < days <= SCHEDULE_MAX_DAYS:
+        raise ValueError(f"days must be between 1 and {SCHEDULE_MAX_DAYS}")
+    start = datetime.date.fromisoformat(start_date)
+    end = start + datetime.timedelta(days=days - 1)
+
+    conn = get_connection(readonly=True)
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                # Read on every call (time slots can change), in slot_states order
+                execute_sql(cur, 'availabilitySQL/getTimeSlots')
+                time_slots = cur.fetchall()
+                execute_sql(cur, 'scheduleSQL/getDoctorSchedule', {'doc_id': doc_id, 'start_date': start, 'end_date': end})
+                rows = {row[0]: row for row in cur.fetchall()}
+    finally:
+        release_connection(conn)
+
+    schedule = []
+    for offset in range(days):
+        date = start + datetime.timedelta(days=offset)
+        _, states, patients, booked, unavailable = rows.get(date, (date, None, None, 0, 0))
+        schedule.append({
+            'date': date,
+            'booked': booked,
+            'unavailable': unavailable,
+            'slots': [
+                {
+                    'ts_id': ts_id,
+                    'start_time': start_time,
+                    'end_time': end_time,
+                    'state': SLOT_STATES[states[i]] if states else 'free',
+                    'patient_id': patients[i] if patients else None,
+                }
+                for i, (ts_id, start_time, end_time) in enumerate(time_slots)
+            ],
+        })
+    return schedule
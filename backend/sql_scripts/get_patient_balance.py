@@ -1,18 +1,11 @@
-import psycopg2
-import personalSettings
+from db_pool import get_connection, release_connection
 
 def get_patient_balance(patient_id: str):
     """
     Get patient's current balance
     Returns balance as float or None if patient not found
     """
-    conn = psycopg2.connect(
-        dbname=personalSettings.tableName,
-        user=personalSettings.dbUser,
-        password=personalSettings.dbPassword,
-        host="localhost",
-        port=personalSettings.dbPort
-    )
+    conn = get_connection(readonly=True)
     try:
         with conn:
             with conn.cursor() as cur:
@@ -20,4 +13,4 @@ def get_patient_balance(patient_id: str):
                 row = cur.fetchone()
                 return float(row[0]) if row else None
     finally:
-        conn.close() 
\ No newline at end of file
+        release_connection(conn) 
\ No newline at end of file
@@ -1,16 +1,6 @@
-import os
-import psycopg2
-import personalSettings
-import uuid
-
-# Path to the SQL template
-SQL_PATH = os.path.abspath(
-    os.path.join(os.path.dirname(__file__), '..', 'sql', 'give_feedback.sql')
-)
-
-def generate_feedback_id():
-    """Generate a unique 5-character ID for feedback"""
-    return 'F' + str(uuid.uuid4())[:4].upper()
+from db_pool import get_connection, release_connection
+from sql_registry import execute as execute_sql
+from id_allocator import next_id
 
 def give_feedback(patient_id: str, doc_id: str, rating: float, comment: str = None):
     """
@@ -31,20 +21,10 @@ def give_feedback(patient_id: str, doc_id: str, rating: float, comment: str = No
         raise ValueError("Rating must be between 1.0 and 5.0")
     
     # Generate a feedback ID
-    f_id = generate_feedback_id()
+    f_id = next_id('feedback')
     
-    # Read the SQL template
-    with open(SQL_PATH, 'r') as f:
-        sql = f.read()
-
     # Connect to database
-    conn = psycopg2.connect(
-        dbname=personalSettings.tableName,
-        user=personalSettings.dbUser,
-        password=personalSettings.dbPassword,
-        host="localhost",
-        port=personalSettings.dbPort
-    )
+    conn = get_connection()
     
     try:
         with conn:
@@ -60,7 +40,7 @@ def give_feedback(patient_id: str, doc_id: str, rating: float, comment: str = No
                     raise ValueError("Patient has no appointments with this doctor")
                 
                 # Execute feedback insert
-                cur.execute(sql, {
+                execute_sql(cur, 'give_feedback', {
                     'f_id': f_id,
                     'patient_id': patient_id,
                     'doc_id': doc_id,
@@ -84,7 +64,7 @@ def give_feedback(patient_id: str, doc_id: str, rating: float, comment: str = No
                 
         return f_id
     finally:
-        conn.close()
+        release_connection(conn)
 
 # For command-line testing
 if __name__ == "__main__":
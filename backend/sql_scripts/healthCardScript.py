@@ -1,87 +1,95 @@
-import os
-import psycopg2
-import personalSettings
+import datetime
 
-def get_db_connection():
-    """
-    Creates and returns a database connection using settings from personalSettings.
-    """
-    return psycopg2.connect(
-        dbname=personalSettings.tableName,
-        user=personalSettings.dbUser,
-        password=personalSettings.dbPassword,
-        host="localhost",
-        port=personalSettings.dbPort
-    )
+from db_pool import get_connection, release_connection
+from sql_registry import execute as execute_sql
+import health_card_cache
 
-# Path to the SQL template
-PATIENT_SQL_PATH = os.path.abspath(
-    os.path.join(os.path.dirname(__file__), '..', 'sql', 'healthCardSQL', 'getHealthCard.sql')
-)
+# Page size limits for each section of the health card
+HEALTH_CARD_PAGE_SIZE = 20
+HEALTH_CARD_MAX_PAGE_SIZE = 100
 
-def get_health_card_of_patient(patient_id: str):
-    """
-    Gets appointment.
-    Returns appointment list.
-    """
-    # Add a print statement to debug
-    def get_health_card_of_patient(patient_id):
+
+def _parse_cursor(cursor: str, name: str):
+    """'2024-12-11|B0001' -> ('2024-12-11', 'B0001'); None -> (None, None)."""
+    if not cursor:
+        return None, None
+    date, _, row_id = cursor.partition('|')
+    if not row_id:
+        raise ValueError(f"Invalid {name} cursor")
+    if date != '-infinity':
         try:
-            # Get the path to the SQL file
-            sql_file = os.path.join(os.path.dirname(__file__), "../sql/healthCardSQL/getHealthCard.sql")
-            
-            # Read the SQL query from the file
-            with open(sql_file, 'r') as file:
-                query = file.read()
-            
-            # Connect to the database
-            connection = get_db_connection()
-            cursor = connection.cursor()
-            
-            # Execute the query with the patient_id parameter
-            cursor.execute(query, [patient_id])
-            
-            # Fetch all results
-            rows = cursor.fetchall()
-            
-            # Convert rows to list of dictionaries
-            column_names = [desc[0] for desc in cursor.description]
-            results = []
-            
-            for row in rows:
-                result = dict(zip(column_names, row))
-                results.append(result)
-            
-            # For debugging
-            print(f"Health card data for patient {patient_id}: {results}")
-            
-            # Close cursor and connection
-            cursor.close()
-            connection.close()
-            
-            return results
-            
-        except Exception as e:
-            print(f"Error in get_health_card_of_patient: {e}")
-            raise
+            datetime.date.fromisoformat(date)
+        except ValueError:
+            raise ValueError(f"Invalid {name} cursor")
+    return date, row_id
+
+
+def health_card_params(patient_id: str, bt_after: str = None, rx_after: str = None, limit=HEALTH_CARD_PAGE_SIZE) -> tuple:
+    """Query parameters for healthCardSQL/getHealthCard, and the page size."""
+    limit = max(1, min(int(limit), HEALTH_CARD_MAX_PAGE_SIZE))
+    bt_after_date, bt_after_id = _parse_cursor(bt_after, 'blood test')
+    rx_after_date, rx_after_id = _parse_cursor(rx_after, 'prescription')
+    # One extra row per section tells whether there is a next page
+    return {
+        'patient_id': patient_id,
+        'bt_after_date': bt_after_date,
+        'bt_after_id': bt_after_id,
+        'rx_after_date': rx_after_date,
+        'rx_after_id': rx_after_id,
+        'limit': limit + 1
+    }, limit
+
 
-    with open(PATIENT_SQL_PATH, 'r') as f:
-        sql = f.read()
+def health_card_page(params: dict) -> tuple:
+    """Identifies the requested page of a patient's card in health_card_cache."""
+    return tuple(params[name] for name in ('bt_after_date', 'bt_after_id', 'rx_after_date', 'rx_after_id', 'limit'))
+
+
+def _section(items: list, limit: int, date_key: str, id_key: str) -> dict:
+    has_more = len(items) > limit
+    items = items[:limit]
+    next_cursor = None
+    if has_more:
+        last = items[-1]
+        next_cursor = f"{last[date_key] or '-infinity'}|{last[id_key]}"
+    return {'items': items, 'next_cursor': next_cursor}
+
+
+def health_card_from_row(card: dict, limit: int) -> dict:
+    """Shapes the row of healthCardSQL/getHealthCard into the health card response."""
+    card['blood_tests'] = _section(card['blood_tests'], limit, 'test_date', 'bt_id')
+    card['prescriptions'] = _section(card['prescriptions'], limit, 'prescription_date', 'p_id')
+    return card
+
+
+def get_health_card_of_patient(patient_id: str, bt_after: str = None, rx_after: str = None, limit=HEALTH_CARD_PAGE_SIZE):
+    """
+    Gets one page of a patient's health card: blood tests and prescriptions
+    (with their medications) as separate newest-first sections, each with its
+    own next_cursor. Pass a section's next_cursor as bt_after / rx_after to get
+    its next page.
+    Pages are served from health_card_cache until a write for the patient.
+    Returns the health card, or None if there is no such patient.
+    """
+    params, limit = health_card_params(patient_id, bt_after, rx_after, limit)
+    page = health_card_page(params)
+    card, version = health_card_cache.lookup(patient_id, page)
+    if card is not None:
+        return card
 
-    conn = psycopg2.connect(
-        dbname=personalSettings.tableName,
-        user=personalSettings.dbUser,
-        password=personalSettings.dbPassword,
-        host="localhost",
-        port=personalSettings.dbPort
-    )
+    # A page that will be cached is read from the primary: a lagging replica
+    # could hand back the card from before the write that invalidated it
+    conn = get_connection(readonly=version is None)
     try:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql, [patient_id])
-                rows = cur.fetchall()
+                execute_sql(cur, 'healthCardSQL/getHealthCard', params)
+                row = cur.fetchone()
+                if row is None:
+                    return None
                 columns = [desc[0] for desc in cur.description]
-                healthCard = [dict(zip(columns, row)) for row in rows]
-                return healthCard
+                card = health_card_from_row(dict(zip(columns, row)), limit)
     finally:
-        conn.close()
\ No newline at end of file
+        release_connection(conn)
+    health_card_cache.store(patient_id, version, page, card)
+    return card
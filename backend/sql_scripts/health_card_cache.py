@@ -0,0 +1,276 @@
+"""
+Cache of health card pages per patient.
+
+A health card only changes when staff_scripts writes a blood test or
+prescription for the patient (or an admin edits or deletes the patient); each
+of those calls invalidate() for the patient after it commits. A shared backend
+then never serves a page from before the write; the local backend only forgets
+it in the process that wrote, so other workers may serve it until it expires.
+
+Entries live in a backend, chosen with healthCardCacheBackend:
+    'local'   this process only: LRU bounded by patients and by bytes. With
+              more than one worker (dbPoolWorkers) pages are only kept for
+              healthCardCacheLocalTtl seconds, to bound how stale they get
+    'django'  Django's cache framework (the CACHES alias healthCardCacheAlias),
+              so a Redis or Memcached cache is shared by all server workers
+    or the dotted path of a class with the same methods as LocalBackend.
+
+Every patient has a version; invalidate() moves it on, and pages are stored
+under the version that was current before they were read from the database.
+A page read while a write was committing is therefore never served.
+Cached cards are shared between callers and must not be modified.
+"""
+import importlib
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import personalSettings
+
+# Serve get_health_card_of_patient from the cache
+HEALTH_CARD_CACHE = getattr(personalSettings, 'healthCardCache', True)
+# 'local', 'django' or the dotted path of a backend class
+HEALTH_CARD_CACHE_BACKEND = getattr(personalSettings, 'healthCardCacheBackend', 'local')
+# Seconds after which a page is read again
+HEALTH_CARD_CACHE_TTL = getattr(personalSettings, 'healthCardCacheTtl', 300)
+# Longest the local backend keeps a page when several workers each have their own
+HEALTH_CARD_CACHE_LOCAL_TTL = getattr(personalSettings, 'healthCardCacheLocalTtl', 5)
+# Server processes of the deployment (the same setting as the connection pool's)
+HEALTH_CARD_CACHE_WORKERS = getattr(personalSettings, 'dbPoolWorkers', 1)
+# Patients kept by the local backend; least recently used go first
+HEALTH_CARD_CACHE_SIZE = getattr(personalSettings, 'healthCardCacheSize', 5000)
+# Approximate bytes kept by the local backend (size of the cards as JSON)
+HEALTH_CARD_CACHE_MAX_BYTES = getattr(personalSettings, 'healthCardCacheMaxBytes', 64 * 1024 * 1024)
+# Django cache used by the 'django' backend
+HEALTH_CARD_CACHE_ALIAS = getattr(personalSettings, 'healthCardCacheAlias', 'default')
+
+
+def _size(card: dict) -> int:
+    return len(json.dumps(card, default=str))
+
+
+class LocalBackend:
+    """In-process LRU of patient -> (version, stored_at, {page: card}), bounded by patients and bytes."""
+
+    def __init__(self, max_patients: int, max_bytes: int, ttl: float):
+        self.max_patients = max_patients
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # patient_id -> [version, stored_at, {page: (card, size)}, size]
+        self._versions = OrderedDict()  # patient_id -> version, for patients invalidated recently
+        self._counter = itertools.count(1)
+        self._epoch = 0                 # moved on by clear()
+        self._bytes = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def _version(self, patient_id: str) -> tuple:
+        return (self._epoch, self._versions.get(patient_id, 0))
+
+    def version(self, patient_id: str):
+        with self._lock:
+            return self._version(patient_id)
+
+    def get(self, patient_id: str, version, page: tuple):
+        with self._lock:
+            entry = self._entries.get(patient_id)
+            if entry is None or entry[0] != version or time.monotonic() - entry[1] >= self.ttl:
+                return None
+            cached = entry[2].get(page)
+            if cached is None:
+                return None
+            self._entries.move_to_end(patient_id)
+            return cached[0]
+
+    def set(self, patient_id: str, version, page: tuple, card: dict):
+        size = _size(card)
+        with self._lock:
+            if self._version(patient_id) != version:
+                return
+            entry = self._entries.get(patient_id)
+            if entry is None or entry[0] != version or time.monotonic() - entry[1] >= self.ttl:
+                self._drop(patient_id)
+                entry = self._entries[patient_id] = [version, time.monotonic(), {}, 0]
+            old = entry[2].get(page)
+            entry[2][page] = (card, size)
+            growth = size - (old[1] if old else 0)
+            entry[3] += growth
+            self._bytes += growth
+            self._entries.move_to_end(patient_id)
+            while self._entries and (len(self._entries) > self.max_patients or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+                self._evictions += 1
+
+    def _drop(self, patient_id: str):
+        entry = self._entries.pop(patient_id, None)
+        if entry is not None:
+            self._bytes -= entry[3]
+
+    def invalidate(self, patient_id: str):
+        with self._lock:
+            self._drop(patient_id)
+            self._versions[patient_id] = next(self._counter)
+            self._versions.move_to_end(patient_id)
+            while len(self._versions) > self.max_patients:
+                self._versions.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'patients': len(self._entries),
+                'pages': sum(len(entry[2]) for entry in self._entries.values()),
+                'max_patients': self.max_patients,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'evictions': self._evictions,
+            }
+
+
+class DjangoBackend:
+    """
+    Pages in a Django cache, shared by every process using it. Versions are
+    cache keys themselves, so an invalidation in one worker is seen by all.
+    Size and eviction are managed by the cache server. A version key outlives
+    the pages stored under the previous version, which expire on their own.
+    """
+
+    def __init__(self, alias: str, ttl: float):
+        from django.core.cache import caches
+        self.cache = caches[alias]
+        self.ttl = ttl
+
+    @staticmethod
+    def _version_key(patient_id: str) -> str:
+        return f'health_card:{patient_id}:version'
+
+    @staticmethod
+    def _page_key(patient_id: str, version, page: tuple) -> str:
+        return f'health_card:{patient_id}:{version}:' + '|'.join(str(part) for part in page)
+
+    def version(self, patient_id: str):
+        keys = ['health_card:epoch', self._version_key(patient_id)]
+        found = self.cache.get_many(keys)
+        return '.'.join(str(found.get(key, 0)) for key in keys)
+
+    def get(self, patient_id: str, version, page: tuple):
+        return self.cache.get(self._page_key(patient_id, version, page))
+
+    def set(self, patient_id: str, version, page: tuple, card: dict):
+        self.cache.set(self._page_key(patient_id, version, page), card, self.ttl)
+
+    def invalidate(self, patient_id: str):
+        self.cache.set(self._version_key(patient_id), time.time_ns(), self.ttl * 2)
+
+    def clear(self):
+        # The cache may hold more than health cards, so move every version on instead
+        self.cache.set('health_card:epoch', time.time_ns(), self.ttl * 2)
+
+    def stats(self) -> dict:
+        return {'alias': HEALTH_CARD_CACHE_ALIAS}
+
+
+def _local_ttl() -> float:
+    # Other workers do not see this process' invalidations
+    if HEALTH_CARD_CACHE_WORKERS > 1:
+        return min(HEALTH_CARD_CACHE_TTL, HEALTH_CARD_CACHE_LOCAL_TTL)
+    return HEALTH_CARD_CACHE_TTL
+
+
+def _make_backend():
+    if HEALTH_CARD_CACHE_BACKEND == 'local':
+        return LocalBackend(HEALTH_CARD_CACHE_SIZE, HEALTH_CARD_CACHE_MAX_BYTES, _local_ttl())
+    if HEALTH_CARD_CACHE_BACKEND == 'django':
+        return DjangoBackend(HEALTH_CARD_CACHE_ALIAS, HEALTH_CARD_CACHE_TTL)
+    module, _, name = HEALTH_CARD_CACHE_BACKEND.rpartition('.')
+    return getattr(importlib.import_module(module), name)(ttl=HEALTH_CARD_CACHE_TTL)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'errors': 0}
+
+
+def _get_backend():
+    # Created on first use, so the Django backend is only set up once Django is
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _make_backend()
+    return _backend
+
+
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def lookup(patient_id: str, page: tuple):
+    """
+    Returns (card, version): the cached card for page `page` of the patient's
+    health card, or None, and the version to store a freshly read card under.
+    """
+    if not HEALTH_CARD_CACHE:
+        return None, None
+    backend = _get_backend()
+    try:
+        version = backend.version(patient_id)
+        card = backend.get(patient_id, version, page)
+    except Exception:
+        # A shared cache being down must not take the health card with it
+        _count('errors')
+        return None, None
+    _count('hits' if card is not None else 'misses')
+    return card, version
+
+
+def store(patient_id: str, version, page: tuple, card: dict):
+    """Caches a card read after lookup() returned `version`."""
+    if not HEALTH_CARD_CACHE or version is None:
+        return
+    try:
+        _get_backend().set(patient_id, version, page, card)
+    except Exception:
+        _count('errors')
+
+
+def invalidate(patient_ids=None):
+    """Drops the cached health cards of the given patients, or of everyone when called without arguments."""
+    if not HEALTH_CARD_CACHE:
+        return
+    backend = _get_backend()
+    try:
+        if patient_ids is None:
+            backend.clear()
+            _count('invalidations')
+            return
+        for patient_id in patient_ids:
+            if patient_id is not None:
+                backend.invalidate(patient_id)
+                _count('invalidations')
+    except Exception:
+        # The write itself has committed; a cache that cannot be reached
+        # cannot serve the old card either
+        _count('errors')
+
+
+def cache_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+    stats['enabled'] = HEALTH_CARD_CACHE
+    stats['backend'] = HEALTH_CARD_CACHE_BACKEND
+    stats['ttl'] = _local_ttl() if HEALTH_CARD_CACHE_BACKEND == 'local' else HEALTH_CARD_CACHE_TTL
+    if HEALTH_CARD_CACHE:
+        stats.update(_get_backend().stats())
+    return stats
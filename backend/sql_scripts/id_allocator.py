@@ -0,0 +1,108 @@
+"""
+Primary keys for the tables whose IDs used to be made with MAX()+1 scans or
+truncated UUIDs.
+
+Each kind of ID has its own database sequence; an ID is the kind's prefix plus
+the sequence value in the kind's number of base-36 digits: four for the CHAR(5)
+columns, seven for unavailability and blood tests, which are created in bulk.
+Sequence values are fetched ID_BLOCK_SIZE at a time and handed out from
+memory, so most inserts need no extra round trip. Values never go back to the
+database: IDs of a block that is not used up (server restart, rolled back
+insert) are simply skipped.
+"""
+import os
+import threading
+from collections import deque
+
+import personalSettings
+from db_pool import get_connection, release_connection
+
+# Sequence values fetched from the database at once, per kind of ID
+ID_BLOCK_SIZE = getattr(personalSettings, 'idBlockSize', 20)
+
+ID_DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# kind -> (prefix, sequence, digits); sync_id_sequences() in create_tables.sql lists the same
+ID_KINDS = {
+    'user': ('U', 'user_id_seq', 4),
+    'health_card': ('C', 'health_card_id_seq', 4),
+    'equipment': ('E', 'equipment_id_seq', 4),
+    'feedback': ('F', 'feedback_id_seq', 4),
+    'unavailability': ('V', 'unavailability_id_seq', 7),
+    'blood_test': ('L', 'blood_test_id_seq', 7),
+}
+
+_lock = threading.Lock()
+_blocks = {kind: deque() for kind in ID_KINDS}
+_pid = os.getpid()
+_fetches = 0
+_issued = 0
+
+
+def format_id(kind: str, value: int) -> str:
+    """The ID of sequence value `value`, e.g. format_id('user', 37) == 'U0011'."""
+    prefix, _, width = ID_KINDS[kind]
+    digits = ''
+    for _ in range(width):
+        value, digit = divmod(value, 36)
+        digits = ID_DIGITS[digit] + digits
+    if value:
+        raise OverflowError(f"{kind} IDs are exhausted")
+    return prefix + digits
+
+
+def _fetch_block(cur, kind: str) -> list:
+    cur.execute(
+        "SELECT nextval(%s::REGCLASS) FROM generate_series(1, %s)",
+        [ID_KINDS[kind][1], ID_BLOCK_SIZE]
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def next_id(kind: str, cur=None) -> str:
+    """
+    Returns a new, never used ID of `kind` (a key of ID_KINDS).
+    Pass the caller's cursor to fetch a new block inside its transaction;
+    sequence values are not rolled back, so this is always safe.
+    """
+    global _pid, _fetches, _issued
+    if kind not in ID_KINDS:
+        raise ValueError(f"Unknown ID kind: {kind}")
+
+    with _lock:
+        # A forked worker must not hand out the same values as its parent
+        if _pid != os.getpid():
+            _pid = os.getpid()
+            for block in _blocks.values():
+                block.clear()
+        if _blocks[kind]:
+            _issued += 1
+            return format_id(kind, _blocks[kind].popleft())
+
+    if cur is not None:
+        values = _fetch_block(cur, kind)
+    else:
+        conn = get_connection(pin=False)
+        try:
+            with conn:
+                with conn.cursor() as own_cur:
+                    values = _fetch_block(own_cur, kind)
+        finally:
+            release_connection(conn)
+
+    with _lock:
+        _fetches += 1
+        _issued += 1
+        _blocks[kind].extend(values[1:])
+        return format_id(kind, values[0])
+
+
+def allocator_stats() -> dict:
+    with _lock:
+        return {
+            'block_size': ID_BLOCK_SIZE,
+            'fetches': _fetches,
+            'issued': _issued,
+            'prefetched': {kind: len(block) for kind, block in _blocks.items()},
+            'capacity': {kind: len(ID_DIGITS) ** width for kind, (_, _, width) in ID_KINDS.items()},
+        }
@@ -0,0 +1,239 @@
+"""
+Bulk import of blood test results, such as a lab analyzer's batch export.
+
+import_blood_tests() reads CSV (with a header line) or NDJSON one line at a
+time and validates every row while COPY streams it into a temporary staging
+table. It then resolves the staged patients to their health cards in one set
+lookup, rejects the rows that cannot be merged, and merges the rest into
+blood_test in one statement. Everything runs in one transaction: either every
+accepted row is imported or none is.
+
+Columns (those of the blood test export, plus doctor_id):
+    patient_id    required
+    bt_id         optional: replace the results of this existing blood test
+    doctor_id     optional: the doctor who ordered the test
+    test_date     optional, YYYY-MM-DD; new tests default to today
+    vitamins, minerals, cholesterol, glucose, hemoglobin,
+    white_blood_cells, red_blood_cells
+"""
+import csv
+import datetime
+import io
+import json
+import math
+import time
+
+from db_pool import get_connection, release_connection
+from sql_registry import execute as execute_sql, get_sql, record_timing
+from lab_trends import ANALYTES
+import health_card_cache
+
+LAB_IMPORT_FORMATS = ('csv', 'ndjson')
+# Rejected lines listed in the report; all of them are counted
+LAB_IMPORT_MAX_REJECTS = 100
+
+_ID_LENGTH = 5
+_BT_ID_LENGTH = 8
+_TEXT_LENGTH = 100
+# Results are NUMERIC(5,2)
+_MAX_RESULT = 999.99
+
+
+def _text(record: dict, name: str, limit: int):
+    value = record.get(name)
+    if value is None:
+        return None
+    value = str(value).strip()
+    if len(value) > limit:
+        raise ValueError(f"{name} is longer than {limit} characters")
+    return value or None
+
+
+def _result(record: dict, name: str):
+    value = record.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = math.nan
+    if isinstance(value, bool) or not 0 <= number <= _MAX_RESULT:
+        raise ValueError(f"{name} must be a number from 0 to {_MAX_RESULT}")
+    return number
+
+
+def validate_record(record: dict) -> list:
+    """
+    One input record -> its staging row: bt_id, patient_id, doc_id, test_date,
+    vitamins, minerals and the analytes. Raises ValueError with the reason
+    the record is rejected.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("not a JSON object")
+    if None in record:
+        # csv.DictReader puts values beyond the header under None
+        raise ValueError("more values than header columns")
+    patient_id = _text(record, 'patient_id', _ID_LENGTH)
+    if patient_id is None:
+        raise ValueError("patient_id is required")
+    test_date = _text(record, 'test_date', 10)
+    if test_date is not None:
+        try:
+            datetime.date.fromisoformat(test_date)
+        except ValueError:
+            raise ValueError("test_date must be YYYY-MM-DD")
+    return [
+        _text(record, 'bt_id', _BT_ID_LENGTH),
+        patient_id,
+        _text(record, 'doctor_id', _ID_LENGTH),
+        test_date,
+        _text(record, 'vitamins', _TEXT_LENGTH),
+        _text(record, 'minerals', _TEXT_LENGTH),
+        *(_result(record, name) for name in ANALYTES),
+    ]
+
+
+def _text_lines(source):
+    """Lines of `source` (a file, an HTTP request or any iterable of lines) as str."""
+    for line in source:
+        yield line.decode('utf-8', errors='replace') if isinstance(line, bytes) else line
+
+
+def _csv_records(lines):
+    """(line number, record) of every CSV row; reads the header straight away."""
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None:
+        return iter(())
+    if 'patient_id' not in reader.fieldnames:
+        raise ValueError("The CSV header has no patient_id column")
+    return ((reader.line_num, record) for record in reader)
+
+
+def _ndjson_records(lines):
+    """(line number, record) of every non-blank NDJSON line; None when it is not JSON."""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, None
+
+
+class _CopySource:
+    """
+    File-like object for copy_expert(): validates records as COPY reads them,
+    hands on the accepted ones as CSV and keeps the rejected ones.
+    """
+
+    def __init__(self, records):
+        self._records = records
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._bt_ids = set()
+        self.accepted = 0
+        self.rejects = []
+
+    def read(self, size: int = 8192) -> str:
+        while self._buffer.tell() < size:
+            item = next(self._records, None)
+            if item is None:
+                break
+            line, record = item
+            try:
+                row = validate_record(record)
+                if row[0] is not None:
+                    if row[0] in self._bt_ids:
+                        raise ValueError(f"blood test {row[0]} appears on an earlier line")
+                    self._bt_ids.add(row[0])
+            except ValueError as e:
+                self.rejects.append((line, str(e)))
+                continue
+            self._writer.writerow([line, *row])
+            self.accepted += 1
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+def import_blood_tests(source, file_format: str = 'csv', dry_run: bool = False) -> dict:
+    """
+    Imports the blood tests in `source` (CSV or NDJSON lines, see the module
+    docstring). dry_run=True validates and resolves every row but imports
+    nothing.
+    Returns {'rows', 'imported', 'inserted', 'updated', 'rejected', 'rejects',
+    'dry_run', 'elapsed_ms', 'rows_per_second', 'timings_ms'}; 'rejects' lists
+    the first LAB_IMPORT_MAX_REJECTS rejected lines with the reason.
+    """
+    if file_format not in LAB_IMPORT_FORMATS:
+        raise ValueError("format must be csv or ndjson")
+    started = time.perf_counter()
+    lines = _text_lines(source)
+    copy_source = _CopySource(_csv_records(lines) if file_format == 'csv' else _ndjson_records(lines))
+    inserted = updated = 0
+    patient_ids = []
+
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                execute_sql(cur, 'labImportSQL/createStaging')
+                copy_started = time.perf_counter()
+                try:
+                    cur.copy_expert(get_sql('labImportSQL/copyStaging'), copy_source)
+                finally:
+                    record_timing('labImportSQL/copyStaging', time.perf_counter() - copy_started)
+                copied = time.perf_counter()
+
+                execute_sql(cur, 'labImportSQL/resolvePatients')
+                execute_sql(cur, 'labImportSQL/rejectUnresolved')
+                unresolved = cur.fetchall()
+                resolved = time.perf_counter()
+
+                if dry_run:
+                    conn.rollback()
+                elif copy_source.accepted > len(unresolved):
+                    execute_sql(cur, 'labImportSQL/mergeStaging')
+                    updated, inserted, patient_ids = cur.fetchone()
+        merged = time.perf_counter()
+    finally:
+        release_connection(conn)
+    health_card_cache.invalidate(patient_ids)
+
+    rejects = sorted(copy_source.rejects + unresolved)
+    elapsed = merged - started
+    rows = copy_source.accepted + len(copy_source.rejects)
+    return {
+        'rows': rows,
+        'imported': inserted + updated,
+        'inserted': inserted,
+        'updated': updated,
+        'rejected': len(rejects),
+        'rejects': [{'line': line, 'reason': reason} for line, reason in rejects[:LAB_IMPORT_MAX_REJECTS]],
+        'dry_run': dry_run,
+        'elapsed_ms': round(elapsed * 1000, 3),
+        'rows_per_second': round(rows / elapsed) if elapsed else 0,
+        'timings_ms': {
+            # Reading and validating the input happens while COPY runs
+            'copy': round((copied - started) * 1000, 3),
+            'resolve': round((resolved - copied) * 1000, 3),
+            'merge': round((merged - resolved) * 1000, 3),
+        },
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import blood test results from a CSV or NDJSON file")
+    parser.add_argument('file')
+    parser.add_argument('--format', choices=LAB_IMPORT_FORMATS,
+                        help="Default: ndjson for .ndjson and .jsonl files, csv otherwise")
+    parser.add_argument('--dry-run', action='store_true', help="Validate only, import nothing")
+    args = parser.parse_args()
+
+    file_format = args.format or ('ndjson' if args.file.endswith(('.ndjson', '.jsonl')) else 'csv')
+    with open(args.file, newline='') as f:
+        report = import_blood_tests(f, file_format, args.dry_run)
+    print(json.dumps(report, indent=4))
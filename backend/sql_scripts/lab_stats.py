@@ -0,0 +1,380 @@
+"""
+Population statistics of blood test results, per analyte, department of the
+ordering doctor and month.
+
+run_lab_stats() streams the blood tests it has not counted yet through a
+server-side cursor, LAB_STATS_CHUNK rows at a time, and folds every chunk
+into mergeable summaries: count, mean and sum of squared deviations (merged
+with Chan's formula), range, and a histogram with fixed bins per analyte.
+Memory use depends on the number of (department, month) slices, not on the
+number of tests. The summaries are merged into lab_stats and the tests marked
+as counted, so the next run only reads tests added since. A second pass over
+the same tests records results at least LAB_OUTLIER_Z standard deviations
+from the mean of their slice in lab_outlier.
+
+Corrected results (update_blood_test_results) keep their old value in the
+summaries until a full rebuild: run_lab_stats(full=True).
+"""
+import datetime
+import time
+
+import numpy as np
+from psycopg2 import errors
+
+import personalSettings
+from db_pool import get_connection, release_connection
+from sql_registry import execute as execute_sql
+from lab_trends import ANALYTES
+
+# Rows fetched from the server-side cursor per round trip
+LAB_STATS_CHUNK = getattr(personalSettings, 'labStatsChunkSize', 10000)
+# Results at least this many standard deviations from their slice's mean are outliers
+LAB_OUTLIER_Z = getattr(personalSettings, 'labOutlierZ', 3.0)
+# Slices with fewer results than this are too small to call anything an outlier
+LAB_OUTLIER_MIN_COUNT = 30
+# Runs retried when a test being counted is edited meanwhile
+LAB_STATS_ATTEMPTS = 3
+
+# Histogram range per analyte, in ANALYTES order; values outside it go to an
+# underflow and an overflow bin
+LAB_HISTOGRAM_RANGES = {
+    'cholesterol': (0.0, 500.0),
+    'glucose': (0.0, 500.0),
+    'hemoglobin': (0.0, 25.0),
+    'white_blood_cells': (0.0, 50.0),
+    'red_blood_cells': (0.0, 10.0),
+}
+LAB_HISTOGRAM_BINS = 100
+LAB_PERCENTILES = (5, 25, 50, 75, 95)
+
+_BINS = LAB_HISTOGRAM_BINS + 2
+_LOW = np.array([LAB_HISTOGRAM_RANGES[name][0] for name in ANALYTES])
+_WIDTH = np.array([LAB_HISTOGRAM_RANGES[name][1] - LAB_HISTOGRAM_RANGES[name][0] for name in ANALYTES]) / LAB_HISTOGRAM_BINS
+_EPOCH = np.datetime64('1970-01-01', 'D')
+
+
+class LabSummary:
+    """Mergeable summary of every analyte of one slice; arrays indexed like ANALYTES."""
+
+    def __init__(self):
+        k = len(ANALYTES)
+        self.n = np.zeros(k)
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.min = np.full(k, np.inf)
+        self.max = np.full(k, -np.inf)
+        self.histogram = np.zeros((k, _BINS), dtype=np.int64)
+
+    def merge(self, other: 'LabSummary'):
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.mean = np.where(n > 0, self.mean + delta * other.n / n, 0.0)
+            self.m2 = np.where(n > 0, self.m2 + other.m2 + delta * delta * self.n * other.n / n, 0.0)
+        self.n = n
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        self.histogram += other.histogram
+        return self
+
+    def std(self) -> np.ndarray:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.n > 1, np.sqrt(self.m2 / (self.n - 1)), np.nan)
+
+    def percentiles(self, qs=LAB_PERCENTILES) -> np.ndarray:
+        """Percentiles estimated from the histogram, one row per analyte."""
+        result = np.full((len(ANALYTES), len(qs)), np.nan)
+        cumulative = np.cumsum(self.histogram, axis=1)
+        for i in np.flatnonzero(self.n > 0):
+            targets = np.asarray(qs, dtype=float) / 100 * self.n[i]
+            bins = np.minimum(np.searchsorted(cumulative[i], targets), _BINS - 1)
+            before = np.where(bins > 0, cumulative[i][bins - 1], 0)
+            inside = self.histogram[i][bins]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                fraction = np.where(inside > 0, (targets - before) / inside, 0.0)
+            # Bin b covers [low + (b - 1) * width, low + b * width)
+            estimate = _LOW[i] + (bins - 1 + fraction) * _WIDTH[i]
+            result[i] = np.clip(estimate, self.min[i], self.max[i])
+        return result
+
+
+def _columns(rows: list):
+    """Chunk of streamPending rows -> (bt_ids, d_ids, months, values) arrays."""
+    columns = list(zip(*rows))
+    return (
+        np.array(columns[0]),
+        np.array(columns[1]),
+        np.array(columns[2], dtype=np.int64),
+        np.array(columns[3:], dtype=float).T,
+    )
+
+
+def _group(d_ids: np.ndarray, months: np.ndarray):
+    """Unique (d_id, month) keys of a chunk and the index of every row's key."""
+    departments, d_codes = np.unique(d_ids, return_inverse=True)
+    keys, inverse = np.unique(np.stack([d_codes, months], axis=1), axis=0, return_inverse=True)
+    return [(str(departments[d]), int(month)) for d, month in keys], inverse.reshape(-1)
+
+
+def _chunk_summaries(d_ids, months, values) -> dict:
+    """Summaries of one chunk, per (d_id, month), computed for all rows and analytes at once."""
+    keys, inverse = _group(d_ids, months)
+    groups, k = len(keys), len(ANALYTES)
+    measured = ~np.isnan(values)
+    cells = (inverse[:, None] * k + np.arange(k)).ravel()
+
+    n = np.bincount(cells, measured.ravel(), groups * k).reshape(groups, k)
+    sums = np.bincount(cells, np.where(measured, values, 0.0).ravel(), groups * k).reshape(groups, k)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(n > 0, sums / n, 0.0)
+    deviation = np.where(measured, values - mean[inverse], 0.0)
+    m2 = np.bincount(cells, (deviation * deviation).ravel(), groups * k).reshape(groups, k)
+
+    order = np.argsort(inverse, kind='stable')
+    starts = np.searchsorted(inverse[order], np.arange(groups))
+    mins = np.minimum.reduceat(np.where(measured, values, np.inf)[order], starts, axis=0)
+    maxs = np.maximum.reduceat(np.where(measured, values, -np.inf)[order], starts, axis=0)
+
+    with np.errstate(invalid='ignore'):
+        bins = np.clip(np.floor((values - _LOW) / _WIDTH) + 1, 0, _BINS - 1)
+    bins = np.where(measured, bins, 0).astype(np.int64)
+    hist_cells = cells * _BINS + bins.ravel()
+    histogram = np.bincount(hist_cells[measured.ravel()], minlength=groups * k * _BINS).reshape(groups, k, _BINS)
+
+    summaries = {}
+    for g, key in enumerate(keys):
+        summary = summaries[key] = LabSummary()
+        summary.n, summary.mean, summary.m2 = n[g], mean[g], m2[g]
+        summary.min, summary.max = mins[g], maxs[g]
+        summary.histogram = histogram[g]
+    return summaries
+
+
+def _stream(conn, full: bool):
+    """Yields chunks of pending blood tests from a server-side cursor on `conn`."""
+    with conn.cursor(name='lab_stats') as cur:
+        execute_sql(cur, 'labStatsSQL/streamPending', {'full': full})
+        while True:
+            rows = cur.fetchmany(LAB_STATS_CHUNK)
+            if not rows:
+                break
+            yield _columns(rows)
+
+
+def _from_rows(rows, summaries: dict):
+    """Merges lab_stats rows (analyte, d_id, month, n, mean, m2, min, max, histogram) into `summaries`."""
+    position = {name: i for i, name in enumerate(ANALYTES)}
+    for analyte, d_id, month, n, mean, m2, minimum, maximum, histogram in rows:
+        stored = LabSummary()
+        i = position[analyte]
+        stored.n[i], stored.mean[i], stored.m2[i] = n, mean, m2
+        stored.min[i], stored.max[i] = minimum, maximum
+        stored.histogram[i] = histogram
+        summaries.setdefault((d_id, month), LabSummary()).merge(stored)
+
+
+def _find_outliers(cur, conn, full: bool, summaries: dict) -> int:
+    """Records the outliers of the streamed tests and marks the tests as counted."""
+    found = 0
+    for bt_ids, d_ids, months, values in _stream(conn, full):
+        execute_sql(cur, 'labStatsSQL/markProcessed', {'bt_ids': bt_ids.tolist()})
+        keys, inverse = _group(d_ids, months)
+        mean = np.array([summaries[key].mean for key in keys])[inverse]
+        std = np.array([summaries[key].std() for key in keys])[inverse]
+        count = np.array([summaries[key].n for key in keys])[inverse]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = (values - mean) / std
+            outlier = (count >= LAB_OUTLIER_MIN_COUNT) & (np.abs(z) >= LAB_OUTLIER_Z)
+        rows, analytes = np.nonzero(outlier)
+        if not len(rows):
+            continue
+        execute_sql(cur, 'labStatsSQL/insertOutliers', {
+            'bt_ids': bt_ids[rows].tolist(),
+            'analytes': np.array(ANALYTES)[analytes].tolist(),
+            'd_ids': d_ids[rows].tolist(),
+            'months': months[rows].tolist(),
+            'values': values[rows, analytes].tolist(),
+            'zs': z[rows, analytes].tolist(),
+        })
+        found += len(rows)
+    return found
+
+
+def _run_once(conn, full: bool, started: float) -> dict:
+    with conn:
+        with conn.cursor() as cur:
+            cur.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+            execute_sql(cur, 'labStatsSQL/tryLock')
+            if not cur.fetchone()[0]:
+                raise RuntimeError("The lab statistics job is already running")
+            if full:
+                execute_sql(cur, 'labStatsSQL/resetStats')
+
+            # Pass 1: summaries of the new tests
+            summaries = {}
+            processed = 0
+            for _, d_ids, months, values in _stream(conn, full):
+                processed += len(months)
+                for key, summary in _chunk_summaries(d_ids, months, values).items():
+                    summaries.setdefault(key, LabSummary()).merge(summary)
+
+            # Merge with what earlier runs stored for the same slices
+            keys = list(summaries)
+            execute_sql(cur, 'labStatsSQL/lockSlices', {
+                'd_ids': [d_id for d_id, _ in keys],
+                'months': [month for _, month in keys],
+            })
+            _from_rows(cur.fetchall(), summaries)
+
+            # Pass 2: outliers of the new tests against the merged summaries
+            outliers = _find_outliers(cur, conn, full, summaries)
+
+            stats = [
+                (d_id, month, i, summary)
+                for (d_id, month), summary in summaries.items()
+                for i in np.flatnonzero(summary.n > 0)
+            ]
+            execute_sql(cur, 'labStatsSQL/upsertStats', {
+                'analytes': [ANALYTES[i] for _, _, i, _ in stats],
+                'd_ids': [d_id for d_id, _, _, _ in stats],
+                'months': [month for _, month, _, _ in stats],
+                'ns': [int(s.n[i]) for _, _, i, s in stats],
+                'means': [float(s.mean[i]) for _, _, i, s in stats],
+                'm2s': [float(s.m2[i]) for _, _, i, s in stats],
+                'mins': [float(s.min[i]) for _, _, i, s in stats],
+                'maxs': [float(s.max[i]) for _, _, i, s in stats],
+                # Array literals: unnest() would flatten a two-dimensional array
+                'histograms': ['{' + ','.join(map(str, s.histogram[i].tolist())) + '}' for _, _, i, s in stats],
+            })
+
+            run = {
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 3),
+                'full_rebuild': full,
+                'rows_processed': processed,
+                'slices_updated': len(stats),
+                'outliers': outliers,
+            }
+            execute_sql(cur, 'labStatsSQL/recordRun', run)
+            run_id, started_at = cur.fetchone()
+    return {'run_id': run_id, 'started_at': started_at, **run}
+
+
+def run_lab_stats(full: bool = False) -> dict:
+    """
+    Counts the blood tests added since the last run into lab_stats and
+    records their outliers; full=True recomputes everything.
+    Everything runs in one REPEATABLE READ transaction, so both passes see
+    the same tests and tests committed meanwhile wait for the next run. Only
+    the streamed tests are marked as counted; if one of them is edited while
+    the job runs, the transaction fails to serialize and the run starts over
+    (at most LAB_STATS_ATTEMPTS times).
+    Returns {'run_id', 'started_at', 'elapsed_ms', 'full_rebuild',
+    'rows_processed', 'slices_updated', 'outliers'}.
+    """
+    started = time.perf_counter()
+    conn = get_connection()
+    try:
+        for attempt in range(1, LAB_STATS_ATTEMPTS + 1):
+            try:
+                return _run_once(conn, full, started)
+            except errors.SerializationFailure:
+                if attempt == LAB_STATS_ATTEMPTS:
+                    raise
+    finally:
+        release_connection(conn)
+
+
+def _month(day: int) -> str:
+    return str(_EPOCH + np.timedelta64(day, 'D'))[:7]
+
+
+def get_lab_stats(group_by: str = None, analyte: str = None, d_id: str = None, start_month: str = None,
+                  end_month: str = None, histogram: bool = False, outliers: int = 20) -> dict:
+    """
+    Stored summaries merged per group: group_by is None (one group),
+    'department', 'month' or 'department,month'. Returns per group and
+    analyte the count, mean, standard deviation, range and percentiles,
+    optionally the histogram, plus the `outliers` most extreme outliers and
+    the last run of the job.
+    """
+    by_department = group_by in ('department', 'department,month')
+    by_month = group_by in ('month', 'department,month')
+    if group_by and not (by_department or by_month):
+        raise ValueError("group_by must be department, month or department,month")
+    if analyte is not None and analyte not in ANALYTES:
+        raise ValueError(f"analyte must be one of {', '.join(ANALYTES)}")
+    outliers = max(0, min(int(outliers), 1000))
+    for value in (start_month, end_month):
+        if value:
+            datetime.date.fromisoformat(value + '-01' if len(value) == 7 else value)
+    filters = {
+        'analyte': analyte,
+        'd_id': '' if d_id == 'none' else d_id,
+        'start_month': start_month + '-01' if start_month and len(start_month) == 7 else start_month,
+        'end_month': end_month + '-01' if end_month and len(end_month) == 7 else end_month,
+    }
+
+    conn = get_connection(readonly=True)
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                execute_sql(cur, 'labStatsSQL/getStats', filters)
+                rows = cur.fetchall()
+                execute_sql(cur, 'labStatsSQL/getOutliers', dict(filters, limit=outliers))
+                columns = [desc[0] for desc in cur.description]
+                top_outliers = [dict(zip(columns, row)) for row in cur.fetchall()]
+                execute_sql(cur, 'labStatsSQL/getLastRun')
+                row = cur.fetchone()
+                last_run = dict(zip([desc[0] for desc in cur.description], row)) if row else None
+    finally:
+        release_connection(conn)
+
+    groups = {}
+    for row in rows:
+        key = (row[1] if by_department else None, row[2] if by_month else None)
+        _from_rows([row], groups.setdefault(key, {}))
+
+    result = []
+    for (department, month), slices in sorted(groups.items(), key=lambda item: (item[0][0] or '', item[0][1] or 0)):
+        summary = LabSummary()
+        for part in slices.values():
+            summary.merge(part)
+        std, percentiles = summary.std(), summary.percentiles()
+        group = {}
+        if by_department:
+            group['d_id'] = department or None
+        if by_month:
+            group['month'] = _month(month)
+        group['analytes'] = {}
+        for i in np.flatnonzero(summary.n > 0):
+            stats = {
+                'n': int(summary.n[i]),
+                'mean': round(float(summary.mean[i]), 3),
+                'std': None if np.isnan(std[i]) else round(float(std[i]), 3),
+                'min': float(summary.min[i]),
+                'max': float(summary.max[i]),
+                'percentiles': {f'p{q}': round(float(v), 3) for q, v in zip(LAB_PERCENTILES, percentiles[i])},
+            }
+            if histogram:
+                low, high = LAB_HISTOGRAM_RANGES[ANALYTES[i]]
+                stats['histogram'] = {
+                    'low': low,
+                    'high': high,
+                    'bins': LAB_HISTOGRAM_BINS,
+                    'below': int(summary.histogram[i][0]),
+                    'counts': summary.histogram[i][1:-1].tolist(),
+                    'above': int(summary.histogram[i][-1]),
+                }
+            group['analytes'][ANALYTES[i]] = stats
+        result.append(group)
+    return {'groups': result, 'outliers': top_outliers, 'last_run': last_run}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Update the population lab statistics")
+    parser.add_argument('--full', action='store_true', help="Recompute from every blood test")
+    args = parser.parse_args()
+
+    print(run_lab_stats(full=args.full))
@@ -0,0 +1,202 @@
+"""
+Trends in a patient's blood test results.
+
+The whole series is loaded with one query into an array with one row per test
+and one column per analyte; slopes, rolling averages, rates of change and
+reference range flags are then computed for all analytes at once with NumPy.
+Values that were not measured are NaN and are left out of every statistic.
+"""
+import datetime
+import time
+import warnings
+
+import numpy as np
+
+from db_pool import get_connection, release_connection
+from sql_registry import execute as execute_sql
+
+# Analyte -> (unit, low, high) of the reference range; None = no bound.
+# Columns of healthCardSQL/getLabSeries, in the same order.
+LAB_REFERENCE_RANGES = {
+    'cholesterol': ('mg/dL', None, 200.0),
+    'glucose': ('mg/dL', 70.0, 100.0),
+    'hemoglobin': ('g/dL', 13.5, 17.5),
+    'white_blood_cells': ('K/uL', 4.5, 11.0),
+    'red_blood_cells': ('M/uL', 4.5, 5.9),
+}
+ANALYTES = list(LAB_REFERENCE_RANGES)
+
+# Tests averaged by the rolling average and used for the recent slope
+LAB_TREND_WINDOW = 5
+LAB_TREND_MAX_WINDOW = 100
+# Slopes and rates of change are reported per this many days
+LAB_TREND_PERIOD_DAYS = 30
+
+_LOW = np.array([np.nan if low is None else low for _, low, _ in LAB_REFERENCE_RANGES.values()])
+_HIGH = np.array([np.nan if high is None else high for _, _, high in LAB_REFERENCE_RANGES.values()])
+
+
+def _slopes(days: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Least squares slope of every column of `values` against `days`, ignoring NaNs."""
+    measured = ~np.isnan(values)
+    count = measured.sum(axis=0)
+    x = np.where(measured, days[:, None], 0.0)
+    y = np.where(measured, values, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = x.sum(axis=0) / count
+        y_mean = y.sum(axis=0) / count
+        dx = np.where(measured, x - x_mean, 0.0)
+        slope = (dx * (y - y_mean)).sum(axis=0) / (dx * dx).sum(axis=0)
+    # Fewer than two distinct days has no slope
+    slope[~np.isfinite(slope)] = np.nan
+    return slope
+
+
+def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Mean of the last `window` tests at every row, per column, ignoring NaNs."""
+    measured = ~np.isnan(values)
+    zero = np.zeros((1, values.shape[1]))
+    sums = np.concatenate([zero, np.cumsum(np.where(measured, values, 0.0), axis=0)])
+    counts = np.concatenate([zero, np.cumsum(measured, axis=0)])
+    end = np.arange(1, len(values) + 1)
+    start = np.maximum(end - window, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (sums[end] - sums[start]) / (counts[end] - counts[start])
+
+
+def _rate_of_change(days: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Change per period since the previous test, per column; NaN for the first test."""
+    gaps = np.diff(days).astype(float)
+    gaps[gaps == 0] = np.nan
+    rates = np.full(values.shape, np.nan)
+    rates[1:] = np.diff(values, axis=0) / gaps[:, None] * LAB_TREND_PERIOD_DAYS
+    return rates
+
+
+def _flags(values: np.ndarray) -> np.ndarray:
+    """-1 below the reference range, 1 above it, 0 inside it, NaN when not measured."""
+    with np.errstate(invalid='ignore'):
+        flags = np.where(values < _LOW, -1.0, np.where(values > _HIGH, 1.0, 0.0))
+    flags[np.isnan(values)] = np.nan
+    return flags
+
+
+def _to_json(values: np.ndarray, decimals: int = 3) -> list:
+    """Array -> list with NaN as None, which JSON can carry."""
+    values = np.round(values, decimals)
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+def _flags_to_json(flags: np.ndarray) -> list:
+    return np.where(np.isnan(flags), None, np.nan_to_num(flags).astype(int)).tolist()
+
+
+def compute_trends(days: np.ndarray, values: np.ndarray, window: int = LAB_TREND_WINDOW, series: bool = True) -> dict:
+    """
+    Trend statistics of a series: `days` holds the test dates as days since
+    1970-01-01 in ascending order, `values` one row per test and one column
+    per analyte in ANALYTES order (NaN = not measured).
+    """
+    period = LAB_TREND_PERIOD_DAYS
+    offset = days - days[0] if len(days) else days
+    slopes = _slopes(offset.astype(float), values) * period
+    recent = _slopes(offset[-window:].astype(float), values[-window:]) * period
+    rolling = _rolling_mean(values, window)
+    rates = _rate_of_change(days, values)
+    flags = _flags(values)
+
+    measured = ~np.isnan(values)
+    counts = measured.sum(axis=0)
+    latest = np.full(len(ANALYTES), np.nan)
+    mean = minimum = maximum = latest
+    if len(values):
+        # Last measured value of each analyte
+        last_row = len(values) - 1 - np.argmax(measured[::-1], axis=0)
+        latest = np.where(counts > 0, values[last_row, np.arange(len(ANALYTES))], np.nan)
+        with warnings.catch_warnings():
+            # Analytes never measured give NaN, which is what we want
+            warnings.simplefilter('ignore', RuntimeWarning)
+            mean, minimum, maximum = np.nanmean(values, axis=0), np.nanmin(values, axis=0), np.nanmax(values, axis=0)
+
+    columns = {
+        'measurements': counts.tolist(),
+        'latest': _to_json(latest),
+        'latest_flag': _flags_to_json(_flags(latest[None, :])[0]),
+        'mean': _to_json(mean),
+        'min': _to_json(minimum),
+        'max': _to_json(maximum),
+        f'slope_per_{period}_days': _to_json(slopes, 6),
+        f'recent_slope_per_{period}_days': _to_json(recent, 6),
+        'below_range': (flags == -1).sum(axis=0).tolist(),
+        'above_range': (flags == 1).sum(axis=0).tolist(),
+    }
+    analytes = {}
+    for i, (name, (unit, ref_low, ref_high)) in enumerate(LAB_REFERENCE_RANGES.items()):
+        analytes[name] = {'unit': unit, 'reference': {'low': ref_low, 'high': ref_high}}
+        analytes[name].update({stat: column[i] for stat, column in columns.items()})
+
+    result = {'tests': len(days), 'window': window, 'analytes': analytes}
+    if len(days):
+        result['first_date'] = str(np.datetime64(int(days[0]), 'D'))
+        result['last_date'] = str(np.datetime64(int(days[-1]), 'D'))
+    if series:
+        result['series'] = {
+            'dates': days.astype('datetime64[D]').astype(str).tolist(),
+            **{
+                name: {
+                    'values': _to_json(values[:, i]),
+                    'rolling_average': _to_json(rolling[:, i]),
+                    f'rate_per_{period}_days': _to_json(rates[:, i], 4),
+                    'flag': _flags_to_json(flags[:, i]),
+                }
+                for i, name in enumerate(ANALYTES)
+            },
+        }
+    return result
+
+
+def load_lab_series(patient_id: str, start_date: str = None, end_date: str = None):
+    """Returns (days, values) arrays of a patient's blood tests, see compute_trends()."""
+    conn = get_connection(readonly=True)
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                execute_sql(cur, 'healthCardSQL/getLabSeries', {
+                    'patient_id': patient_id,
+                    'start_date': start_date,
+                    'end_date': end_date
+                })
+                rows = cur.fetchall()
+    finally:
+        release_connection(conn)
+    table = np.array(rows, dtype=float).reshape(len(rows), len(ANALYTES) + 1)
+    return table[:, 0].astype(np.int64), table[:, 1:]
+
+
+def get_lab_trends(patient_id: str, window=LAB_TREND_WINDOW, start_date: str = None, end_date: str = None, series: bool = True):
+    """
+    Trends of every analyte of a patient's blood tests: overall and recent
+    slope, rolling average over `window` tests, rate of change between tests
+    and reference range flags. series=False leaves out the per-test arrays.
+    Returns {'patient_id', 'tests', 'window', 'analytes', ['first_date',
+    'last_date', 'series'], 'timings_ms'}.
+    """
+    window = int(window)
+    if not 2 <= window <= LAB_TREND_MAX_WINDOW:
+        raise ValueError(f"window must be between 2 and {LAB_TREND_MAX_WINDOW}")
+    for value in (start_date, end_date):
+        if value:
+            datetime.date.fromisoformat(value)
+
+    started = time.perf_counter()
+    days, values = load_lab_series(patient_id, start_date or None, end_date or None)
+    loaded = time.perf_counter()
+    trends = compute_trends(days, values, window, series)
+    finished = time.perf_counter()
+
+    trends['patient_id'] = patient_id
+    trends['timings_ms'] = {
+        'load': round((loaded - started) * 1000, 3),
+        'compute': round((finished - loaded) * 1000, 3),
+    }
+    return trends
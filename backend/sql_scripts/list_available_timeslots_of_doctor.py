@@ -1,29 +1,21 @@
-import os
-import psycopg2
-import personalSettings
-
-SQL_PATH = os.path.abspath(
-    os.path.join(os.path.dirname(__file__), '..', 'sql', 'list_available_timeslots_of_doctor.sql')
-)
+from db_pool import get_connection, release_connection
+from prepared_statements import execute_prepared
+import availability_index
 
 def list_available_timeslots_of_doctor(doc_id: str, date: str):
-    with open(SQL_PATH, 'r') as f:
-        sql = f.read()
+    if availability_index.AVAILABILITY_INDEX:
+        return availability_index.available_slots(doc_id, date)
+    return list_available_timeslots_of_doctor_sql(doc_id, date)
 
-    conn = psycopg2.connect(
-        dbname=personalSettings.tableName,
-        user=personalSettings.dbUser,
-        password=personalSettings.dbPassword,
-        host="localhost",
-        port=personalSettings.dbPort
-    )
+def list_available_timeslots_of_doctor_sql(doc_id: str, date: str):
+    conn = get_connection(readonly=True)
     try:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql, [doc_id, date, doc_id, date])
+                execute_prepared(cur, 'list_available_timeslots_of_doctor', {'doc_id': doc_id, 'date': date})
                 rows = cur.fetchall()
                 columns = [desc[0] for desc in cur.description]
                 timeslots = [dict(zip(columns, row)) for row in rows]
                 return timeslots
     finally:
-        conn.close()
\ No newline at end of file
+        release_connection(conn)
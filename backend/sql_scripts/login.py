@@ -1,17 +1,12 @@
 #!/usr/bin/env python3
-import os
-import psycopg2
 
-import personalSettings
-
-# Path to the SQL template
-SQL_PATH = os.path.abspath(
-    os.path.join(os.path.dirname(__file__), '..', 'sql', 'login.sql')
-)
+from db_pool import get_connection, release_connection
+from prepared_statements import execute_prepared
+import user_cache
 
 def login(email: str, password: str):
     """
-    Attempts login; returns (u_id, role) on success or None on failure.
+    Attempts login; returns (u_id, role, name, surname) on success or None on failure.
     Raises exceptions on connectivity errors.
     """
 
@@ -19,23 +14,14 @@ def login(email: str, password: str):
     pwd = password
 
 
-    # Read the SQL template
-    with open(SQL_PATH, 'r') as f:
-        query = f.read()
-
-    conn = psycopg2.connect(
-        dbname=personalSettings.tableName,
-        user=personalSettings.dbUser,
-        password=personalSettings.dbPassword,
-        host="localhost",
-        port=personalSettings.dbPort
-    )
+    conn = get_connection(readonly=True)
     try:
         with conn.cursor() as cur:
-            # parameters repeated 4× for each UNION block
-            cur.execute(query, (email, pwd) * 4)
-            return cur.fetchone()  # (u_id, role) or None
+            # One indexed lookup on email that also resolves the role
+            execute_prepared(cur, 'login', {'email': email, 'password': pwd})
+            row = cur.fetchone()
     finally:
-        conn.close()
-
-
+        release_connection(conn)
+    if row is not None:
+        user_cache.remember(*row)
+    return row
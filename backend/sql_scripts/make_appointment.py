@@ -1,53 +1,57 @@
-import os
-import psycopg2
-import personalSettings
-
-# Path to the SQL template
-SQL_PATH = os.path.abspath(
-    os.path.join(os.path.dirname(__file__), '..', 'sql', 'make_appointment.sql')
-)
+import datetime
+from booking_engine import book, book_batch, BookingError
+import availability_index
 
 def make_appointment(patient_id: str, doc_id: str, ts_id: str, date: str):
     """
     Inserts a new appointment.
-    Returns True on success, raises exception on failure.
+    Returns True on success, raises BookingError on failure.
     """
-    with open(SQL_PATH, 'r') as f:
-        sql = f.read()
-
-    conn = psycopg2.connect(
-        dbname=personalSettings.tableName,
-        user=personalSettings.dbUser,
-        password=personalSettings.dbPassword,
-        host="localhost",
-        port=personalSettings.dbPort
-    )
     try:
-        with conn:
-            with conn.cursor() as cur:
-                # Validate balance vs doctor price
-                cur.execute("SELECT balance FROM patient WHERE u_id = %s", (patient_id,))
-                bal_row = cur.fetchone()
-                if not bal_row:
-                    raise Exception("Patient not found")
-                balance = float(bal_row[0])
+        book(patient_id, doc_id, ts_id, date)
+    except BookingError as e:
+        if e.status == 'slot_taken':
+            availability_index.mark_busy(doc_id, date, ts_id)
+        raise
+    availability_index.mark_busy(doc_id, date, ts_id)
+    return True
 
-                cur.execute("SELECT price FROM doctor WHERE u_id = %s", (doc_id,))
-                price_row = cur.fetchone()
-                if not price_row or price_row[0] is None:
-                    raise Exception("Doctor price not set")
-                price = float(price_row[0])
+# Largest number of appointments one batch may book
+MAX_BATCH_SIZE = 60
 
-                if balance < price:
-                    raise Exception(f"Insufficient balance. Need {price}, have {balance}")
+def recurring_items(doc_id: str, ts_id: str, start_date: str, count: int, every_days: int = 7):
+    """'count' visits with the same doctor and time slot, every_days apart."""
+    # Checked before the list is built, so a huge count costs nothing
+    if not 1 <= count <= MAX_BATCH_SIZE:
+        raise ValueError(f"count must be between 1 and {MAX_BATCH_SIZE}")
+    if every_days < 1:
+        raise ValueError("every_days must be at least 1")
+    start = datetime.date.fromisoformat(start_date)
+    return [
+        {'doc_id': doc_id, 'ts_id': ts_id, 'date': start + datetime.timedelta(days=i * every_days)}
+        for i in range(count)
+    ]
 
-                # execute original insert (trigger will deduct balance)
-                cur.execute(sql, {
-                    'patient_id': patient_id,
-                    'doc_id': doc_id,
-                    'ts_id': ts_id,
-                    'date': date
-                })
-        return True
-    finally:
-        conn.close()
\ No newline at end of file
+def make_appointments(patient_id: str, items: list, atomic: bool = False):
+    """
+    Books several appointments for one patient in one transaction.
+    `items` are dicts with doc_id, ts_id and date ('YYYY-MM-DD' or a date).
+    Returns the booking summary with a status per item.
+    """
+    if not items:
+        raise ValueError("At least one appointment is required")
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValueError(f"At most {MAX_BATCH_SIZE} appointments can be booked at once")
+    items = [
+        {
+            'doc_id': item['doc_id'],
+            'ts_id': item['ts_id'],
+            'date': item['date'] if isinstance(item['date'], datetime.date) else datetime.date.fromisoformat(item['date'])
+        }
+        for item in items
+    ]
+    summary = book_batch(patient_id, items, atomic)
+    for item in summary['results']:
+        if item['status'] in ('booked', 'slot_taken'):
+            availability_index.mark_busy(item['doc_id'], item['date'], item['ts_id'])
+    return summary
@@ -0,0 +1,103 @@
+import re
+import time
+import weakref
+
+from psycopg2 import errors, extensions
+
+from sql_registry import get_template, record_timing, NAMED_PARAM, POSITIONAL_PARAM
+
+# Hot statements that are PREPAREd once per connection and then EXECUTEd by name
+PREPARED_TEMPLATES = (
+    'login',
+    'list_available_timeslots_of_doctor',
+    'make_appointment',
+    'filter_doctors_by_dept',
+    'getAppointmentSQL/getPatientAppointment',
+)
+
+# connection -> {template name: template the server-side statement was built from}
+_prepared = weakref.WeakKeyDictionary()
+
+
+class PreparedStatement:
+    """Server-side form of a registry template: `$n` placeholders and a statement name."""
+
+    def __init__(self, template):
+        self.template = template
+        self.name = 'hams_' + re.sub(r'\W', '_', template.name).lower()
+
+        body = template.text.strip().rstrip(';')
+        if ';' in body:
+            raise ValueError(f"SQL template '{template.name}' holds more than one statement")
+
+        if template.param_names:
+            numbers = {param: i + 1 for i, param in enumerate(template.param_names)}
+            body = NAMED_PARAM.sub(lambda m: f'${numbers[m.group(1)]}', body)
+            self.param_count = len(template.param_names)
+        else:
+            counter = iter(range(1, template.positional_count + 1))
+            body = POSITIONAL_PARAM.sub(lambda m: f'${next(counter)}', body)
+            self.param_count = template.positional_count
+
+        self.prepare_sql = f'PREPARE {self.name} AS\n{body}'
+        placeholders = ', '.join(['%s'] * self.param_count)
+        self.execute_sql = f'EXECUTE {self.name} ({placeholders})' if self.param_count else f'EXECUTE {self.name}'
+
+    def values(self, params):
+        """Orders `params` (dict or sequence) to match the $n placeholders."""
+        if self.template.param_names:
+            return [params[param] for param in self.template.param_names]
+        return list(params or [])
+
+
+_statements = {}
+
+
+def _statement(name: str) -> PreparedStatement:
+    template = get_template(name)
+    statement = _statements.get(name)
+    if statement is None or statement.template is not template:
+        statement = PreparedStatement(template)
+        _statements[name] = statement
+    return statement
+
+
+def execute_prepared(cur, name: str, params=None):
+    """
+    Runs registry template `name` as a server-side prepared statement.
+    The statement is PREPAREd just before its first EXECUTE on each
+    connection. If the server lost it (e.g. the session was reset), the
+    statement is prepared again and the call retried when that is safe.
+    """
+    statement = _statement(name)
+    conn = cur.connection
+    prepared = _prepared.setdefault(conn, {})
+    values = statement.values(params)
+    started = time.perf_counter()
+    try:
+        was_idle = conn.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+        try:
+            _run(cur, statement, prepared, values)
+        except errors.InvalidSqlStatementName:
+            prepared.clear()
+            if not was_idle:
+                raise
+            conn.rollback()
+            _run(cur, statement, prepared, values)
+    finally:
+        record_timing(name, time.perf_counter() - started)
+
+
+def _run(cur, statement: PreparedStatement, prepared: dict, values: list):
+    known = prepared.get(statement.template.name)
+    if known is not statement.template:
+        sql = statement.prepare_sql
+        if known is not None:
+            # Template changed on disk (hot reload): replace the old statement
+            sql = f'DEALLOCATE {statement.name};\n' + sql
+        # Prepared on its own and recorded straight away: the server keeps the
+        # statement even if the EXECUTE below fails or its transaction rolls back.
+        # Empty params so a literal %% in the template still becomes %
+        cur.execute(sql, [])
+        prepared[statement.template.name] = statement.template
+    cur.execute(statement.execute_sql, values)
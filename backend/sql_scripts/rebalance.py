@@ -0,0 +1,254 @@
+"""
+Reassigns appointments that clash with their doctor's unavailability to other
+doctors of the same department.
+
+Clashes are the rows and the department's free slots the columns of a cost
+matrix (days moved plus a weighted price difference); scipy's
+linear_sum_assignment picks the cheapest one-to-one assignment. Each
+department is solved per time slot first, so patients keep their time of day
+wherever possible. Clashes left over are solved once more across all time
+slots of the department, with a small penalty for changing the time.
+"""
+import datetime
+import time
+
+import numpy as np
+from psycopg2 import errors
+from scipy.optimize import linear_sum_assignment
+
+import personalSettings
+from db_pool import get_connection, release_connection
+from sql_registry import execute as execute_sql
+import availability_index
+
+# Furthest an appointment may move, in days
+REBALANCE_WINDOW_DAYS = getattr(personalSettings, 'rebalanceWindowDays', 14)
+# Cost of one unit of price difference, in days moved
+REBALANCE_PRICE_WEIGHT = getattr(personalSettings, 'rebalancePriceWeight', 0.02)
+# Cost of moving one time slot earlier or later in the day, in days moved
+REBALANCE_TIME_WEIGHT = 0.05
+# Cheapest free slots kept per clash when a department has many free slots
+REBALANCE_CANDIDATES = 20
+# Plans retried when a chosen slot was booked while the plan was being made
+REBALANCE_ATTEMPTS = 3
+
+INFEASIBLE = 1e9
+
+
+def _subset(arrays: dict, idx) -> dict:
+    return {name: values[idx] for name, values in arrays.items()}
+
+
+def _cost_matrix(rows: dict, cols: dict, busy: dict, time_weight: float):
+    shift = np.abs(cols['day'][None, :] - rows['day'][:, None])
+    extra = cols['price'][None, :] - rows['price'][:, None]
+    cost = shift + REBALANCE_PRICE_WEIGHT * np.abs(extra)
+    if time_weight:
+        cost += time_weight * np.abs(cols['ts'][None, :] - rows['ts'][:, None])
+    infeasible = (
+        (shift > REBALANCE_WINDOW_DAYS)
+        | (cols['doc'][None, :] == rows['doc'][:, None])
+        | (extra > rows['balance'][:, None])
+    )
+    # A patient cannot be seen twice in the same slot
+    for i, patient in enumerate(rows['patient']):
+        for day, ts in busy.get(patient, ()):
+            infeasible[i] |= (cols['day'] == day) & (cols['ts'] == ts)
+    cost[infeasible] = INFEASIBLE
+    return cost
+
+
+def _assign(rows: dict, cols: dict, busy: dict, time_weight: float = 0.0) -> list:
+    """Cheapest feasible (row, column) pairs, as indices into rows and cols."""
+    cost = _cost_matrix(rows, cols, busy, time_weight)
+    col_ids = np.arange(cost.shape[1])
+    keep = cost.shape[0] * REBALANCE_CANDIDATES
+    if cost.shape[1] > keep:
+        # Keep each row's cheapest candidates plus the cheapest columns overall,
+        # so rows that all want the same slots still have enough to share
+        per_row = np.argpartition(cost, REBALANCE_CANDIDATES, axis=1)[:, :REBALANCE_CANDIDATES]
+        overall = np.argpartition(cost.min(axis=0), keep)[:keep]
+        col_ids = np.union1d(per_row, overall)
+        cost = cost[:, col_ids]
+    row_ind, col_ind = linear_sum_assignment(cost)
+    feasible = cost[row_ind, col_ind] < INFEASIBLE
+    return list(zip(row_ind[feasible], col_ids[col_ind[feasible]]))
+
+
+def _load(cur, doc_id, start_date, end_date):
+    execute_sql(cur, 'availabilitySQL/getTimeSlots')
+    ts_pos = {row[0]: i for i, row in enumerate(cur.fetchall())}
+
+    execute_sql(cur, 'rebalanceSQL/getClashes', {'doc_id': doc_id, 'start_date': start_date, 'end_date': end_date})
+    clashes = cur.fetchall()
+    if not clashes:
+        return ts_pos, clashes, [], []
+
+    window = datetime.timedelta(days=REBALANCE_WINDOW_DAYS)
+    first = min(row[3] for row in clashes) - window
+    last = max(row[3] for row in clashes) + window
+    execute_sql(cur, 'rebalanceSQL/getFreeSlots', {
+        'dept_ids': sorted({row[4] for row in clashes}),
+        'start_date': first,
+        'end_date': last
+    })
+    free = cur.fetchall()
+    execute_sql(cur, 'rebalanceSQL/getPatientBusySlots', {
+        'patient_ids': sorted({row[0] for row in clashes}),
+        'start_date': first,
+        'end_date': last
+    })
+    return ts_pos, clashes, free, cur.fetchall()
+
+
+def _plan(ts_pos: dict, clashes: list, free: list, taken: list) -> list:
+    """Returns (clash index, free slot index) pairs."""
+    doc_code = {}
+
+    def code(doc):
+        return doc_code.setdefault(doc, len(doc_code))
+
+    rows = {
+        'patient': np.array([row[0] for row in clashes], dtype=object),
+        'doc': np.array([code(row[1]) for row in clashes]),
+        'ts': np.array([ts_pos[row[2]] for row in clashes]),
+        'day': np.array([row[3].toordinal() for row in clashes]),
+        'dept': np.array([row[4] for row in clashes], dtype=object),
+        'price': np.array([float(row[5]) for row in clashes]),
+        'balance': np.array([float(row[6]) for row in clashes]),
+    }
+    cols = {
+        'doc': np.array([code(row[0]) for row in free]),
+        'dept': np.array([row[1] for row in free], dtype=object),
+        'price': np.array([float(row[2]) for row in free]),
+        'day': np.array([row[3].toordinal() for row in free]),
+        'ts': np.array([ts_pos[row[4]] for row in free]),
+    }
+
+    # The clashing appointments themselves are about to move
+    moving = {(row[0], row[3].toordinal(), ts_pos[row[2]]) for row in clashes}
+    busy = {}
+    for patient, date, ts_id in taken:
+        slot = (date.toordinal(), ts_pos[ts_id])
+        if (patient, *slot) not in moving:
+            busy.setdefault(patient, set()).add(slot)
+
+    plan = []
+    used = np.zeros(len(free), dtype=bool)
+
+    def accept(row_idx, col_idx, pairs):
+        for r, c in pairs:
+            i, j = row_idx[r], col_idx[c]
+            patient = rows['patient'][i]
+            slot = (cols['day'][j], cols['ts'][j])
+            # The cost matrix checks each clash against the balance on its own;
+            # a patient with several clashes must afford all accepted moves
+            extra = cols['price'][j] - rows['price'][i]
+            if slot in busy.get(patient, ()) or extra > rows['balance'][i]:
+                continue
+            busy.setdefault(patient, set()).add(slot)
+            used[j] = True
+            rows['balance'][rows['patient'] == patient] -= extra
+            plan.append((i, j))
+
+    # Pass 1: same time of day, per department and time slot
+    for dept in np.unique(rows['dept']):
+        for ts in np.unique(rows['ts'][rows['dept'] == dept]):
+            row_idx = np.flatnonzero((rows['dept'] == dept) & (rows['ts'] == ts))
+            col_idx = np.flatnonzero((cols['dept'] == dept) & (cols['ts'] == ts) & ~used)
+            if len(col_idx):
+                accept(row_idx, col_idx, _assign(_subset(rows, row_idx), _subset(cols, col_idx), busy))
+
+    # Pass 2: whatever is left, any time of day
+    assigned = np.zeros(len(clashes), dtype=bool)
+    assigned[[i for i, _ in plan]] = True
+    for dept in np.unique(rows['dept'][~assigned]):
+        row_idx = np.flatnonzero((rows['dept'] == dept) & ~assigned)
+        col_idx = np.flatnonzero((cols['dept'] == dept) & ~used)
+        if len(col_idx):
+            accept(row_idx, col_idx, _assign(_subset(rows, row_idx), _subset(cols, col_idx), busy, REBALANCE_TIME_WEIGHT))
+    return plan
+
+
+def rebalance_clashes(doc_id: str = None, start_date: str = None, end_date: str = None, dry_run: bool = False):
+    """
+    Moves every upcoming appointment that clashes with its doctor's
+    unavailability to a free slot of another doctor in the same department,
+    at most REBALANCE_WINDOW_DAYS away, minimising days moved and price
+    difference. The patient pays or is refunded the price difference.
+    doc_id, start_date and end_date limit which clashes are handled;
+    dry_run=True only returns the plan. Appointments cancelled while the plan
+    was made are left out of 'moves'.
+    Returns {'clashes', 'moved', 'moves', 'unassigned', 'average_days_moved', 'timings_ms'}.
+    """
+    conn = get_connection()
+    try:
+        for attempt in range(1, REBALANCE_ATTEMPTS + 1):
+            timings = {}
+            started = time.perf_counter()
+            with conn:
+                with conn.cursor() as cur:
+                    ts_pos, clashes, free, taken = _load(cur, doc_id, start_date, end_date)
+            timings['load'] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            plan = _plan(ts_pos, clashes, free, taken) if clashes and free else []
+            timings['solve'] = time.perf_counter() - started
+
+            moves = [
+                {
+                    'patient_id': clashes[i][0],
+                    'from': {'doc_id': clashes[i][1], 'ts_id': clashes[i][2], 'date': clashes[i][3]},
+                    'to': {'doc_id': free[j][0], 'ts_id': free[j][4], 'date': free[j][3]},
+                    'days_moved': abs((free[j][3] - clashes[i][3]).days),
+                    'price_difference': free[j][2] - clashes[i][5],
+                }
+                for i, j in plan
+            ]
+            if dry_run or not moves:
+                break
+
+            started = time.perf_counter()
+            try:
+                with conn:
+                    with conn.cursor() as cur:
+                        execute_sql(cur, 'rebalanceSQL/moveAppointments', {
+                            'patient_ids': [move['patient_id'] for move in moves],
+                            'old_doc_ids': [move['from']['doc_id'] for move in moves],
+                            'old_ts_ids': [move['from']['ts_id'] for move in moves],
+                            'old_dates': [move['from']['date'] for move in moves],
+                            'new_doc_ids': [move['to']['doc_id'] for move in moves],
+                            'new_ts_ids': [move['to']['ts_id'] for move in moves],
+                            'new_dates': [move['to']['date'] for move in moves],
+                        })
+                        applied = {tuple(row) for row in cur.fetchall()}
+            except errors.UniqueViolation:
+                # A chosen slot was booked meanwhile: plan again from fresh data
+                if attempt == REBALANCE_ATTEMPTS:
+                    raise
+                continue
+            timings['apply'] = time.perf_counter() - started
+            # Appointments cancelled since they were planned were not moved
+            moves = [
+                move for move in moves
+                if (move['patient_id'], move['from']['doc_id'], move['from']['ts_id'], move['from']['date']) in applied
+            ]
+            for move in moves:
+                availability_index.mark_busy(move['to']['doc_id'], move['to']['date'], move['to']['ts_id'])
+            break
+    finally:
+        release_connection(conn)
+
+    # Planned appointments that were cancelled meanwhile are neither moved nor left over
+    moved = {i for i, _ in plan}
+    return {
+        'clashes': len(clashes),
+        'moved': len(moves),
+        'moves': moves,
+        'unassigned': [
+            {'patient_id': row[0], 'doc_id': row[1], 'ts_id': row[2], 'date': row[3]}
+            for i, row in enumerate(clashes) if i not in moved
+        ],
+        'average_days_moved': round(sum(move['days_moved'] for move in moves) / len(moves), 2) if moves else 0.0,
+        'timings_ms': {name: round(seconds * 1000, 3) for name, seconds in timings.items()},
+    }
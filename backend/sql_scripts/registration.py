@@ -1,19 +1,7 @@
 #!/usr/bin/env python3
-import os
-import uuid
-
-import psycopg2
-
-import personalSettings
-
-# Path to the SQL template
-SQL_PATH = os.path.abspath(
-    os.path.join(os.path.dirname(__file__), '..', 'sql', 'registration.sql')
-)
-
-def generate_id() -> str:
-    """Return a 5-character uppercase unique ID."""
-    return uuid.uuid4().hex[:5].upper()
+from db_pool import get_connection, release_connection
+from sql_registry import execute as execute_sql
+from id_allocator import next_id
 
 
 def hash_password(password: str) -> str:
@@ -33,27 +21,17 @@ def register(
     Returns (u_id, hc_id) on success.
     Raises an exception on failure.
     """
-    u_id  = generate_id()
-    hc_id = generate_id()
+    u_id  = next_id('user')
+    hc_id = next_id('health_card')
 
     pwd = password  # No hashing
 
 
-    # Read the SQL template
-    with open(SQL_PATH, 'r') as f:
-        sql = f.read()
-
-    conn = psycopg2.connect(
-        dbname=personalSettings.tableName,
-        user=personalSettings.dbUser,
-        password=personalSettings.dbPassword,
-        host="localhost",
-        port=personalSettings.dbPort
-    )
+    conn = get_connection()
     try:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql, {
+                execute_sql(cur, 'registration', {
                     'u_id':     u_id,
                     'name':     name,
                     'surname':  surname,
@@ -64,7 +42,7 @@ def register(
                 })
         return u_id, hc_id
     finally:
-        conn.close()
+        release_connection(conn)
 
 
 if __name__ == '__main__':
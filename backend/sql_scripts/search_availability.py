@@ -0,0 +1,60 @@
+import datetime
+
+from db_pool import get_connection, release_connection
+from sql_registry import execute as execute_sql
+
+# Longest date range one search may cover
+SEARCH_MAX_DAYS = 62
+
+def search_availability(start_date: str, end_date: str, dept_name: str = None, doc_ids: list = None, limit: int = None):
+    """
+    Finds the free time slots of every doctor in `dept_name` (or in `doc_ids`)
+    between start_date and end_date with one query.
+    With `limit`, only the earliest `limit` slots across all doctors are returned.
+    Returns a list of doctors, each with their free slots grouped by date.
+    """
+    if not dept_name and not doc_ids:
+        raise ValueError("A department or a list of doctors is required")
+    start = datetime.date.fromisoformat(start_date)
+    end = datetime.date.fromisoformat(end_date)
+    if end < start:
+        raise ValueError("end_date is before start_date")
+    if (end - start).days >= SEARCH_MAX_DAYS:
+        raise ValueError(f"Date range is limited to {SEARCH_MAX_DAYS} days")
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be at least 1")
+
+    conn = get_connection(readonly=True)
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                execute_sql(cur, 'availabilitySQL/searchAvailability', {
+                    'dept_name': dept_name or None,
+                    'doc_ids': list(doc_ids) if doc_ids else None,
+                    'start_date': start,
+                    'end_date': end,
+                    'limit': limit
+                })
+                rows = cur.fetchall()
+    finally:
+        release_connection(conn)
+
+    # Rows arrive earliest first; doctors keep the order of their first free slot
+    doctors = {}
+    for doctor_id, name, surname, specialization, price, date, ts_id, start_time, end_time in rows:
+        doctor = doctors.get(doctor_id)
+        if doctor is None:
+            doctor = doctors[doctor_id] = {
+                'doctor_id': doctor_id,
+                'doctor_name': name,
+                'doctor_surname': surname,
+                'specialization': specialization,
+                'price': price,
+                'dates': {}
+            }
+        doctor['dates'].setdefault(date, []).append({'ts_id': ts_id, 'start_time': start_time, 'end_time': end_time})
+
+    return [
+        dict(doctor, dates=[{'date': date, 'timeslots': slots} for date, slots in doctor['dates'].items()])
+        for doctor in doctors.values()
+    ]
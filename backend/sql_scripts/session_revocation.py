@@ -0,0 +1,102 @@
+"""
+Revocation list for the signed session tokens issued at login.
+
+Tokens are verified without touching the database (api.session_tokens); the
+only per-process state is this list of u_id -> revoked_at, reloaded in one
+query at most every SESSION_REVOCATION_REFRESH seconds. Revocations made in
+this process apply immediately, those made by other processes once the list
+is next reloaded.
+"""
+import threading
+import time
+
+import personalSettings
+from db_pool import get_connection, release_connection
+from sql_registry import execute as execute_sql
+
+# Lifetime of a session token in seconds
+SESSION_TOKEN_TTL = getattr(personalSettings, 'sessionTokenTtl', 12 * 3600)
+# Seconds between reloads of the revocation list
+SESSION_REVOCATION_REFRESH = getattr(personalSettings, 'sessionRevocationRefresh', 30.0)
+
+_revoked = {}            # u_id -> revoked_at (seconds since the epoch)
+_loaded_at = 0.0         # time.monotonic() of the last reload
+_lock = threading.Lock()
+_reloading = threading.Lock()
+_stats = {'reloads': 0, 'reload_errors': 0}
+
+
+def _reload():
+    global _revoked, _loaded_at
+    since = time.time() - SESSION_TOKEN_TTL
+    conn = get_connection(readonly=True)
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                execute_sql(cur, 'sessionSQL/getRevocations', {'since': since})
+                revoked = dict(cur.fetchall())
+    finally:
+        release_connection(conn)
+    with _lock:
+        # Keep local revocations that may not be visible on a replica yet
+        for u_id, revoked_at in _revoked.items():
+            if revoked_at > max(revoked.get(u_id, 0.0), since):
+                revoked[u_id] = revoked_at
+        _revoked = revoked
+        _loaded_at = time.monotonic()
+        _stats['reloads'] += 1
+
+
+def _refresh_if_due():
+    global _loaded_at
+    if time.monotonic() - _loaded_at < SESSION_REVOCATION_REFRESH:
+        return
+    # One thread reloads; the others keep using the current list
+    if not _reloading.acquire(blocking=False):
+        return
+    try:
+        _reload()
+    except Exception:
+        # A failed reload is retried on the next refresh; tokens keep verifying
+        _loaded_at = time.monotonic()
+        _stats['reload_errors'] += 1
+    finally:
+        _reloading.release()
+
+
+def is_revoked(u_id: str, issued_at: float) -> bool:
+    _refresh_if_due()
+    revoked_at = _revoked.get(u_id)
+    return revoked_at is not None and issued_at <= revoked_at
+
+
+def revoke(user_ids: list, cur=None):
+    """
+    Invalidates every token issued so far to the given users (logout, role
+    change, deletion). Pass `cur` to record the revocation in the caller's
+    transaction.
+    """
+    revoked_at = time.time()
+    params = {'u_ids': list(user_ids), 'revoked_at': revoked_at}
+    if cur is not None:
+        execute_sql(cur, 'sessionSQL/revokeSessions', params)
+    else:
+        conn = get_connection(pin=False)
+        try:
+            with conn:
+                with conn.cursor() as own_cur:
+                    execute_sql(own_cur, 'sessionSQL/revokeSessions', params)
+        finally:
+            release_connection(conn)
+    with _lock:
+        for u_id in user_ids:
+            _revoked[u_id] = max(_revoked.get(u_id, 0.0), revoked_at)
+
+
+def revocation_stats() -> dict:
+    with _lock:
+        return {
+            **_stats,
+            'revoked_users': len(_revoked),
+            'age_s': round(time.monotonic() - _loaded_at, 3) if _loaded_at else None,
+        }
@@ -0,0 +1,78 @@
+import personalSettings
+from db_pool import get_connection, release_connection
+from sql_registry import execute as execute_sql
+import availability_index
+
+# Seconds a slot stays held when the client does not ask for a duration
+SLOT_HOLD_TTL = getattr(personalSettings, 'slotHoldTtl', 120)
+# Longest hold a client may ask for
+SLOT_HOLD_MAX_TTL = getattr(personalSettings, 'slotHoldMaxTtl', 600)
+# Live holds one patient may have at a time
+SLOT_HOLD_MAX_PER_PATIENT = getattr(personalSettings, 'slotHoldMaxPerPatient', 5)
+# Expired rows removed on each new hold; expired holds are already ignored by
+# every reader, this only keeps the table small
+SLOT_HOLD_PURGE_BATCH = 20
+
+
+class SlotHoldError(Exception):
+    """Raised when a slot cannot be held."""
+
+    def __init__(self, message: str, http_status: int):
+        super().__init__(message)
+        self.http_status = http_status
+
+
+def hold_slot(patient_id: str, doc_id: str, ts_id: str, date: str, ttl: int = None):
+    """
+    Reserves a free slot for a patient for `ttl` seconds while they check out.
+    Booking the slot (make_appointment) consumes the hold; other patients see
+    the slot as taken until the hold expires. Holding the same slot again
+    extends the hold.
+    Returns the expiry time, raises SlotHoldError if the slot is not free.
+    """
+    ttl = SLOT_HOLD_TTL if ttl is None else int(ttl)
+    if not 0 < ttl <= SLOT_HOLD_MAX_TTL:
+        raise ValueError(f"Hold duration must be between 1 and {SLOT_HOLD_MAX_TTL} seconds")
+
+    params = {'patient_id': patient_id, 'doc_id': doc_id, 'ts_id': ts_id, 'date': date, 'ttl': ttl}
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                execute_sql(cur, 'holdSQL/countPatientHolds', params)
+                if cur.fetchone()[0] >= SLOT_HOLD_MAX_PER_PATIENT:
+                    raise SlotHoldError(f"At most {SLOT_HOLD_MAX_PER_PATIENT} slots can be held at once", 429)
+                execute_sql(cur, 'holdSQL/placeHold', params)
+                row = cur.fetchone()
+                if row is None:
+                    raise SlotHoldError("Time slot is not available", 409)
+                execute_sql(cur, 'holdSQL/purgeExpiredHolds', {'limit': SLOT_HOLD_PURGE_BATCH})
+        expires_at = row[0]
+        availability_index.mark_held(doc_id, date, ts_id, expires_at.timestamp())
+        return expires_at
+    finally:
+        release_connection(conn)
+
+
+def release_hold(patient_id: str, doc_id: str, ts_id: str, date: str):
+    """
+    Gives a held slot back before the hold expires.
+    Returns True if the patient still held the slot.
+    """
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                execute_sql(cur, 'holdSQL/releaseHold', {
+                    'patient_id': patient_id,
+                    'doc_id': doc_id,
+                    'ts_id': ts_id,
+                    'date': date
+                })
+                row = cur.fetchone()
+        if row is None:
+            return False
+        availability_index.invalidate(doc_id, date)
+        return row[0]
+    finally:
+        release_connection(conn)
@@ -0,0 +1,124 @@
+import os
+import re
+import threading
+import time
+
+import personalSettings
+
+# Root of all SQL templates
+SQL_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'sql')
+)
+
+# Re-read templates whose file changed on disk (development only)
+HOT_RELOAD = getattr(personalSettings, 'sqlHotReload', False)
+
+POSITIONAL_PARAM = re.compile(r'%s')
+NAMED_PARAM = re.compile(r'%\((\w+)\)s')
+LINE_COMMENT = re.compile(r'--[^\n]*')
+
+
+class SqlTemplateError(Exception):
+    """Raised for a missing or malformed SQL template."""
+
+
+class SqlTemplate:
+    """One validated statement loaded from backend/sql."""
+
+    def __init__(self, name: str, path: str, text: str, mtime: float):
+        self.name = name
+        self.path = path
+        self.text = text
+        self.mtime = mtime
+        self.param_names = tuple(dict.fromkeys(NAMED_PARAM.findall(text)))
+        self.positional_count = len(POSITIONAL_PARAM.findall(text))
+
+    def __str__(self):
+        return self.text
+
+
+def _load(name: str, path: str) -> SqlTemplate:
+    with open(path, 'r') as f:
+        text = f.read()
+    template = SqlTemplate(name, path, text, os.path.getmtime(path))
+    if not LINE_COMMENT.sub('', text).strip():
+        raise SqlTemplateError(f"SQL template '{name}' is empty")
+    if template.param_names and template.positional_count:
+        raise SqlTemplateError(f"SQL template '{name}' mixes %s and %(name)s placeholders")
+    return template
+
+
+def _template_name(path: str) -> str:
+    """backend/sql/healthCardSQL/getHealthCard.sql -> 'healthCardSQL/getHealthCard'"""
+    relative = os.path.relpath(path, SQL_DIR)
+    return os.path.splitext(relative)[0].replace(os.sep, '/')
+
+
+def _load_all() -> dict:
+    templates = {}
+    for root, _, files in os.walk(SQL_DIR):
+        for filename in sorted(files):
+            if filename.endswith('.sql'):
+                path = os.path.join(root, filename)
+                name = _template_name(path)
+                templates[name] = _load(name, path)
+    return templates
+
+
+_templates = _load_all()
+_reload_lock = threading.Lock()
+
+
+def get_template(name: str) -> SqlTemplate:
+    """Returns the loaded template called `name` (path below backend/sql, no extension)."""
+    try:
+        template = _templates[name]
+    except KeyError:
+        raise SqlTemplateError(f"Unknown SQL template '{name}'") from None
+    if HOT_RELOAD and os.path.getmtime(template.path) != template.mtime:
+        with _reload_lock:
+            template = _load(name, template.path)
+            _templates[name] = template
+    return template
+
+
+def get_sql(name: str) -> str:
+    """Returns the SQL text of template `name`."""
+    return get_template(name).text
+
+
+# Per-template execution timing
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def record_timing(name: str, elapsed: float):
+    with _stats_lock:
+        entry = _stats.setdefault(name, {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        entry['calls'] += 1
+        entry['total_ms'] += elapsed * 1000
+        entry['max_ms'] = max(entry['max_ms'], elapsed * 1000)
+
+
+def execute(cur, name: str, params=None):
+    """Runs template `name` on cursor `cur` and records how long it took."""
+    sql = get_sql(name)
+    started = time.perf_counter()
+    try:
+        cur.execute(sql, params)
+    finally:
+        record_timing(name, time.perf_counter() - started)
+
+
+def query_stats() -> dict:
+    """Returns call counts and timings per template."""
+    with _stats_lock:
+        return {
+            name: {
+                'calls': entry['calls'],
+                'total_ms': round(entry['total_ms'], 3),
+                'avg_ms': round(entry['total_ms'] / entry['calls'], 3),
+                'max_ms': round(entry['max_ms'], 3),
+            }
+            for name, entry in _stats.items()
+        }
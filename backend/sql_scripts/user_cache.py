@@ -0,0 +1,83 @@
+"""
+In-process cache of u_id -> (role, name, surname).
+
+Filled by login() and by lookups through get_user(), which resolves the
+current role and name of the logged-in user for the views (api/me/ and role
+checks). The admin write paths (update_user_role, update_user_details,
+delete_user(s)) call invalidate() after they commit; other server processes
+see those changes once their entry is older than USER_CACHE_TTL seconds.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import personalSettings
+from db_pool import get_connection, release_connection
+from sql_registry import execute as execute_sql
+
+# Maximum number of users kept; least recently used go first
+USER_CACHE_SIZE = getattr(personalSettings, 'userCacheSize', 10000)
+# Seconds after which an entry is looked up again
+USER_CACHE_TTL = getattr(personalSettings, 'userCacheTtl', 300.0)
+
+_entries = OrderedDict()  # u_id -> ((role, name, surname), stored_at)
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def remember(u_id: str, role: str, name: str, surname: str):
+    with _lock:
+        _entries[u_id] = ((role, name, surname), time.monotonic())
+        _entries.move_to_end(u_id)
+        while len(_entries) > USER_CACHE_SIZE:
+            _entries.popitem(last=False)
+
+
+def get_user(u_id: str):
+    """
+    Returns (role, name, surname) of a user, or None if the user does not
+    exist or has no role.
+    """
+    with _lock:
+        entry = _entries.get(u_id)
+        if entry is not None and time.monotonic() - entry[1] < USER_CACHE_TTL:
+            _entries.move_to_end(u_id)
+            _stats['hits'] += 1
+            return entry[0]
+        _stats['misses'] += 1
+
+    conn = get_connection(readonly=True)
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                execute_sql(cur, 'userSQL/getUserRole', {'u_id': u_id})
+                row = cur.fetchone()
+    finally:
+        release_connection(conn)
+    if row is None:
+        return None
+    remember(u_id, *row)
+    return row
+
+
+def invalidate(user_ids=None):
+    """Drops the given users from the cache, or everyone when called without arguments."""
+    with _lock:
+        if user_ids is None:
+            _stats['invalidations'] += len(_entries)
+            _entries.clear()
+            return
+        for u_id in user_ids:
+            if _entries.pop(u_id, None) is not None:
+                _stats['invalidations'] += 1
+
+
+def cache_stats() -> dict:
+    with _lock:
+        lookups = _stats['hits'] + _stats['misses']
+        return {
+            **_stats,
+            'entries': len(_entries),
+            'max_entries': USER_CACHE_SIZE,
+            'hit_ratio': round(_stats['hits'] / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,65 @@
+import datetime
+
+from db_pool import get_connection, release_connection
+from sql_registry import execute as execute_sql
+
+# Longest date range one waitlist request may cover
+WAITLIST_MAX_DAYS = 31
+
+def join_waitlist(patient_id: str, doc_id: str, start_date: str, end_date: str, priority: int = 0):
+    """
+    Registers a patient's interest in any slot of `doc_id` between start_date and end_date.
+    Freed slots are booked for the first waiting patient automatically (see hand_off_slot).
+    Returns the request ID.
+    """
+    start = datetime.date.fromisoformat(start_date)
+    end = datetime.date.fromisoformat(end_date)
+    if end < start:
+        raise ValueError("end_date is before start_date")
+    if (end - start).days >= WAITLIST_MAX_DAYS:
+        raise ValueError(f"Date range is limited to {WAITLIST_MAX_DAYS} days")
+
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                execute_sql(cur, 'waitlistSQL/joinWaitlist', {
+                    'patient_id': patient_id,
+                    'doc_id': doc_id,
+                    'start_date': start,
+                    'end_date': end,
+                    'priority': priority
+                })
+                return cur.fetchone()[0]
+    finally:
+        release_connection(conn)
+
+def get_waitlist_for_patient(patient_id: str):
+    """
+    Gets a patient's waitlist requests and their status (waiting, booked, cancelled).
+    Returns list of requests.
+    """
+    conn = get_connection(readonly=True)
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                execute_sql(cur, 'waitlistSQL/getPatientWaitlist', [patient_id])
+                rows = cur.fetchall()
+                columns = [desc[0] for desc in cur.description]
+                return [dict(zip(columns, row)) for row in rows]
+    finally:
+        release_connection(conn)
+
+def cancel_waitlist(patient_id: str, request_id: int):
+    """
+    Withdraws a waitlist request.
+    Returns True if anything was still waiting.
+    """
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                execute_sql(cur, 'waitlistSQL/cancelWaitlist', {'patient_id': patient_id, 'request_id': request_id})
+                return cur.rowcount > 0
+    finally:
+        release_connection(conn)
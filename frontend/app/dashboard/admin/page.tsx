@@ -82,6 +82,9 @@ export default function AdminDashboard() {
   const { toast } = useToast()
 
   const [users, setUsers] = useState<SystemUser[]>([])
+  // next_cursor of the users list; null once every user is loaded
+  const [usersCursor, setUsersCursor] = useState<string | null>(null)
+  const [loadingMoreUsers, setLoadingMoreUsers] = useState(false)
   const [departments, setDepartments] = useState<Department[]>([])
   const [stats, setStats] = useState<Stats>({
     total_users: 0,
@@ -127,6 +130,7 @@ export default function AdminDashboard() {
       const usersData = await usersResponse.json()
       if (usersData.success) {
         setUsers(usersData.users || [])
+        setUsersCursor(usersData.next_cursor || null)
       }
 
       // Fetch stats
@@ -181,6 +185,44 @@ export default function AdminDashboard() {
     fetchData()
   }, [])
 
+  // Fetches the next page of users and appends it
+  const loadMoreUsers = async () => {
+    if (!usersCursor) return
+    setLoadingMoreUsers(true)
+
+    try {
+      const response = await fetch(
+        `http://localhost:8000/api/admin/users/?after=${encodeURIComponent(usersCursor)}`,
+        {
+          method: "GET",
+          headers: {
+            "Content-Type": "application/json"
+          }
+        }
+      )
+
+      if (!response.ok) {
+        throw new Error(`Failed to fetch users: ${response.status}`)
+      }
+
+      const data = await response.json()
+      if (!data.success) {
+        throw new Error(data.message || "Failed to fetch users")
+      }
+      setUsers((prev) => [...prev, ...(data.users || [])])
+      setUsersCursor(data.next_cursor || null)
+    } catch (err) {
+      console.error("Error fetching more users:", err)
+      toast({
+        variant: "destructive",
+        title: "Error",
+        description: err instanceof Error ? err.message : "Failed to fetch users"
+      })
+    } finally {
+      setLoadingMoreUsers(false)
+    }
+  }
+
   const handleDeleteUser = async (userId: string) => {
     if (!confirm("Are you sure you want to delete this user?")) return
 
@@ -479,6 +521,13 @@ export default function AdminDashboard() {
                 </TableBody>
               </Table>
             )}
+            {!loading && usersCursor && (
+              <div className="flex justify-center pt-4">
+                <Button variant="outline" onClick={loadMoreUsers} disabled={loadingMoreUsers}>
+                  {loadingMoreUsers ? "Loading..." : "Load more users"}
+                </Button>
+              </div>
+            )}
           </CardContent>
         </Card>
       </div>
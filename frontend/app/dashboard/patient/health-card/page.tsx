@@ -4,44 +4,47 @@ import { useState, useEffect } from "react"
 import { FileText } from "lucide-react"
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card"
 import { Badge } from "@/components/ui/badge"
+import { Button } from "@/components/ui/button"
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from "@/components/ui/table"
 import { Accordion, AccordionContent, AccordionItem, AccordionTrigger } from "@/components/ui/accordion"
 import { useToast } from "@/components/ui/use-toast"
 import { useRouter } from "next/navigation"
 
-type HealthCardData = {
-  testdate: string;
+type BloodTest = {
+  bt_id: string;
+  test_date: string;
   cholesterol: string;
   glucose: string;
   hemoglobin: string;
-  whitebloodcell: string;
-  redbloodcell: string;
-  prescriptiondate: string;
-  usageinfo: string;
-  medicationname: string;
-  medicationformat: string;
-  medicationdosage: string;
+  white_blood_cells: string;
+  red_blood_cells: string;
 }
 
-// Define a type for grouped prescriptions
-type GroupedPrescription = {
-  date: string;
+type Prescription = {
+  p_id: string;
+  prescription_date: string;
+  usage_info: string;
   medications: Array<{
+    m_id: string;
     name: string;
     format: string;
     dosage: string;
-    usageinfo: string;
   }>;
 }
 
 export default function HealthCard() {
-  const [healthCardData, setHealthCardData] = useState<HealthCardData[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [groupedData, setGroupedData] = useState<{
-    bloodTests: HealthCardData[];
-    prescriptions: GroupedPrescription[];
+    bloodTests: BloodTest[];
+    prescriptions: Prescription[];
   }>({ bloodTests: [], prescriptions: [] });
+  // next_cursor of each section; null once everything is shown
+  const [cursors, setCursors] = useState<{ bloodTests: string | null; prescriptions: string | null }>({
+    bloodTests: null,
+    prescriptions: null,
+  });
+  const [loadingMore, setLoadingMore] = useState<"bloodTests" | "prescriptions" | null>(null);
   const { toast } = useToast();
   const router = useRouter();
 
@@ -164,48 +167,6 @@ export default function HealthCard() {
     }
   }, [toast]);
 
-  // Group health card data by test date and prescription date
-  useEffect(() => {
-    if (!healthCardData.length) return;
-
-    // Create map to store unique test dates
-    const testDatesMap = new Map();
-    // Create map to store medications grouped by prescription date
-    const prescriptionDatesMap = new Map<string, GroupedPrescription>();
-
-    healthCardData.forEach(item => {
-      // Handle blood tests
-      if (item.testdate && !testDatesMap.has(item.testdate)) {
-        testDatesMap.set(item.testdate, item);
-      }
-
-      // Handle prescriptions
-      if (item.prescriptiondate && item.medicationname) {
-        if (!prescriptionDatesMap.has(item.prescriptiondate)) {
-          prescriptionDatesMap.set(item.prescriptiondate, {
-            date: item.prescriptiondate,
-            medications: []
-          });
-        }
-
-        // Add medication to the prescription
-        prescriptionDatesMap.get(item.prescriptiondate)?.medications.push({
-          name: item.medicationname,
-          format: item.medicationformat,
-          dosage: item.medicationdosage,
-          usageinfo: item.usageinfo
-        });
-      }
-    });
-
-    // Convert maps to arrays
-    setGroupedData({
-      bloodTests: Array.from(testDatesMap.values()),
-      prescriptions: Array.from(prescriptionDatesMap.values())
-    });
-
-  }, [healthCardData]);
-
   useEffect(() => {
     // Only proceed if we have a patientId
     if (!patientId) return;
@@ -231,7 +192,15 @@ export default function HealthCard() {
         const data = await response.json();
         
         if (data.success) {
-          setHealthCardData(data.healthCard);
+          // Blood tests and prescriptions arrive as separate sections
+          setGroupedData({
+            bloodTests: data.healthCard.blood_tests.items,
+            prescriptions: data.healthCard.prescriptions.items
+          });
+          setCursors({
+            bloodTests: data.healthCard.blood_tests.next_cursor,
+            prescriptions: data.healthCard.prescriptions.next_cursor
+          });
           console.log("Successfully fetched health card data:", data.healthCard);
         } else {
           throw new Error(data.message || "Failed to fetch health card data");
@@ -252,6 +221,38 @@ export default function HealthCard() {
     fetchHealthCardData();
   }, [patientId, toast]);
 
+  // Fetches the next page of one section and appends it
+  const loadMore = async (section: "bloodTests" | "prescriptions") => {
+    const cursor = cursors[section];
+    if (!patientId || !cursor) return;
+    try {
+      setLoadingMore(section);
+      const param = section === "bloodTests" ? "bt_after" : "rx_after";
+      const response = await fetch(
+        `http://localhost:8000/api/get_health_card/${patientId}/?${param}=${encodeURIComponent(cursor)}`
+      );
+      if (!response.ok) {
+        throw new Error(`Error ${response.status}: ${response.statusText}`);
+      }
+      const data = await response.json();
+      if (!data.success) {
+        throw new Error(data.message || "Failed to fetch health card data");
+      }
+      const page = section === "bloodTests" ? data.healthCard.blood_tests : data.healthCard.prescriptions;
+      setGroupedData(prev => ({ ...prev, [section]: [...prev[section], ...page.items] }));
+      setCursors(prev => ({ ...prev, [section]: page.next_cursor }));
+    } catch (err) {
+      console.error("Error fetching more health card data:", err);
+      toast({
+        variant: "destructive",
+        title: "Error",
+        description: "Failed to load more health card data. Please try again later.",
+      });
+    } finally {
+      setLoadingMore(null);
+    }
+  };
+
   return (
     <div className="max-w-4xl mx-auto p-6">
       <Card className="bg-white/90 backdrop-blur-sm">
@@ -287,7 +288,7 @@ export default function HealthCard() {
           )}
 
           {/* No Data State */}
-          {!loading && !error && healthCardData.length === 0 && (
+          {!loading && !error && groupedData.bloodTests.length === 0 && groupedData.prescriptions.length === 0 && (
             <div className="bg-gray-50 p-4 rounded-lg text-center">
               <p>No health card data available.</p>
             </div>
@@ -302,7 +303,7 @@ export default function HealthCard() {
                     <AccordionTrigger className="flex items-center justify-between">
                       <div>
                         <CardTitle className="text-white">Blood Test</CardTitle>
-                        <p className="text-cyan-100 text-sm">{test.testdate}</p>
+                        <p className="text-cyan-100 text-sm">{test.test_date}</p>
                       </div>
                       <Badge variant="secondary" className="bg-white text-cyan-600">
                         Available
@@ -337,12 +338,12 @@ export default function HealthCard() {
                           </TableRow>
                           <TableRow>
                             <TableCell>White Blood Cells</TableCell>
-                            <TableCell>{test.whitebloodcell} K/uL</TableCell>
+                            <TableCell>{test.white_blood_cells} K/uL</TableCell>
                             <TableCell>4.5-11.0 K/uL</TableCell>
                           </TableRow>
                           <TableRow>
                             <TableCell>Red Blood Cells</TableCell>
-                            <TableCell>{test.redbloodcell} M/uL</TableCell>
+                            <TableCell>{test.red_blood_cells} M/uL</TableCell>
                             <TableCell>4.5-5.9 M/uL</TableCell>
                           </TableRow>
                         </TableBody>
@@ -354,7 +355,15 @@ export default function HealthCard() {
             </Accordion>
           ))}
 
-          {/* Prescriptions - Grouped by Date */}
+          {!loading && !error && cursors.bloodTests && (
+            <div className="flex justify-center">
+              <Button variant="outline" onClick={() => loadMore("bloodTests")} disabled={loadingMore !== null}>
+                {loadingMore === "bloodTests" ? "Loading..." : "Load more blood tests"}
+              </Button>
+            </div>
+          )}
+
+          {/* Prescriptions */}
           {!loading && !error && groupedData.prescriptions.map((prescription, index) => (
             <Accordion key={`prescription-${index}`} type="single" collapsible className="w-full">
               <AccordionItem value={`prescription-${index}`}>
@@ -363,7 +372,7 @@ export default function HealthCard() {
                     <AccordionTrigger className="flex items-center justify-between">
                       <div>
                         <CardTitle className="text-white">Prescription</CardTitle>
-                        <p className="text-cyan-100 text-sm">{prescription.date}</p>
+                        <p className="text-cyan-100 text-sm">{prescription.prescription_date}</p>
                       </div>
                       <Badge variant="secondary" className="bg-white text-cyan-600">
                         Available
@@ -387,7 +396,7 @@ export default function HealthCard() {
                               <TableCell>{med.name}</TableCell>
                               <TableCell>{med.format}</TableCell>
                               <TableCell>{med.dosage}</TableCell>
-                              <TableCell>{med.usageinfo}</TableCell>
+                              <TableCell>{prescription.usage_info}</TableCell>
                             </TableRow>
                           ))}
                         </TableBody>
@@ -398,6 +407,14 @@ export default function HealthCard() {
               </AccordionItem>
             </Accordion>
           ))}
+
+          {!loading && !error && cursors.prescriptions && (
+            <div className="flex justify-center">
+              <Button variant="outline" onClick={() => loadMore("prescriptions")} disabled={loadingMore !== null}>
+                {loadingMore === "prescriptions" ? "Loading..." : "Load more prescriptions"}
+              </Button>
+            </div>
+          )}
         </CardContent>
       </Card>
     </div>